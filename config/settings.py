@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party
     'rest_framework',
@@ -112,5 +113,80 @@ STATICFILES_DIRS = [BASE_DIR / 'static'] if (BASE_DIR / 'static').exists() else
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# S3-compatible object storage (AWS, MinIO, ...). Without a bucket, media
+# stays on local disk and direct-to-storage uploads are unavailable.
+# Either way uploads are content-addressed: identical files are stored once.
+AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME', default='')
+if AWS_STORAGE_BUCKET_NAME:
+    AWS_S3_ENDPOINT_URL = config('AWS_S3_ENDPOINT_URL', default=None)
+    AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME', default=None)
+    AWS_ACCESS_KEY_ID = config('AWS_ACCESS_KEY_ID', default=None)
+    AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY', default=None)
+    AWS_DEFAULT_ACL = None
+STORAGES = {
+    'default': {
+        'BACKEND': 'properties.storage.ContentAddressedS3Storage' if AWS_STORAGE_BUCKET_NAME
+        else 'properties.storage.ContentAddressedFileSystemStorage',
+    },
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # custom user model
-AUTH_USER_MODEL = 'accounts.User'
\ No newline at end of file
+AUTH_USER_MODEL = 'accounts.User'
+
+# Redis
+REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
+
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CACHE_URL', default=REDIS_URL),
+    }
+}
+
+# Celery
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default=REDIS_URL)
+CELERY_BEAT_SCHEDULE = {
+    'flush-property-views': {
+        'task': 'properties.tasks.flush_property_views',
+        'schedule': timedelta(seconds=30),
+    },
+    'rollup-property-views': {
+        'task': 'properties.tasks.rollup_property_views',
+        'schedule': timedelta(minutes=15),
+    },
+    'prune-property-views': {
+        'task': 'properties.tasks.prune_property_views',
+        'schedule': timedelta(hours=24),
+    },
+    'refresh-market-statistics': {
+        'task': 'properties.tasks.refresh_market_statistics',
+        'schedule': timedelta(hours=1),
+    },
+}
+
+# Property view tracking
+PROPERTY_VIEW_DEDUP_SECONDS = 30 * 60  # Repeat views by the same viewer inside this window are dropped
+PROPERTY_VIEW_FLUSH_BATCH_SIZE = 1000
+PROPERTY_VIEW_RETENTION_DAYS = 90  # Raw view rows older than this are deleted once rolled up
+PROPERTY_VIEW_PRUNE_BATCH_SIZE = 5000
+
+# Property listing response cache
+PROPERTY_CACHE_TIMEOUT = 300  # Seconds; catalogue changes invalidate sooner via the version key
+PROPERTY_CACHE_LOCAL_ENTRIES = 256  # Per-process LRU size in front of Redis
+
+# Bulk property import and export
+PROPERTY_IMPORT_CHUNK_SIZE = 500  # Rows validated and inserted per transaction
+PROPERTY_IMPORT_MAX_ERRORS = 1000  # Per-row errors included in an import report
+PROPERTY_EXPORT_CHUNK_SIZE = 2000  # Listings fetched per server-side cursor round trip when exporting
+
+# Similar listings
+PROPERTY_SIMILARITY_REBUILD_SECONDS = 60 * 60  # Full index rebuild interval; changes are applied in between
+
+# Direct-to-storage image uploads
+PROPERTY_IMAGE_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+PROPERTY_IMAGE_UPLOAD_EXPIRY_SECONDS = 15 * 60  # Lifetime of a presigned upload and its completion token
+
+# Near-duplicate listing detection
+PROPERTY_DEDUP_BATCH_SIZE = 2000  # Listings fingerprinted per batch by the catalogue sweep
@@ -7,7 +7,9 @@ import { useAuth } from '../contexts/AuthContext';
 
 export default function PropertiesPage() {
   const [properties, setProperties] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [searchTerm, setSearchTerm] = useState('');
   const [filters, setFilters] = useState({
@@ -40,7 +42,8 @@ export default function PropertiesPage() {
       if (filters.bedrooms) params.bedrooms = filters.bedrooms;
 
       const response = await propertiesAPI.list(params);
-      setProperties(response.data);
+      setProperties(response.data.results);
+      setNextPage(response.data.next);
     } catch (err) {
       setError('Failed to load properties. Please try again.');
       console.error('Error fetching properties:', err);
@@ -49,6 +52,23 @@ export default function PropertiesPage() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextPage || loadingMore) return;
+    setLoadingMore(true);
+    setError('');
+
+    try {
+      const response = await propertiesAPI.page(nextPage);
+      setProperties((current) => [...current, ...response.data.results]);
+      setNextPage(response.data.next);
+    } catch (err) {
+      setError('Failed to load more properties. Please try again.');
+      console.error('Error fetching properties:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSearch = (e) => {
     e.preventDefault();
     fetchProperties();
@@ -113,7 +133,7 @@ export default function PropertiesPage() {
         <div className="max-w-7xl mx-auto px-4">
           <h1 className="text-4xl font-bold mb-4">Find Your Perfect Home</h1>
           <p className="text-primary-100 mb-8">
-            Browse {properties.length} verified properties in Ghana
+            Browse verified properties in Ghana
           </p>
 
           {/* Search Bar */}
@@ -244,7 +264,7 @@ export default function PropertiesPage() {
           <>
             <div className="flex items-center justify-between mb-6">
               <p className="text-gray-600">
-                Showing {properties.length} {properties.length === 1 ? 'property' : 'properties'}
+                Showing {properties.length}{nextPage ? '+' : ''} {properties.length === 1 && !nextPage ? 'property' : 'properties'}
               </p>
             </div>
 
@@ -253,6 +273,14 @@ export default function PropertiesPage() {
                 <PropertyCard key={property.id} property={property} />
               ))}
             </div>
+
+            {nextPage && (
+              <div className="text-center mt-8">
+                <button onClick={loadMore} className="btn-secondary" disabled={loadingMore}>
+                  {loadingMore ? 'Loading...' : 'Load More'}
+                </button>
+              </div>
+            )}
           </>
         )}
       </div>
@@ -69,6 +69,8 @@ export const authAPI = {
 // Properties API
 export const propertiesAPI = {
   list: (params) => api.get('/properties/', { params }),
+  // Follow a cursor link from a previous page; it already carries the filters
+  page: (url) => api.get(url),
   get: (id) => api.get(`/properties/${id}/`),
   create: (data) => api.post('/properties/', data),
   myProperties: () => api.get('/properties/my-properties/'),
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Conversation, Message
+from .models import Conversation, ConversationParticipant, Message
 
 class MessageInline(admin.TabularInline):
     model = Message
@@ -12,16 +12,21 @@ class MessageInline(admin.TabularInline):
     def has_add_permission(self, request, obj=None):
         return False
 
+class ConversationParticipantInline(admin.TabularInline):
+    model = ConversationParticipant
+    extra = 0
+    readonly_fields = ('unread_count',)
+    fields = ('user', 'unread_count')
+
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
     list_display = ('id', 'property', 'get_participants', 'last_message_at', 'created_at', 'message_count')
     list_filter = ('created_at', 'last_message_at')
     search_fields = ('property__title', 'participants__email', 'participants__full_name')
-    readonly_fields = ('created_at', 'last_message_at')
-    filter_horizontal = ('participants',)
+    readonly_fields = ('created_at', 'last_message_at', 'last_message_sender', 'last_message_snippet')
     ordering = ('-last_message_at',)
     
-    inlines = [MessageInline]
+    inlines = [ConversationParticipantInline, MessageInline]
     
     def get_participants(self, obj):
         return ", ".join([p.full_name for p in obj.participants.all()])
@@ -36,7 +41,8 @@ class MessageAdmin(admin.ModelAdmin):
     list_display = ('sender', 'receiver', 'conversation', 'is_read', 'sent_at', 'message_preview')
     list_filter = ('is_read', 'sent_at')
     search_fields = ('sender__email', 'sender__full_name', 'receiver__email', 'receiver__full_name', 'message_content')
-    readonly_fields = ('sent_at', 'read_at')
+    # Read state only changes through Conversation.mark_read, which keeps the unread counters in step
+    readonly_fields = ('is_read', 'sent_at', 'read_at')
     ordering = ('-sent_at',)
     
     fieldsets = (
@@ -58,6 +64,12 @@ class MessageAdmin(admin.ModelAdmin):
         return obj.message_content[:50] + "..." if len(obj.message_content) > 50 else obj.message_content
     message_preview.short_description = "Preview"
     
+    def get_readonly_fields(self, request, obj=None):
+        # Moving a sent message would leave it counted in the wrong unread counter
+        if obj is not None:
+            return self.readonly_fields + ('conversation', 'sender', 'receiver')
+        return self.readonly_fields
+    
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         return qs.select_related('sender', 'receiver', 'conversation')
\ No newline at end of file
@@ -0,0 +1,80 @@
+# Generated by Django 6.0.1 on 2026-10-17 16:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Left
+
+
+def backfill_summaries(apps, schema_editor):
+    Conversation = apps.get_model('messaging', 'Conversation')
+    ConversationParticipant = apps.get_model('messaging', 'ConversationParticipant')
+    Message = apps.get_model('messaging', 'Message')
+
+    latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-sent_at')
+    Conversation.objects.filter(Exists(latest)).update(
+        last_message_snippet=Subquery(latest.annotate(snippet=Left('message_content', 100)).values('snippet')[:1]),
+        last_message_sender=Subquery(latest.values('sender')[:1]),
+        last_message_at=Subquery(latest.values('sent_at')[:1]),
+    )
+
+    unread = Message.objects.filter(
+        conversation=OuterRef('conversation'), receiver=OuterRef('user'), is_read=False
+    ).order_by().values('conversation').annotate(count=Count('pk')).values('count')
+    ConversationParticipant.objects.update(unread_count=Coalesce(Subquery(unread), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The implicit participants table becomes an explicit through model without being rebuilt
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ConversationParticipant',
+                    fields=[
+                        ('id', models.AutoField(primary_key=True, serialize=False)),
+                        ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='messaging.conversation')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_memberships', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'messaging_conversation_participants',
+                        'unique_together': {('conversation', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='conversation',
+                    name='participants',
+                    field=models.ManyToManyField(related_name='conversations', through='messaging.ConversationParticipant', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_sender',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_snippet',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
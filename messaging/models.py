@@ -1,11 +1,19 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
 import uuid
 
 class Conversation(models.Model):
+    SNIPPET_LENGTH = 100
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     property = models.ForeignKey('properties.Property', on_delete=models.CASCADE, related_name='conversations', null=True, blank=True)
-    participants = models.ManyToManyField('accounts.User', related_name='conversations')
-    last_message_at = models.DateTimeField(auto_now=True)
+    participants = models.ManyToManyField('accounts.User', related_name='conversations', through='ConversationParticipant')
+    # Summary of the latest message, kept up to date by Message.save() so the inbox never reads messages
+    last_message_snippet = models.CharField(max_length=SNIPPET_LENGTH, blank=True, editable=False)
+    last_message_sender = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, related_name='+', null=True, blank=True, editable=False)
+    last_message_at = models.DateTimeField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -18,6 +26,46 @@ class Conversation(models.Model):
     def get_other_participant(self, user):
         """Get the other participant in a 2-person conversation"""
         return self.participants.exclude(id=user.id).first()
+    
+    def record_message(self, message):
+        """Update the summary and the receiver's unread counter for a new message."""
+        # A message committed out of order does not replace a newer summary
+        Conversation.objects.filter(pk=self.pk, last_message_at__lte=message.sent_at).update(
+            last_message_snippet=message.message_content[:self.SNIPPET_LENGTH],
+            last_message_sender=message.sender_id,
+            last_message_at=message.sent_at,
+        )
+        ConversationParticipant.objects.filter(conversation=self, user_id=message.receiver_id).update(
+            unread_count=F('unread_count') + 1
+        )
+    
+    def mark_read(self, user, message_ids=None):
+        """Mark the user's unread messages (all, or those in message_ids) as read; returns how many changed."""
+        messages = self.messages.filter(receiver=user, is_read=False)
+        if message_ids is not None:
+            messages = messages.filter(pk__in=message_ids)
+        with transaction.atomic():
+            updated = messages.update(is_read=True, read_at=timezone.now())
+            if updated:
+                # Decrement by the rows actually flipped, so concurrent sends and reads stay exact
+                ConversationParticipant.objects.filter(conversation=self, user=user).update(
+                    unread_count=Greatest(F('unread_count') - updated, 0)
+                )
+        return updated
+
+class ConversationParticipant(models.Model):
+    # Keeps the table and integer ids of the original implicit many-to-many
+    id = models.AutoField(primary_key=True)
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey('accounts.User', on_delete=models.CASCADE, related_name='conversation_memberships')
+    unread_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'messaging_conversation_participants'
+        unique_together = ('conversation', 'user')
+    
+    def __str__(self):
+        return f"{self.user} in {self.conversation_id}"
 
 class Message(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -38,9 +86,11 @@ class Message(models.Model):
     def save(self, *args, **kwargs):
         # Auto-update read_at when message is marked as read
         if self.is_read and not self.read_at:
-            from django.utils import timezone
             self.read_at = timezone.now()
-        super().save(*args, **kwargs)
+        adding = self._state.adding
         
-        # Update conversation's last_message_at
-        self.conversation.save()  # This triggers auto_now on last_message_at
\ No newline at end of file
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Update the conversation summary in the same transaction as the message
+            if adding:
+                self.conversation.record_message(self)
@@ -30,18 +30,21 @@ class ConversationSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'last_message_at', 'created_at')
     
     def get_last_message(self, obj):
-        last_msg = obj.messages.last()
-        if last_msg:
-            return {
-                'sender': last_msg.sender.full_name,
-                'content': last_msg.message_content[:50],
-                'sent_at': last_msg.sent_at
-            }
-        return None
+        # Read from the summary Message.save() keeps on the conversation
+        if obj.last_message_sender_id is None and not obj.last_message_snippet:
+            return None
+        return {
+            'sender': obj.last_message_sender.full_name if obj.last_message_sender else None,
+            'content': obj.last_message_snippet[:50],
+            'sent_at': obj.last_message_at
+        }
     
     def get_unread_count(self, obj):
+        # Annotated by ConversationListView; otherwise read the user's counter
+        if hasattr(obj, 'unread_count'):
+            return obj.unread_count
         user = self.context['request'].user
-        return obj.messages.filter(receiver=user, is_read=False).count()
+        return obj.memberships.filter(user=user).values_list('unread_count', flat=True).first() or 0
 
 class ConversationDetailSerializer(serializers.ModelSerializer):
     messages = MessageSerializer(many=True, read_only=True)
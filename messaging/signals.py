@@ -0,0 +1,15 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import ConversationParticipant, Message
+
+
+@receiver(post_delete, sender=Message)
+def release_unread_message(sender, instance, **kwargs):
+    """A deleted unread message (directly or by cascade) no longer counts towards the receiver's badge."""
+    if not instance.is_read:
+        ConversationParticipant.objects.filter(
+            conversation_id=instance.conversation_id, user_id=instance.receiver_id
+        ).update(unread_count=Greatest(F('unread_count') - 1, 0))
@@ -1,3 +1,99 @@
-from django.test import TestCase
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from accounts.models import User
+from .admin import MessageAdmin
+from .models import Conversation, ConversationParticipant, Message
+
+
+def make_user(email, user_type='TENANT'):
+    return User.objects.create_user(
+        email=email, username=email.split('@')[0], password='pass1234',
+        full_name=email.split('@')[0].title(), user_type=user_type
+    )
+
+
+class ConversationSummaryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = make_user('tenant@example.com')
+        cls.landlord = make_user('landlord@example.com', 'LANDLORD')
+        cls.conversations = []
+        for i in range(5):
+            conversation = Conversation.objects.create()
+            conversation.participants.add(cls.tenant, cls.landlord)
+            for j in range(3):
+                Message.objects.create(
+                    conversation=conversation, sender=cls.tenant, receiver=cls.landlord,
+                    message_content=f'Is flat {i} still available? ({j})'
+                )
+            cls.conversations.append(conversation)
+        Message.objects.create(
+            conversation=cls.conversations[0], sender=cls.landlord, receiver=cls.tenant, message_content='Yes it is'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def unread(self, user, conversation):
+        return ConversationParticipant.objects.get(user=user, conversation=conversation).unread_count
+
+    def test_new_messages_update_summary_and_receiver_counter(self):
+        conversation = Conversation.objects.get(pk=self.conversations[0].pk)
+        self.assertEqual(conversation.last_message_snippet, 'Yes it is')
+        self.assertEqual(conversation.last_message_sender, self.landlord)
+        self.assertEqual(conversation.last_message_at, conversation.messages.last().sent_at)
+        self.assertEqual(self.unread(self.landlord, conversation), 3)
+        self.assertEqual(self.unread(self.tenant, conversation), 1)
+
+    def test_inbox_query_count_does_not_grow_with_conversations(self):
+        self.client.force_authenticate(self.landlord)
+        # Conversations (with summary, sender, property and counter) + participants
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('conversation_list'))
+        self.assertEqual(len(response.data), 5)
+        first = response.data[0]
+        self.assertEqual(first['id'], str(self.conversations[0].pk))
+        self.assertEqual(first['last_message']['content'], 'Yes it is')
+        self.assertEqual(first['unread_count'], 3)
+
+    def test_reading_decrements_only_the_readers_counter(self):
+        conversation = self.conversations[1]
+        message = conversation.messages.first()
+        self.client.force_authenticate(self.landlord)
+
+        # URL names here clash with the notifications app, so paths are spelled out
+        for _ in range(2):
+            self.client.post(f'/api/messaging/message/{message.pk}/mark-read/')
+        self.assertEqual(self.unread(self.landlord, conversation), 2)
+        self.assertEqual(self.client.get('/api/messaging/unread-count/').data['unread_count'], 14)
+
+        response = self.client.get(reverse('conversation_detail', args=[conversation.pk]))
+        self.assertTrue(all(message['is_read'] for message in response.data['messages']))
+        self.assertEqual(self.unread(self.landlord, conversation), 0)
+        self.assertEqual(self.unread(self.tenant, self.conversations[0]), 1)
+
+    def test_deleting_unread_messages_releases_the_counter(self):
+        conversation = self.conversations[2]
+        conversation.mark_read(self.landlord, [conversation.messages.first().pk])
+        self.assertEqual(self.unread(self.landlord, conversation), 2)
+
+        conversation.messages.filter(is_read=True).delete()
+        self.assertEqual(self.unread(self.landlord, conversation), 2)
+        conversation.messages.first().delete()
+        self.assertEqual(self.unread(self.landlord, conversation), 1)
+
+        # Deleting the conversation cascades to its messages without error
+        pk = conversation.pk
+        conversation.delete()
+        self.assertFalse(ConversationParticipant.objects.filter(conversation_id=pk).exists())
+
+    def test_admin_cannot_edit_read_state_or_move_messages(self):
+        model_admin = MessageAdmin(Message, site)
+        request = RequestFactory().get('/')
+        self.assertIn('is_read', model_admin.get_readonly_fields(request))
+        readonly = model_admin.get_readonly_fields(request, self.conversations[0].messages.first())
+        self.assertTrue({'is_read', 'conversation', 'sender', 'receiver'} <= set(readonly))
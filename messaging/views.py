@@ -2,8 +2,8 @@ from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
-from .models import Conversation, Message
+from django.db.models import F, Prefetch, Sum
+from .models import Conversation, ConversationParticipant, Message
 from .serializers import (
     ConversationSerializer,
     ConversationDetailSerializer,
@@ -27,9 +27,14 @@ class ConversationListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
+        # Summary and unread counter are denormalized, so no messages are read
         return Conversation.objects.filter(
-            participants=self.request.user
-        ).prefetch_related('participants', 'messages').order_by('-last_message_at')
+            memberships__user=self.request.user
+        ).annotate(
+            unread_count=F('memberships__unread_count')
+        ).select_related(
+            'property', 'last_message_sender'
+        ).prefetch_related('participants').order_by('-last_message_at')
 
 class ConversationDetailView(generics.RetrieveAPIView):
     """
@@ -38,17 +43,17 @@ class ConversationDetailView(generics.RetrieveAPIView):
     """
     serializer_class = ConversationDetailSerializer
     permission_classes = [permissions.IsAuthenticated, IsParticipant]
-    queryset = Conversation.objects.all()
+    queryset = Conversation.objects.select_related('property').prefetch_related(
+        'participants',
+        Prefetch('messages', queryset=Message.objects.select_related('sender', 'receiver'))
+    )
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         
-        # Mark all messages as read for the current user
-        Message.objects.filter(
-            conversation=instance,
-            receiver=request.user,
-            is_read=False
-        ).update(is_read=True)
+        # Mark all messages as read for the current user (and reset their unread counter)
+        if instance.mark_read(request.user):
+            instance = self.get_object()
         
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -147,10 +152,9 @@ class UnreadMessagesCountView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        unread_count = Message.objects.filter(
-            receiver=request.user,
-            is_read=False
-        ).count()
+        unread_count = ConversationParticipant.objects.filter(
+            user=request.user
+        ).aggregate(total=Sum('unread_count'))['total'] or 0
         
         return Response({
             'unread_count': unread_count
@@ -167,10 +171,7 @@ class MarkMessageAsReadView(APIView):
         message = get_object_or_404(Message, id=pk, receiver=request.user)
         
         if not message.is_read:
-            from django.utils import timezone
-            message.is_read = True
-            message.read_at = timezone.now()
-            message.save()
+            message.conversation.mark_read(request.user, message_ids=[message.pk])
         
         return Response({
             'message': 'Message marked as read'
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('APPLICATION_RECEIVED', 'Application Received'), ('APPLICATION_ACCEPTED', 'Application Accepted'), ('APPLICATION_REJECTED', 'Application Rejected'), ('NEW_MESSAGE', 'New Message'), ('VERIFICATION_APPROVED', 'Verification Approved'), ('VERIFICATION_REJECTED', 'Verification Rejected'), ('NEW_REVIEW', 'New Review'), ('PROPERTY_VIEWED', 'Property Viewed'), ('SAVED_SEARCH_MATCH', 'Saved Search Match'), ('SYSTEM', 'System Notification')], max_length=30),
+        ),
+    ]
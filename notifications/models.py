@@ -11,6 +11,7 @@ class Notification(models.Model):
         ('VERIFICATION_REJECTED', 'Verification Rejected'),
         ('NEW_REVIEW', 'New Review'),
         ('PROPERTY_VIEWED', 'Property Viewed'),
+        ('SAVED_SEARCH_MATCH', 'Saved Search Match'),
         ('SYSTEM', 'System Notification'),
     ]
     
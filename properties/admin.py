@@ -1,8 +1,12 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
 from django.utils.html import format_html
+from .cache import bump_catalogue_version
 from .models import (
     Property, PropertyImage, PropertyAmenity, 
-    PropertyDocument, SavedProperty, PropertyView
+    PropertyDocument, SavedProperty, PropertyView, PropertyDailyStats, SavedSearch, MarketStats, StoredBlob,
+    ListingFingerprint, DuplicateListing
 )
 
 class PropertyImageInline(admin.TabularInline):
@@ -133,4 +137,99 @@ class PropertyViewAdmin(admin.ModelAdmin):
     list_filter = ('viewed_at',)
     search_fields = ('property__title', 'user__email', 'ip_address')
     readonly_fields = ('viewed_at',)
-    ordering = ('-viewed_at',)
\ No newline at end of file
+    ordering = ('-viewed_at',)
+
+@admin.register(PropertyDailyStats)
+class PropertyDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('property', 'date', 'views', 'unique_users', 'saves', 'applications', 'conversations')
+    list_filter = ('date',)
+    search_fields = ('property__title',)
+    readonly_fields = ('property', 'date', 'views', 'unique_users', 'unique_ips', 'saves', 'applications', 'conversations')
+    ordering = ('-date',)
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ('user', 'name', 'city', 'property_type', 'min_price', 'max_price', 'is_active', 'created_at')
+    list_filter = ('is_active', 'property_type', 'created_at')
+    search_fields = ('user__email', 'name', 'city')
+    readonly_fields = ('city', 'property_type', 'min_price', 'max_price', 'needs_check', 'created_at')
+    ordering = ('-created_at',)
+
+@admin.register(MarketStats)
+class MarketStatsAdmin(admin.ModelAdmin):
+    list_display = ('city', 'property_type', 'bedrooms', 'currency', 'listing_count', 'price_median', 'price_p25', 'price_p75', 'computed_at')
+    list_filter = ('currency', 'property_type', 'bedrooms')
+    search_fields = ('city',)
+    ordering = ('city', 'property_type', 'bedrooms')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'ref_count', 'created_at')
+    search_fields = ('digest', 'name')
+    ordering = ('-created_at',)
+    
+    # Reference counts are maintained by the storage backend only
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(DuplicateListing)
+class DuplicateListingAdmin(admin.ModelAdmin):
+    """Near-duplicate clusters found by properties.dedup, one row per listing, grouped by cluster."""
+    list_display = ('cluster', 'cluster_size', 'property', 'owner', 'city', 'listing_status', 'created_at')
+    list_select_related = ('property__owner',)
+    search_fields = ('property__title', 'property__owner__email', 'cluster')
+    ordering = ('cluster', 'property__created_at')
+    actions = ['deactivate_duplicates']
+    
+    def get_queryset(self, request):
+        cluster_size = ListingFingerprint.objects.filter(
+            cluster=OuterRef('cluster')
+        ).order_by().values('cluster').annotate(count=Count('pk')).values('count')
+        return super().get_queryset(request).annotate(
+            cluster_size=Subquery(cluster_size)
+        ).filter(cluster__isnull=False, cluster_size__gt=1)
+    
+    def cluster_size(self, obj):
+        return obj.cluster_size
+    cluster_size.admin_order_field = 'cluster_size'
+    
+    def owner(self, obj):
+        return obj.property.owner
+    
+    def city(self, obj):
+        return obj.property.city
+    
+    def listing_status(self, obj):
+        return obj.property.listing_status
+    
+    def created_at(self, obj):
+        return obj.property.created_at
+    
+    def deactivate_duplicates(self, request, queryset):
+        # The earliest listing still in each cluster stays up, whichever id the cluster is named after
+        earliest = ListingFingerprint.objects.filter(
+            cluster=OuterRef('cluster')
+        ).order_by('property__created_at', 'property_id').values('property_id')[:1]
+        reposts = queryset.exclude(property_id=Subquery(earliest)).values('property_id')
+        updated = Property.objects.filter(pk__in=reposts).exclude(listing_status='INACTIVE').update(listing_status='INACTIVE')
+        transaction.on_commit(bump_catalogue_version)
+        self.message_user(request, f'{updated} duplicate listing(s) marked as inactive.')
+    deactivate_duplicates.short_description = "Deactivate all but the earliest listing of each cluster"
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
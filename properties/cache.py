@@ -0,0 +1,248 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_VERSION_KEY = 'properties:catalogue_version'
+STATS_KEY = 'properties:cache_stats:{namespace}:{outcome}'
+OUTCOMES = ('local_hits', 'shared_hits', 'misses')
+STATS_FLUSH_SECONDS = 10  # Shared hit/miss counters trail each process by at most this long
+
+
+def get_version(key=CATALOGUE_VERSION_KEY):
+    """Current value of a version counter; cached entries are keyed by it."""
+    try:
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, 1, timeout=None)
+            version = cache.get(key, 1)
+        return version
+    except Exception:
+        logger.warning('Could not read version %s', key, exc_info=True)
+        return None
+
+
+def bump_version(key=CATALOGUE_VERSION_KEY):
+    """Invalidate every entry cached under a version at once, without a key scan."""
+    try:
+        cache.add(key, 1, timeout=None)
+        return cache.incr(key)
+    except Exception:
+        logger.warning('Could not bump version %s', key, exc_info=True)
+        return None
+
+
+def get_catalogue_version():
+    """Current catalogue version; every cached listing response is keyed by it."""
+    return get_version(CATALOGUE_VERSION_KEY)
+
+
+def bump_catalogue_version():
+    """Invalidate every catalogue-versioned cache entry at once."""
+    return bump_version(CATALOGUE_VERSION_KEY)
+
+
+def normalise_query(request, exclude=()):
+    """Stable cache key fragment for a request: sorted params, empty values dropped."""
+    params = []
+    for key in sorted(request.query_params.keys()):
+        if key in exclude:
+            continue
+        values = sorted(value for value in request.query_params.getlist(key) if value != '')
+        params.extend((key, value) for value in values)
+    return f'{request.scheme}://{request.get_host()}{request.path}?{urlencode(params)}'
+
+
+class LocalLRU:
+    """Small thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class VersionedCache:
+    """
+    Two-tier cache whose keys embed a version counter (the catalogue version
+    unless another version_key is given).
+
+    Reads check the in-process LRU first, then the shared Django cache (Redis).
+    Bumping the version makes every older entry unreachable; they then age
+    out of both tiers on their own.
+    """
+
+    def __init__(self, namespace, timeout=None, max_local_entries=None, version_key=CATALOGUE_VERSION_KEY):
+        self.namespace = namespace
+        self.version_key = version_key
+        self.timeout = timeout or settings.PROPERTY_CACHE_TIMEOUT
+        self.local = LocalLRU(max_local_entries or settings.PROPERTY_CACHE_LOCAL_ENTRIES)
+        self.local_stats = dict.fromkeys(OUTCOMES, 0)
+        # Counted in-process and added to the shared counters in one go, so
+        # lookups don't pay an extra Redis round trip each
+        self.pending_stats = dict.fromkeys(OUTCOMES, 0)
+        self.stats_flushed_at = time.monotonic()
+        self.stats_lock = threading.Lock()
+
+    def make_key(self, raw_key, version):
+        digest = hashlib.md5(raw_key.encode('utf-8')).hexdigest()
+        return f'{self.namespace}:v{version}:{digest}'
+
+    def get(self, raw_key):
+        """Return (key, value); value is None on a miss. key is None when caching is unavailable."""
+        version = get_version(self.version_key)
+        if version is None:
+            return None, None
+        key = self.make_key(raw_key, version)
+
+        value = self.local.get(key)
+        if value is not None:
+            self.record('local_hits')
+            return key, value
+
+        try:
+            value = cache.get(key)
+        except Exception:
+            logger.warning('Shared cache read failed for %s', key, exc_info=True)
+            value = None
+
+        if value is not None:
+            self.local.set(key, value, self.timeout)
+            self.record('shared_hits')
+            return key, value
+
+        self.record('misses')
+        return key, None
+
+    def get_many(self, raw_keys):
+        """
+        Return ({raw_key: key}, {raw_key: value}) with one version read and
+        one shared-cache round trip for all keys; misses are left out of the
+        values. Keys are empty when caching is unavailable.
+        """
+        version = get_version(self.version_key)
+        if version is None:
+            return {}, {}
+        keys = {raw_key: self.make_key(raw_key, version) for raw_key in raw_keys}
+
+        values = {}
+        for raw_key, key in keys.items():
+            value = self.local.get(key)
+            if value is not None:
+                values[raw_key] = value
+        self.record('local_hits', len(values))
+
+        missing = {key: raw_key for raw_key, key in keys.items() if raw_key not in values}
+        if missing:
+            try:
+                shared = cache.get_many(list(missing))
+            except Exception:
+                logger.warning('Shared cache read failed for %s', self.namespace, exc_info=True)
+                shared = {}
+            hits = 0
+            for key, raw_key in missing.items():
+                value = shared.get(key)
+                if value is not None:
+                    self.local.set(key, value, self.timeout)
+                    values[raw_key] = value
+                    hits += 1
+            self.record('shared_hits', hits)
+            self.record('misses', len(missing) - hits)
+        return keys, values
+
+    def set(self, key, value):
+        if key is None:
+            return
+        self.local.set(key, value, self.timeout)
+        try:
+            cache.set(key, value, self.timeout)
+        except Exception:
+            logger.warning('Shared cache write failed for %s', key, exc_info=True)
+
+    def set_many(self, entries):
+        """Store {key: value} pairs (keys from get_many) in both tiers."""
+        if not entries:
+            return
+        for key, value in entries.items():
+            self.local.set(key, value, self.timeout)
+        try:
+            cache.set_many(entries, self.timeout)
+        except Exception:
+            logger.warning('Shared cache write failed for %s', self.namespace, exc_info=True)
+
+    def record(self, outcome, count=1):
+        if not count:
+            return
+        with self.stats_lock:
+            self.local_stats[outcome] += count
+            self.pending_stats[outcome] += count
+            if time.monotonic() - self.stats_flushed_at < STATS_FLUSH_SECONDS:
+                return
+        self.flush_stats()
+
+    def flush_stats(self):
+        """Add this process's counts since the last flush to the shared counters."""
+        with self.stats_lock:
+            pending, self.pending_stats = self.pending_stats, dict.fromkeys(OUTCOMES, 0)
+            self.stats_flushed_at = time.monotonic()
+        for outcome, count in pending.items():
+            if not count:
+                continue
+            stats_key = STATS_KEY.format(namespace=self.namespace, outcome=outcome)
+            try:
+                try:
+                    cache.incr(stats_key, count)
+                except ValueError:
+                    # First event for this counter
+                    cache.add(stats_key, count, timeout=None)
+            except Exception:
+                logger.debug('Could not record cache %s', outcome, exc_info=True)
+
+    def stats(self):
+        """Hit/miss counters for this process and across all workers."""
+        self.flush_stats()
+        try:
+            shared = {
+                outcome: cache.get(STATS_KEY.format(namespace=self.namespace, outcome=outcome), 0)
+                for outcome in OUTCOMES
+            }
+        except Exception:
+            shared = None
+        return {
+            'namespace': self.namespace,
+            'process': dict(self.local_stats),
+            'shared': shared,
+        }
+
+
+listing_cache = VersionedCache('property_list')
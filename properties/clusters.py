@@ -0,0 +1,130 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import Avg, CharField, Count, Min, Q
+from django.db.models.functions import Cast, Substr
+from rest_framework.exceptions import ValidationError
+
+from .cache import VersionedCache
+from .geo import cell_size, cells_in_bbox, grid_range
+
+MAX_ZOOM = 20
+MAX_PRECISION = 8
+# Target on-screen width of a cluster cell, in 256px web-map tile pixels
+CELL_PIXELS = 64
+# Clusters are computed and cached per tile: a geohash cell this many characters
+# shorter than the cluster cells, i.e. a block of 32x32 of them
+TILE_LEVELS = 2
+# Upper bound on the tiles one viewport may span
+MAX_TILES = 64
+# Params that change paging, sorting or the viewport but not the clusters of a tile
+CLUSTER_IGNORED_PARAMS = ('bbox', 'zoom', 'near', 'radius_km', 'ordering', 'cursor', 'page_size', 'fields', 'expand')
+
+cluster_cache = VersionedCache('property_clusters', max_local_entries=2048)
+
+
+def parse_zoom(raw):
+    try:
+        zoom = int(raw)
+    except (TypeError, ValueError):
+        raise ValidationError({'zoom': 'A whole number is required.'})
+    if not 0 <= zoom <= MAX_ZOOM:
+        raise ValidationError({'zoom': f'Must be between 0 and {MAX_ZOOM}.'})
+    return zoom
+
+
+def zoom_precision(zoom):
+    """Coarsest geohash precision whose cells are at most CELL_PIXELS wide at a web-map zoom level."""
+    target = 360.0 / (1 << zoom) * CELL_PIXELS / 256
+    for precision in range(1, MAX_PRECISION + 1):
+        if cell_size(precision)[1] <= target:
+            return precision
+    return MAX_PRECISION
+
+
+def tile_precision(precision):
+    return max(precision - TILE_LEVELS, 1)
+
+
+def viewport_tiles(south, west, north, east, precision):
+    """Tiles covering the viewport; raises ValidationError if it spans more than MAX_TILES."""
+    tile = tile_precision(precision)
+    rows, cols = grid_range(south, west, north, east, tile)
+    if len(rows) * len(cols) > MAX_TILES:
+        raise ValidationError({'bbox': 'Too large for this zoom level.'})
+    return cells_in_bbox(south, west, north, east, tile)
+
+
+def compute_tiles(queryset, tiles, precision):
+    """
+    {tile: [cluster, ...]} for the given tiles in one grouped query.
+
+    Listings are bucketed by the first `precision` characters of their
+    geohash, which the geohash index serves as prefix ranges, so only the
+    matching listings are read and only one row per cell comes back.
+    """
+    rows = queryset.filter(
+        reduce(or_, (Q(geohash__startswith=tile) for tile in tiles))
+    ).order_by().annotate(
+        cell=Substr('geohash', 1, precision)
+    ).values('cell').annotate(
+        count=Count('pk'),
+        latitude=Avg('latitude'),
+        longitude=Avg('longitude'),
+        min_price=Min('price_per_month'),
+        first_id=Min(Cast('id', output_field=CharField())),
+    )
+
+    clusters = {tile: [] for tile in tiles}
+    length = len(tiles[0])
+    for row in rows:
+        cluster = {
+            'geohash': row['cell'],
+            'count': row['count'],
+            'latitude': round(float(row['latitude']), 6),
+            'longitude': round(float(row['longitude']), 6),
+            'min_price': str(row['min_price']),
+        }
+        # A single listing can be linked straight from the map
+        if row['count'] == 1:
+            cluster['property_id'] = row['first_id']
+        clusters[row['cell'][:length]].append(cluster)
+    return clusters
+
+
+def viewport_clusters(queryset, query_key, south, west, north, east, zoom):
+    """
+    Clusters of the listings in `queryset` for a map viewport.
+
+    Each tile's clusters are cached under the catalogue version, keyed by
+    the filters in `query_key` and not the exact viewport, so panning or
+    zooming within a precision reuses them; only tiles not seen since the
+    catalogue last changed are computed, all in one query.
+    """
+    precision = zoom_precision(zoom)
+    tiles = viewport_tiles(south, west, north, east, precision)
+
+    raw_keys = {tile: f'{query_key}|{precision}|{tile}' for tile in tiles}
+    keys, cached = cluster_cache.get_many(raw_keys.values())
+    clusters = {tile: cached[raw_key] for tile, raw_key in raw_keys.items() if raw_key in cached}
+
+    missing = [tile for tile in tiles if tile not in clusters]
+    if missing:
+        computed = compute_tiles(queryset, missing, precision)
+        cluster_cache.set_many({keys[raw_keys[tile]]: value for tile, value in computed.items() if raw_keys[tile] in keys})
+        clusters.update(computed)
+
+    # Tiles overhang the viewport; keep clusters centred inside it, or within a cell of its edge
+    lat_step, lng_step = cell_size(precision)
+    visible = [
+        cluster
+        for tile in tiles for cluster in clusters[tile]
+        if south - lat_step <= cluster['latitude'] <= north + lat_step
+        and west - lng_step <= cluster['longitude'] <= east + lng_step
+    ]
+    return {
+        'zoom': zoom,
+        'precision': precision,
+        'count': sum(cluster['count'] for cluster in visible),
+        'clusters': visible,
+    }
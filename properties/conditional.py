@@ -0,0 +1,48 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Strong ETag from the values that determine a response body."""
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return quote_etag(digest)
+
+
+class ConditionalGetMixin:
+    """
+    Answers If-None-Match / If-Modified-Since with 304 Not Modified before
+    any serialization work happens.
+
+    Views implement get_validators(request) returning (etag, last_modified)
+    from a cheap query, call check_not_modified() first, and pass the final
+    response through add_validators(). Collections return last_modified=None:
+    a max() timestamp doesn't move when a row is removed, so only the ETag
+    (which includes the row count) can validate them.
+    """
+
+    def get_validators(self, request):
+        raise NotImplementedError
+
+    def check_not_modified(self, request, etag, last_modified):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+    def add_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Clients may keep the body but must revalidate before reusing it
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        not_modified = self.check_not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        response = super().list(request, *args, **kwargs)
+        return self.add_validators(response, etag, last_modified)
@@ -0,0 +1,248 @@
+import hashlib
+import logging
+import re
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import ListingBucket, ListingFingerprint, Property
+
+logger = logging.getLogger(__name__)
+
+NUM_HASHES = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_HASHES // BANDS
+# With 16 bands of 8 rows, pairs at 0.8 Jaccard share a bucket 95% of the
+# time and pairs at 0.5 only 6%
+DUPLICATE_THRESHOLD = 0.8  # Estimated Jaccard similarity at which candidates count as duplicates
+# Character shingles; unlike word shingles they barely move when a word or two is edited
+SHINGLE_CHARS = 5
+# Bucket groups larger than this are compared against their first member only
+MAX_PAIRWISE_GROUP = 100
+
+# Hash family h(x) = (a*x + b) mod p over 32-bit shingle hashes; a*x + b stays below 2**64
+PRIME = 4294967311  # Smallest prime above 2**32
+_rng = np.random.default_rng(0x5eed)
+HASH_A = _rng.integers(1, 2 ** 31, NUM_HASHES, dtype=np.uint64)
+HASH_B = _rng.integers(0, 2 ** 31, NUM_HASHES, dtype=np.uint64)
+
+
+def listing_text(values):
+    """Lowercased words of the fingerprinted fields, punctuation dropped."""
+    text = ' '.join(str(values.get(field) or '') for field in Property.FINGERPRINT_FIELDS)
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def shingles(text):
+    if len(text) <= SHINGLE_CHARS:
+        return {text}
+    return {text[i:i + SHINGLE_CHARS] for i in range(len(text) - SHINGLE_CHARS + 1)}
+
+
+def minhash(text):
+    """MinHash signature (NUM_HASHES uint32) of the character shingles of `text`."""
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text)), dtype=np.uint64
+    )
+    permuted = (HASH_A[:, None] * hashes[None, :] + HASH_B[:, None]) % PRIME
+    return (permuted.min(axis=1) & 0xFFFFFFFF).astype(np.uint32)
+
+
+def band_keys(signature):
+    """One signed 64-bit bucket key per band."""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + band_rows.tobytes(), digest_size=8).digest(), 'big', signed=True
+        )
+        for band, band_rows in enumerate(signature.reshape(BANDS, ROWS_PER_BAND))
+    ]
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(first == second)) / NUM_HASHES
+
+
+def load_signature(fingerprint):
+    return np.frombuffer(bytes(fingerprint.signature), dtype=np.uint32)
+
+
+def store_fingerprints(rows):
+    """
+    Write fingerprints and LSH buckets for (property_id, values) rows whose
+    text changed since they were last fingerprinted. Returns the property
+    ids that were (re)written.
+    """
+    digests = {}
+    for property_id, values in rows:
+        text = listing_text(values)
+        digests[property_id] = (hashlib.sha256(text.encode('utf-8')).hexdigest(), text)
+
+    stored = dict(
+        ListingFingerprint.objects.filter(property_id__in=digests).values_list('property_id', 'text_digest')
+    )
+    changed = {pk: value for pk, value in digests.items() if stored.get(pk) != value[0]}
+    if not changed:
+        return []
+
+    signatures = {pk: minhash(text) for pk, (_, text) in changed.items()}
+    with transaction.atomic():
+        ListingFingerprint.objects.bulk_create(
+            [
+                ListingFingerprint(property_id=pk, signature=signatures[pk].tobytes(), text_digest=digest)
+                for pk, (digest, _) in changed.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['property'],
+            update_fields=['signature', 'text_digest', 'updated_at'],
+        )
+        ids = dict(ListingFingerprint.objects.filter(property_id__in=changed).values_list('property_id', 'id'))
+        ListingBucket.objects.filter(fingerprint_id__in=ids.values()).delete()
+        ListingBucket.objects.bulk_create(
+            [
+                ListingBucket(fingerprint_id=ids[pk], key=key)
+                for pk, signature in signatures.items() for key in band_keys(signature)
+            ],
+            batch_size=5000,
+        )
+    return list(changed)
+
+
+def find_duplicates(fingerprint):
+    """[(fingerprint, similarity)] of other listings above the threshold, via shared buckets."""
+    signature = load_signature(fingerprint)
+    keys = fingerprint.buckets.values_list('key', flat=True)
+    candidates = ListingFingerprint.objects.filter(buckets__key__in=keys).exclude(pk=fingerprint.pk).distinct()
+    matches = []
+    for candidate in candidates:
+        score = similarity(signature, load_signature(candidate))
+        if score >= DUPLICATE_THRESHOLD:
+            matches.append((candidate, score))
+    return matches
+
+
+def earliest_listing(property_ids):
+    """Id of the earliest listing among `property_ids`, which names their cluster."""
+    return Property.objects.filter(pk__in=property_ids).order_by('created_at', 'id').values_list('id', flat=True).first()
+
+
+def reroot_clusters(clusters):
+    """
+    Rename each cluster after its earliest remaining listing once members
+    have left it or been deleted; a cluster left with one listing is dissolved.
+    """
+    for cluster in set(clusters) - {None}:
+        members = ListingFingerprint.objects.filter(cluster=cluster)
+        property_ids = list(members.values_list('property_id', flat=True))
+        if len(property_ids) < 2:
+            members.update(cluster=None)
+            continue
+        root = earliest_listing(property_ids)
+        if root != cluster:
+            members.update(cluster=root)
+
+
+def index_listings(property_ids):
+    """
+    Fingerprint listings after they were created or edited and join each
+    to the cluster of its near-duplicates. Returns the number of listings
+    found to have duplicates.
+    """
+    rows = [
+        (values['id'], values)
+        for values in Property.objects.filter(pk__in=property_ids).values('id', *Property.FINGERPRINT_FIELDS)
+    ]
+    flagged = 0
+    for fingerprint in ListingFingerprint.objects.filter(property_id__in=store_fingerprints(rows)):
+        matches = [candidate for candidate, _ in find_duplicates(fingerprint)]
+        if not matches:
+            if fingerprint.cluster is not None:
+                ListingFingerprint.objects.filter(pk=fingerprint.pk).update(cluster=None)
+                # The rest of the cluster may have been named after this listing
+                reroot_clusters([fingerprint.cluster])
+            continue
+
+        # Merge every cluster the matches belong to
+        clusters = {match.cluster for match in matches} | {fingerprint.cluster}
+        clusters.discard(None)
+        members = set(ListingFingerprint.objects.filter(cluster__in=clusters).values_list('pk', flat=True))
+        members |= {match.pk for match in matches} | {fingerprint.pk}
+        property_ids = ListingFingerprint.objects.filter(pk__in=members).values_list('property_id', flat=True)
+        ListingFingerprint.objects.filter(pk__in=members).update(cluster=earliest_listing(property_ids))
+        flagged += 1
+    return flagged
+
+
+def recluster():
+    """
+    Recompute every cluster from the buckets: candidates are fingerprints
+    sharing a key, confirmed pairs are merged with union-find. Returns the
+    number of clusters.
+    """
+    shared = ListingBucket.objects.values('key').annotate(size=Count('id')).filter(size__gt=1).values('key')
+    groups = {}
+    for key, fingerprint_id in ListingBucket.objects.filter(key__in=shared).values_list('key', 'fingerprint_id'):
+        groups.setdefault(key, []).append(fingerprint_id)
+
+    involved = {pk for members in groups.values() for pk in members}
+    signatures = {
+        pk: np.frombuffer(bytes(signature), dtype=np.uint32)
+        for pk, signature in ListingFingerprint.objects.filter(pk__in=involved).values_list('pk', 'signature')
+    }
+
+    parent = {}
+
+    def find(pk):
+        root = pk
+        while parent.get(root, root) != root:
+            root = parent[root]
+        parent[pk] = root
+        return root
+
+    for members in groups.values():
+        for i, first in enumerate(members):
+            others = members[i + 1:] if len(members) <= MAX_PAIRWISE_GROUP else (members[1:] if i == 0 else [])
+            for second in others:
+                if find(first) != find(second) and similarity(signatures[first], signatures[second]) >= DUPLICATE_THRESHOLD:
+                    parent[find(second)] = find(first)
+
+    components = {}
+    for pk in involved:
+        components.setdefault(find(pk), []).append(pk)
+    components = [members for members in components.values() if len(members) > 1]
+
+    # Each cluster is named after its earliest listing
+    listings = {
+        pk: (created_at, str(property_id), property_id)
+        for pk, property_id, created_at in ListingFingerprint.objects.filter(pk__in=involved).values_list(
+            'pk', 'property_id', 'property__created_at'
+        )
+    }
+    updates = []
+    for members in components:
+        root = min(listings[pk] for pk in members)[2]
+        updates.extend(ListingFingerprint(pk=pk, cluster=root) for pk in members)
+
+    with transaction.atomic():
+        ListingFingerprint.objects.filter(cluster__isnull=False).update(cluster=None)
+        ListingFingerprint.objects.bulk_update(updates, ['cluster'], batch_size=1000)
+    logger.info('Found %d duplicate clusters covering %d listings', len(components), len(updates))
+    return len(components)
+
+
+def sweep(batch_size=None):
+    """Fingerprint the whole catalogue (unchanged text is skipped) and rebuild all clusters."""
+    batch_size = batch_size or settings.PROPERTY_DEDUP_BATCH_SIZE
+    fingerprinted = 0
+    batch = []
+    for values in Property.objects.order_by().values('id', *Property.FINGERPRINT_FIELDS).iterator(chunk_size=batch_size):
+        batch.append((values['id'], values))
+        if len(batch) >= batch_size:
+            fingerprinted += len(store_fingerprints(batch))
+            batch = []
+    if batch:
+        fingerprinted += len(store_fingerprints(batch))
+    return fingerprinted, recluster()
@@ -0,0 +1,112 @@
+import csv
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+from .models import PropertyAmenity
+
+# Exported columns; everything but the metadata at the end can be fed back to the importer
+EXPORT_FIELDS = (
+    'id', 'title', 'description', 'property_type', 'listing_status', 'price_per_month', 'currency',
+    'address_line1', 'address_line2', 'city', 'state', 'postal_code', 'region', 'latitude', 'longitude',
+    'bedrooms', 'bathrooms', 'square_feet', 'is_furnished', 'pets_allowed', 'available_from',
+    'view_count', 'is_verified', 'created_at', 'updated_at',
+)
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Lets ?format= / Accept pick the export encoding. Successful exports are
+    streamed by the view; only error payloads pass through render().
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode(self.charset)
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class LineBuffer:
+    """File-like target that hands back what csv.writer writes instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def encode_ndjson(rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    return ''.join(encoder.encode(row) + '\n' for row in rows)
+
+
+def encode_csv(rows, writer):
+    return ''.join(
+        writer.writerow([row[field] for field in EXPORT_FIELDS] + [
+            ';'.join(f'{name}:{category}' for name, category in row['amenities'])
+        ])
+        for row in rows
+    )
+
+
+def chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_rows(queryset, chunk_size=None):
+    """
+    Yield lists of export rows (dicts) read through a server-side cursor.
+
+    Amenities are fetched with one query per chunk, so memory stays bounded
+    by the chunk size however many listings there are.
+    """
+    chunk_size = chunk_size or settings.PROPERTY_EXPORT_CHUNK_SIZE
+    rows = queryset.order_by('created_at', 'id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for chunk in chunks(rows, chunk_size):
+        amenities = defaultdict(list)
+        pairs = PropertyAmenity.objects.filter(property_id__in=[row[0] for row in chunk]).order_by(
+            'amenity_name'
+        ).values_list('property_id', 'amenity_name', 'amenity_category')
+        for property_id, name, category in pairs:
+            amenities[property_id].append((name, category))
+
+        export = []
+        for values in chunk:
+            row = dict(zip(EXPORT_FIELDS, values))
+            row['amenities'] = amenities.get(row['id'], [])
+            export.append(row)
+        yield export
+
+
+def stream_export(queryset, fmt, chunk_size=None):
+    """Encoded export text, one piece per chunk of listings (CSV starts with its header)."""
+    if fmt == 'csv':
+        writer = csv.writer(LineBuffer())
+        yield writer.writerow([*EXPORT_FIELDS, 'amenities'])
+        for rows in export_rows(queryset, chunk_size):
+            yield encode_csv(rows, writer)
+        return
+
+    for rows in export_rows(queryset, chunk_size):
+        for row in rows:
+            row['amenities'] = [
+                {'amenity_name': name, 'amenity_category': category} for name, category in row['amenities']
+            ]
+        yield encode_ndjson(rows)
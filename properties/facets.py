@@ -0,0 +1,40 @@
+from collections import Counter
+
+from django.db.models import Count
+
+from .cache import VersionedCache
+
+FACET_FIELDS = ['property_type', 'city', 'bedrooms', 'is_furnished', 'pets_allowed']
+# Params that change paging or sorting but not the matching set
+FACET_IGNORED_PARAMS = ('ordering', 'cursor', 'page_size')
+
+facet_cache = VersionedCache('property_facets')
+
+
+def compute_facets(queryset):
+    """
+    Counts for every facet value in one grouped query.
+
+    The query groups by the combination of all facet fields, which has far
+    fewer rows than the listings themselves; per-facet totals are then summed
+    in Python.
+    """
+    rows = queryset.order_by().values(*FACET_FIELDS).annotate(count=Count('pk'))
+
+    counters = {field: Counter() for field in FACET_FIELDS}
+    total = 0
+    for row in rows:
+        total += row['count']
+        for field in FACET_FIELDS:
+            counters[field][row[field]] += row['count']
+
+    return {
+        'total': total,
+        'facets': {
+            field: [
+                {'value': value, 'count': count}
+                for value, count in sorted(counter.items(), key=lambda item: (-item[1], str(item[0])))
+            ]
+            for field, counter in counters.items()
+        },
+    }
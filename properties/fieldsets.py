@@ -0,0 +1,68 @@
+class FieldSelection:
+    """
+    Which serializer fields a request asked for.
+
+    ?fields=id,title,price_per_month keeps only the named fields (the id is
+    always kept); ?expand=images,amenities adds relations that are left out
+    by default. Unknown names are ignored.
+    """
+
+    def __init__(self, fields=None, expand=()):
+        self.fields = set(fields) | {'id'} if fields is not None else None
+        self.expand = set(expand)
+
+    @classmethod
+    def from_request(cls, request):
+        fields = request.query_params.get('fields')
+        return cls(
+            fields=split_names(fields) if fields else None,
+            expand=split_names(request.query_params.get('expand', '')),
+        )
+
+    def includes(self, name, expandable=False):
+        if name in self.expand:
+            return True
+        if expandable:
+            return False
+        return self.fields is None or name in self.fields
+
+    @property
+    def key(self):
+        """Stable text for cache keys and ETags."""
+        fields = ','.join(sorted(self.fields)) if self.fields is not None else '*'
+        return f'{fields}+{",".join(sorted(self.expand))}'
+
+
+def split_names(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that drops the fields the `selection` in its context
+    leaves out. Names in `expandable_fields` are only emitted when expanded.
+    Nested serializers read the selection of the root serializer's context.
+    """
+    expandable_fields = ()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.context.get('selection') or FieldSelection()
+        return {
+            name: field for name, field in fields.items()
+            if selection.includes(name, expandable=name in self.expandable_fields)
+        }
+
+
+class SparseFieldsetViewMixin:
+    """View mixin passing the request's field selection to its serializers."""
+
+    def get_selection(self):
+        if not hasattr(self, '_selection'):
+            self._selection = FieldSelection.from_request(self.request)
+        return self._selection
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['selection'] = self.get_selection()
+        return context
@@ -0,0 +1,58 @@
+from django.http import HttpRequest, QueryDict
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import generics
+from rest_framework.request import Request
+
+from .geo import PropertyGeoFilter
+from .models import Property
+from .search import PropertySearchFilter, PropertyOrderingFilter
+
+class PropertyFilterMixin:
+    """
+    Filter pipeline of the public property list, shared by every endpoint
+    that answers questions about the same result set.
+    
+    Map queries: ?near=lat,lng&radius_km=5 (sort with ?ordering=distance)
+    or ?bbox=west,south,east,north
+    """
+    queryset = Property.objects.filter(listing_status='ACTIVE')
+    filter_backends = [DjangoFilterBackend, PropertySearchFilter, PropertyGeoFilter, PropertyOrderingFilter]
+    filterset_fields = ['property_type', 'city', 'state', 'bedrooms', 'bathrooms', 'is_furnished', 'pets_allowed']
+    ordering_fields = ['price_per_month', 'created_at', 'view_count', 'distance']
+    ordering = ['-created_at']
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # Filter by price range
+        min_price = self.request.query_params.get('min_price')
+        max_price = self.request.query_params.get('max_price')
+        
+        if min_price:
+            queryset = queryset.filter(price_per_month__gte=min_price)
+        if max_price:
+            queryset = queryset.filter(price_per_month__lte=max_price)
+        
+        return queryset
+
+class PropertyFilterView(PropertyFilterMixin, generics.GenericAPIView):
+    """Runs the list filters outside a request cycle (see filter_properties)."""
+
+def filter_properties(params, queryset=None):
+    """
+    Apply list query parameters (a dict of strings) exactly as
+    GET /api/properties/ would, optionally narrowing `queryset` first.
+    """
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(mutable=True)
+    http_request.GET.update(params)
+    
+    view = PropertyFilterView()
+    view.request = Request(http_request)
+    view.args, view.kwargs, view.format_kwarg = (), {}, None
+    
+    base = view.get_queryset()
+    if queryset is not None:
+        base = base & queryset
+    return view.filter_queryset(base)
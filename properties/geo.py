@@ -0,0 +1,184 @@
+import math
+from functools import reduce
+from operator import or_
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+GEOHASH_PRECISION = 12
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+DEFAULT_RADIUS_KM = 5
+MAX_RADIUS_KM = 100
+# Upper bound on the number of geohash prefixes OR'ed into one query
+MAX_COVER_CELLS = 32
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+
+    while len(chars) < precision:
+        rng, coord = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(lat_degrees, lng_degrees) covered by one geohash cell."""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def grid_range(south, west, north, east, precision):
+    """Row and column ranges of the geohash cells at `precision` that the box touches."""
+    lat_step, lng_step = cell_size(precision)
+    rows = range(math.floor((south + 90) / lat_step), math.floor((north + 90) / lat_step) + 1)
+    cols = range(math.floor((west + 180) / lng_step), math.floor((east + 180) / lng_step) + 1)
+    return rows, cols
+
+
+def cells_in_bbox(south, west, north, east, precision):
+    """Sorted geohashes of the cells at `precision` that the box touches."""
+    lat_step, lng_step = cell_size(precision)
+    rows, cols = grid_range(south, west, north, east, precision)
+    cells = set()
+    for row in rows:
+        for col in cols:
+            # Encode each cell's centre, clamped to valid coordinates
+            lat = min(max(-90 + (row + 0.5) * lat_step, -90.0), 90.0)
+            lng = min(max(-180 + (col + 0.5) * lng_step, -180.0), 180.0)
+            cells.add(encode_geohash(lat, lng, precision))
+    return sorted(cells)
+
+
+def cover_bbox(south, west, north, east, max_cells=MAX_COVER_CELLS):
+    """
+    Geohash prefixes whose cells together cover the bounding box, at the
+    finest precision that needs no more than max_cells of them.
+    """
+    best = None
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        rows, cols = grid_range(south, west, north, east, precision)
+        if len(rows) * len(cols) > max_cells:
+            break
+        best = precision
+
+    if best is None:
+        return []  # Box is too large to prune; caller falls back to a range scan
+
+    return cells_in_bbox(south, west, north, east, best)
+
+
+def bbox_filter(south, west, north, east):
+    """Index-friendly filter for properties inside a bounding box."""
+    condition = Q(
+        latitude__gte=south, latitude__lte=north,
+        longitude__gte=west, longitude__lte=east,
+    )
+    cells = cover_bbox(south, west, north, east)
+    if cells:
+        condition &= reduce(or_, (Q(geohash__startswith=cell) for cell in cells))
+    return condition
+
+
+def haversine_km(latitude, longitude):
+    """Great-circle distance in km from the given point to each row."""
+    lat0 = math.radians(latitude)
+    lng0 = math.radians(longitude)
+    row_lat = Radians(Cast(F('latitude'), FloatField()))
+    row_lng = Radians(Cast(F('longitude'), FloatField()))
+    a = (
+        Power(Sin((row_lat - Value(lat0)) / 2), 2) +
+        Value(math.cos(lat0)) * Cos(row_lat) * Power(Sin((row_lng - Value(lng0)) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a))
+
+
+def parse_floats(raw, count, name):
+    try:
+        values = [float(part) for part in raw.split(',')]
+    except ValueError:
+        values = []
+    if len(values) != count or not all(math.isfinite(v) for v in values):
+        raise ValidationError({name: f'Expected {count} comma-separated numbers.'})
+    return values
+
+
+def parse_bbox(raw):
+    """(south, west, north, east) from a ?bbox=west,south,east,north parameter."""
+    west, south, east, north = parse_floats(raw, 4, 'bbox')
+    if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+        raise ValidationError({'bbox': 'Expected west,south,east,north within valid coordinates.'})
+    return south, west, north, east
+
+
+class PropertyGeoFilter(BaseFilterBackend):
+    """
+    ?near=lat,lng&radius_km=  - properties within radius_km of a point
+    ?bbox=west,south,east,north - properties inside a map viewport
+
+    Both first prune candidates through the geohash index and a lat/lng range,
+    then ?near= applies an exact haversine check and annotates `distance` (km)
+    so results can be sorted with ?ordering=distance.
+    """
+    def filter_queryset(self, request, queryset, view):
+        bbox = request.query_params.get('bbox')
+        near = request.query_params.get('near')
+
+        if bbox:
+            south, west, north, east = parse_bbox(bbox)
+            queryset = queryset.filter(bbox_filter(south, west, north, east))
+
+        if near:
+            latitude, longitude = parse_floats(near, 2, 'near')
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                raise ValidationError({'near': 'Coordinates out of range.'})
+            radius = self.get_radius(request)
+
+            lat_delta = radius / KM_PER_DEGREE_LAT
+            lng_delta = radius / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 0.01))
+            queryset = queryset.filter(bbox_filter(
+                max(latitude - lat_delta, -90), max(longitude - lng_delta, -180),
+                min(latitude + lat_delta, 90), min(longitude + lng_delta, 180),
+            )).annotate(
+                distance=haversine_km(latitude, longitude)
+            ).filter(distance__lte=radius)
+
+        return queryset
+
+    def get_radius(self, request):
+        raw = request.query_params.get('radius_km')
+        if raw is None:
+            return DEFAULT_RADIUS_KM
+        try:
+            radius = float(raw)
+        except ValueError:
+            raise ValidationError({'radius_km': 'A number is required.'})
+        if not 0 < radius <= MAX_RADIUS_KM:
+            raise ValidationError({'radius_km': f'Must be between 0 and {MAX_RADIUS_KM}.'})
+        return radius
@@ -0,0 +1,122 @@
+import hashlib
+import io
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Variant name -> maximum width in pixels. Images are never upscaled.
+VARIANT_WIDTHS = {
+    'thumb': 320,
+    'small': 640,
+    'medium': 1024,
+    'large': 1600,
+}
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# Variant served on listing cards
+CARD_VARIANT = 'small'
+
+
+def load_clean_image(file):
+    """Open an upload, apply its EXIF orientation and drop all metadata."""
+    with Image.open(file) as source:
+        source.load()
+        image = ImageOps.exif_transpose(source)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    image.info = {}
+    return image
+
+
+def encode(image, fmt):
+    pil_format, options = VARIANT_FORMATS[fmt]
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_variants(property_image):
+    """
+    Resize a PropertyImage into VARIANT_WIDTHS in WebP and JPEG, replace the
+    original with a metadata-free copy, and record everything on the row.
+
+    With content-addressed storage, an upload whose bytes were already
+    processed for another image shares that image's files instead.
+    """
+    field = property_image.image_url
+    storage = field.storage
+    original_name = field.name
+    content_addressed = getattr(storage, 'content_addressed', False)
+    previous = property_image.stored_files()
+
+    with storage.open(original_name, 'rb') as file:
+        data = file.read()
+    digest = hashlib.sha256(data).hexdigest()
+
+    twin = None
+    if content_addressed:
+        twin = type(property_image).objects.filter(content_digest=digest).exclude(
+            pk=property_image.pk
+        ).exclude(variants={}).first()
+
+    if twin is not None:
+        storage.retain(twin.stored_files())
+        clean_name, variants = twin.image_url.name, twin.variants
+    else:
+        image = load_clean_image(io.BytesIO(data))
+
+        base = f'property_images/variants/{property_image.pk}'
+        variants = {}
+        for name, max_width in VARIANT_WIDTHS.items():
+            resized = image
+            if image.width > max_width:
+                height = round(image.height * max_width / image.width)
+                resized = image.resize((max_width, height), Image.Resampling.LANCZOS)
+
+            variant = {'width': resized.width, 'height': resized.height}
+            for fmt in VARIANT_FORMATS:
+                extension = 'jpg' if fmt == 'jpeg' else fmt
+                path = f'{base}/{name}.{extension}'
+                if not content_addressed and storage.exists(path):
+                    storage.delete(path)
+                variant[fmt] = storage.save(path, encode(resized, fmt))
+            variants[name] = variant
+
+        # Re-encode the full-size original so EXIF (e.g. GPS) never leaves the server
+        stem, _ = os.path.splitext(os.path.basename(original_name))
+        clean_name = storage.save(f'property_images/{stem}.jpg', encode(image, 'jpeg'))
+
+    if content_addressed:
+        # Every save above took a reference; drop the ones the row held before
+        for name in previous:
+            storage.delete(name)
+    elif clean_name != original_name:
+        storage.delete(original_name)
+
+    property_image.image_url.name = clean_name
+    property_image.thumbnail_url.name = variants['thumb']['jpeg']
+    property_image.variants = variants
+    # Reprocessing reads the clean copy; keep the digest of what was uploaded
+    property_image.content_digest = property_image.content_digest or digest
+    property_image.save(update_fields=['image_url', 'thumbnail_url', 'variants', 'content_digest'])
+    return variants
+
+
+def variant_url(property_image, name=CARD_VARIANT, fmt='webp'):
+    """
+    Storage URL of a variant, falling back to the next larger variant and
+    finally the original while processing has not finished yet.
+    """
+    variants = property_image.variants or {}
+    names = list(VARIANT_WIDTHS)
+    for candidate in names[names.index(name):]:
+        if candidate in variants:
+            return property_image.image_url.storage.url(variants[candidate][fmt])
+    if property_image.image_url:
+        return property_image.image_url.url
+    return None
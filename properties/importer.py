@@ -0,0 +1,219 @@
+import csv
+import json
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from rest_framework import serializers
+from rest_framework.parsers import BaseParser
+
+from .cache import bump_catalogue_version
+from .models import Property, PropertyAmenity
+from .search import property_search_vector
+from .serializers import PropertyCreateUpdateSerializer
+from .tasks import index_listing_fingerprints, match_saved_searches
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('ndjson', 'csv')
+NOT_UTF8 = 'Line is not valid UTF-8.'
+
+
+class InvalidRow(Exception):
+    """Yielded by the readers in place of a record they could not decode."""
+
+
+def decode_lines(stream, bad_lines):
+    """
+    Decode a binary stream line by line. Lines that aren't UTF-8 are decoded
+    with replacement characters and their numbers added to bad_lines, so one
+    bad line can't end the import.
+    """
+    for number, line in enumerate(stream, start=1):
+        try:
+            yield line.decode('utf-8')
+        except UnicodeDecodeError:
+            bad_lines.add(number)
+            yield line.decode('utf-8', errors='replace')
+
+
+def read_ndjson(stream):
+    """Yield (line_number, row) for each non-blank JSON line of a binary stream."""
+    bad_lines = set()
+    for number, line in enumerate(decode_lines(stream, bad_lines), start=1):
+        if number in bad_lines:
+            yield number, InvalidRow(NOT_UTF8)
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as exc:
+            yield number, InvalidRow(f'Invalid JSON: {exc}')
+
+
+def read_csv(stream):
+    """
+    Yield (line_number, row) for each CSV record of a binary stream.
+
+    Empty cells are dropped so model defaults apply, and the amenities column
+    holds "name:CATEGORY" pairs separated by semicolons. Records that are not
+    UTF-8 or not valid CSV are yielded as InvalidRow and reading carries on.
+    """
+    bad_lines = set()
+    reader = csv.DictReader(decode_lines(stream, bad_lines))
+    first_line = 1
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            # DictReader only updates its own line_num on success
+            yield reader.reader.line_num, InvalidRow(f'Invalid CSV: {exc}')
+            first_line = reader.reader.line_num + 1
+            continue
+
+        # A quoted record can span several physical lines
+        lines = range(first_line, reader.line_num + 1)
+        first_line = reader.line_num + 1
+        if bad_lines.intersection(lines):
+            yield reader.line_num, InvalidRow(NOT_UTF8)
+            continue
+
+        row = {key: value for key, value in row.items() if key and value not in ('', None)}
+        amenities = row.pop('amenities', '')
+        if amenities:
+            row['amenities'] = [
+                dict(zip(('amenity_name', 'amenity_category'), (part.strip() for part in item.split(':', 1))))
+                for item in amenities.split(';') if item.strip()
+            ]
+        yield reader.line_num, row
+
+
+def read_rows(stream, fmt):
+    """Decode a binary stream and yield (line_number, row) in the given format."""
+    if fmt == 'csv':
+        return read_csv(stream)
+    return read_ndjson(stream)
+
+
+class NDJSONParser(BaseParser):
+    """Hands the view a lazy row iterator instead of buffering the upload."""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return read_rows(stream, 'ndjson')
+
+
+class CSVParser(BaseParser):
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return read_rows(stream, 'csv')
+
+
+class PropertyImporter:
+    """
+    Validates listing rows in chunks and writes each chunk with bulk_create.
+
+    Rows are validated with PropertyCreateUpdateSerializer, so imports follow the
+    same rules as the create endpoint. Invalid rows are reported and skipped;
+    if a chunk fails in the database it is retried row by row so only the
+    offending rows are lost.
+    """
+
+    def __init__(self, owner, chunk_size=None, max_errors=None):
+        self.owner = owner
+        self.chunk_size = chunk_size or settings.PROPERTY_IMPORT_CHUNK_SIZE
+        self.max_errors = max_errors or settings.PROPERTY_IMPORT_MAX_ERRORS
+        # One serializer instance validates every row, so fields are only built once
+        self.serializer = PropertyCreateUpdateSerializer(context={'owner': owner})
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, rows):
+        """Import (line_number, row) pairs and return a summary."""
+        chunk = []
+        for number, row in rows:
+            validated = self.validate(number, row)
+            if validated is not None:
+                chunk.append((number, validated))
+            if len(chunk) >= self.chunk_size:
+                self.write_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.write_chunk(chunk)
+
+        # bulk_create bypasses the model signals, so invalidate cached listings once here
+        if self.created:
+            transaction.on_commit(bump_catalogue_version)
+
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+    def validate(self, number, row):
+        if isinstance(row, InvalidRow):
+            self.add_error(number, {'non_field_errors': [str(row)]})
+            return None
+        if not isinstance(row, dict):
+            self.add_error(number, {'non_field_errors': ['Each row must be an object.']})
+            return None
+        try:
+            return self.serializer.run_validation(row)
+        except serializers.ValidationError as exc:
+            self.add_error(number, exc.detail)
+            return None
+
+    def add_error(self, number, detail):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': number, 'errors': detail})
+
+    def write_chunk(self, chunk):
+        try:
+            with transaction.atomic():
+                self.insert([validated for _, validated in chunk])
+        except DatabaseError:
+            logger.warning('Bulk insert of %d rows failed, retrying row by row', len(chunk), exc_info=True)
+            for number, validated in chunk:
+                try:
+                    with transaction.atomic():
+                        self.insert([validated])
+                except DatabaseError as exc:
+                    self.add_error(number, {'non_field_errors': [str(exc).strip()]})
+                else:
+                    self.created += 1
+            return
+        self.created += len(chunk)
+
+    def insert(self, rows):
+        properties = []
+        amenities = []
+        for validated in rows:
+            validated = dict(validated)
+            amenity_rows = validated.pop('amenities', [])
+            prop = Property(owner=self.owner, **validated)
+            prop.set_geohash()
+            properties.append(prop)
+            amenities.extend(PropertyAmenity(property=prop, **amenity) for amenity in amenity_rows)
+
+        Property.objects.bulk_create(properties)
+        PropertyAmenity.objects.bulk_create(amenities)
+        # Fill the search documents with one statement per chunk
+        Property.objects.filter(pk__in=[prop.pk for prop in properties]).update(
+            search_vector=property_search_vector()
+        )
+        # Listings created ACTIVE are matched against saved searches once the chunk commits
+        live = [str(prop.pk) for prop in properties if prop.listing_status == 'ACTIVE']
+        if live:
+            transaction.on_commit(lambda: match_saved_searches.delay(live))
+        # bulk_create skips the signal that queues duplicate detection
+        created = [str(prop.pk) for prop in properties]
+        transaction.on_commit(lambda: index_listing_fingerprints.delay(created))
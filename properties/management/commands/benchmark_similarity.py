@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from properties.similarity import PROPERTY_TYPES, SimilarityIndex
+
+AMENITIES = ['wifi', 'parking', 'security', 'generator', 'water tank', 'air conditioning',
+             'balcony', 'gym', 'pool', 'garden', 'cctv', 'washing machine']
+
+
+def synthetic_columns(count, rng):
+    """Random listings shaped like the real catalogue (prices, rooms, a few cities)."""
+    bedrooms = rng.integers(0, 6, count).astype(float)
+    centres = np.array([[5.6037, -0.1870], [6.6885, -1.6244], [4.8962, -1.7554], [9.4034, -0.8424]])
+    centre = centres[rng.integers(0, len(centres), count)]
+    square_feet = np.where(rng.random(count) < 0.3, np.nan, np.maximum(150, 300 + bedrooms * 350 + rng.normal(0, 120, count)))
+    amenities_per_row = rng.integers(0, 6, count)
+    return {
+        'price': np.round(rng.lognormal(7.2, 0.6, count), 2),
+        'bedrooms': bedrooms,
+        'bathrooms': np.maximum(1, bedrooms - rng.integers(0, 2, count)),
+        'square_feet': square_feet,
+        'property_type': np.array(PROPERTY_TYPES, dtype=object)[rng.integers(0, len(PROPERTY_TYPES), count)],
+        'is_furnished': (rng.random(count) < 0.4).astype(float),
+        'pets_allowed': (rng.random(count) < 0.2).astype(float),
+        'latitude': centre[:, 0] + rng.normal(0, 0.05, count),
+        'longitude': centre[:, 1] + rng.normal(0, 0.05, count),
+        'amenity_rows': np.repeat(np.arange(count), amenities_per_row),
+        'amenity_names': np.array(AMENITIES, dtype=object)[rng.integers(0, len(AMENITIES), amenities_per_row.sum())],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Time similarity index builds, top-k queries and incremental updates on synthetic listings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000],
+                            help='Catalogue sizes to benchmark')
+        parser.add_argument('--queries', type=int, default=200, help='Top-k queries timed per size')
+        parser.add_argument('--k', type=int, default=10, help='Neighbours returned per query')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        for size in options['sizes']:
+            columns = synthetic_columns(size, rng)
+            ids = [str(index) for index in range(size)]
+
+            started = time.perf_counter()
+            index = SimilarityIndex(ids, columns)
+            build = time.perf_counter() - started
+
+            timings = []
+            for row in rng.integers(0, size, options['queries']):
+                vector = index.vector_for(ids[row])
+                started = time.perf_counter()
+                index.nearest(vector, options['k'], exclude=[ids[row]])
+                timings.append((time.perf_counter() - started) * 1000)
+
+            changed = synthetic_columns(100, rng)
+            started = time.perf_counter()
+            index.upsert([str(size + offset) for offset in range(50)] + ids[:50], changed)
+            upsert = (time.perf_counter() - started) * 1000
+
+            self.stdout.write(
+                f'{size:>9,} listings  dim={index.encoder.dim}  '
+                f'matrix={index.matrix.nbytes / 2 ** 20:.0f} MiB  build={build:.2f}s  '
+                f'query p50={np.percentile(timings, 50):.1f}ms p95={np.percentile(timings, 95):.1f}ms  '
+                f'upsert(100)={upsert:.1f}ms'
+            )
@@ -0,0 +1,125 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import User
+from properties.models import Property
+from properties.views import PropertyListCreateView
+
+LISTING_INDEXES = [
+    'property_active_created_idx',
+    'property_active_price_idx',
+    'property_active_city_date_idx',
+    'property_active_city_price_idx',
+]
+
+CITIES = ['Accra', 'Kumasi', 'Tamale', 'Takoradi', 'Cape Coast', 'Tema', 'Ho', 'Koforidua', 'Sunyani', 'Wa']
+STATUSES = ['ACTIVE'] * 7 + ['DRAFT', 'RENTED', 'INACTIVE']
+
+
+class Command(BaseCommand):
+    help = (
+        'Print EXPLAIN ANALYZE plans for the property listing queries. '
+        'With --compare the same queries are also planned with the listing '
+        'indexes dropped inside a rolled-back transaction (takes an exclusive '
+        'lock on the table, so never run it against production).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many synthetic listings first')
+        parser.add_argument('--compare', action='store_true',
+                            help='Also show plans without the listing indexes')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query plans are only meaningful on PostgreSQL.')
+
+        if options['seed']:
+            self.seed(options['seed'])
+
+        if not Property.objects.exists():
+            raise CommandError('No listings found; run with --seed N first.')
+
+        if options['compare']:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for name in LISTING_INDEXES:
+                        cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+                self.stdout.write(self.style.MIGRATE_HEADING('=== Without listing indexes ==='))
+                self.explain_all()
+                transaction.set_rollback(True)
+            self.stdout.write(self.style.MIGRATE_HEADING('=== With listing indexes ==='))
+
+        self.explain_all()
+
+    def explain_all(self):
+        cases = [
+            ('Newest listings', {}),
+            ('Cheapest listings', {'ordering': 'price_per_month'}),
+            ('Newest in a city', {'city': 'Kumasi'}),
+            ('Cheapest in a city', {'city': 'Kumasi', 'ordering': 'price_per_month'}),
+            ('Price band in a city', {'city': 'Accra', 'min_price': 500, 'max_price': 1500,
+                                      'ordering': 'price_per_month'}),
+        ]
+        for label, params in cases:
+            sql, sql_params = self.listing_sql(params)
+            self.stdout.write(self.style.SUCCESS(f'\n-- {label} {params or ""}'))
+            with connection.cursor() as cursor:
+                started = time.perf_counter()
+                cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {sql}', sql_params)
+                plan = [row[0] for row in cursor.fetchall()]
+                elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write('\n'.join(plan))
+            self.stdout.write(f'({elapsed:.1f} ms including EXPLAIN overhead)')
+
+    def listing_sql(self, params):
+        """
+        (sql, params) of the list view's main listing query, built from the
+        view's own filter and pagination pipeline. Nothing is dispatched, so
+        neither host validation nor the anonymous response cache gets in the way.
+        """
+        request = Request(APIRequestFactory().get('/api/properties/', params))
+        view = PropertyListCreateView(request=request, args=(), kwargs={}, format_kwarg=None)
+        queryset = view.filter_queryset(view.get_queryset())
+        page = view.paginator.get_page_queryset(queryset, request, view)
+        return page.query.sql_with_params()
+
+    def seed(self, count):
+        owner, _ = User.objects.get_or_create(
+            email='benchmark@smartsquare.local',
+            defaults={'username': 'benchmark', 'full_name': 'Benchmark Owner', 'user_type': 'LANDLORD'}
+        )
+        today = datetime.date.today()
+        batch = []
+        for i in range(count):
+            batch.append(Property(
+                owner=owner,
+                title=f'Benchmark listing {i}',
+                description='Synthetic listing for query plan benchmarks',
+                property_type=random.choice(Property.PROPERTY_TYPE_CHOICES)[0],
+                listing_status=random.choice(STATUSES),
+                price_per_month=random.randint(200, 5000),
+                address_line1=f'{i} Benchmark Road',
+                city=random.choice(CITIES),
+                state='Benchmark',
+                postal_code='00000',
+                region='Benchmark',
+                bedrooms=random.randint(0, 5),
+                bathrooms=random.randint(1, 3),
+                available_from=today,
+            ))
+            if len(batch) == 5000:
+                Property.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Property.objects.bulk_create(batch)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE properties_property')
+        self.stdout.write(self.style.SUCCESS(f'Seeded {count} listings.'))
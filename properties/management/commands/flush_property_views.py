@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from properties.tracking import flush_views
+
+
+class Command(BaseCommand):
+    help = 'Write buffered property views to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Number of buffered views written per transaction')
+
+    def handle(self, *args, **options):
+        written = flush_views(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Flushed {written} property view(s).'))
@@ -0,0 +1,40 @@
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.importer import FORMATS, PropertyImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk import listings for one owner from an NDJSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument('--owner', required=True, help='Email of the owning user')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Input format (defaults to the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows validated and inserted per transaction')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            owner = User.objects.get(email=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['owner']}")
+
+        fmt = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError('Cannot infer the format; pass --format ndjson or --format csv')
+
+        importer = PropertyImporter(owner, chunk_size=options['chunk_size'])
+        with open(options['path'], 'rb') as stream:
+            report = importer.run(read_rows(stream, fmt))
+
+        for error in report['errors']:
+            self.stderr.write(f"Line {error['line']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} properties, {report['failed']} rows failed."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from properties.market import refresh_market_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute rent percentiles and histograms for every market segment'
+
+    def handle(self, *args, **options):
+        written = refresh_market_stats()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} market stats segment(s).'))
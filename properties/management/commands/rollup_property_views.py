@@ -0,0 +1,32 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from properties.rollups import prune_views, rollup_views
+from properties.stats import backfill_activity
+
+
+class Command(BaseCommand):
+    help = 'Roll raw property views up into daily stats, optionally pruning old raw rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=datetime.date.fromisoformat, default=None,
+                            help='First day (YYYY-MM-DD) to recompute; defaults to the last rolled-up day')
+        parser.add_argument('--prune', action='store_true',
+                            help='Delete raw views past PROPERTY_VIEW_RETENTION_DAYS afterwards')
+        parser.add_argument('--retention-days', type=int, default=None,
+                            help='Override the retention window used by --prune')
+        parser.add_argument('--backfill-activity', action='store_true',
+                            help='Rebuild save/application/conversation counters from their tables')
+
+    def handle(self, *args, **options):
+        if options['backfill_activity']:
+            written = backfill_activity()
+            self.stdout.write(self.style.SUCCESS(f'Backfilled {written} activity counter row(s).'))
+
+        written = rollup_views(since=options['since'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} daily view row(s).'))
+
+        if options['prune']:
+            deleted = prune_views(retention_days=options['retention_days'])
+            self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} raw property view(s).'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from properties.dedup import sweep
+
+
+class Command(BaseCommand):
+    help = 'Fingerprint every listing and rebuild the near-duplicate clusters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Listings fingerprinted per batch (default PROPERTY_DEDUP_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        fingerprinted, clusters = sweep(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Fingerprinted {fingerprinted} new or edited listing(s); found {clusters} duplicate cluster(s).'
+        ))
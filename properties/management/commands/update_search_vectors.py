@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from properties.models import Property
+from properties.search import property_search_vector
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Property.search_vector for every listing in primary-key batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Number of properties updated per statement')
+        parser.add_argument('--only-missing', action='store_true',
+                            help='Only fill rows whose search vector is empty')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Property.objects.order_by('pk')
+        if options['only_missing']:
+            queryset = queryset.filter(search_vector__isnull=True)
+
+        updated = 0
+        last_pk = None
+        while True:
+            # Walk the table by primary key so each batch is a short range update
+            batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            pks = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+
+            updated += Property.objects.filter(pk__in=pks).update(search_vector=property_search_vector())
+            last_pk = pks[-1]
+            self.stdout.write(f'Updated {updated} properties...')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search vectors for {updated} properties.'))
@@ -0,0 +1,162 @@
+import logging
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import VersionedCache, bump_version
+from .models import MarketStats, Property
+
+logger = logging.getLogger(__name__)
+
+MARKET_STATS_VERSION_KEY = 'properties:market_stats_version'
+QUANTILES = {
+    'price_p10': 0.10,
+    'price_p25': 0.25,
+    'price_median': 0.50,
+    'price_p75': 0.75,
+    'price_p90': 0.90,
+}
+HISTOGRAM_BINS = 20
+# Segments with fewer listings are too noisy (and too identifying) to publish
+MIN_LISTINGS = 5
+
+# Segment levels: which of (property_type, bedrooms) each level groups by
+LEVELS = (
+    (False, False),
+    (True, False),
+    (False, True),
+    (True, True),
+)
+
+market_cache = VersionedCache('market_stats', version_key=MARKET_STATS_VERSION_KEY)
+
+
+def load_listings():
+    """Segment codes and prices of every ACTIVE listing as NumPy arrays."""
+    rows = list(
+        Property.objects.filter(listing_status='ACTIVE').order_by()
+        .values_list('currency', 'city', 'property_type', 'bedrooms', 'price_per_month')
+        .iterator(chunk_size=10000)
+    )
+    if not rows:
+        return None
+    currencies, cities, types, bedrooms, prices = zip(*rows)
+    labels = {}
+    codes = []
+    for name, values in (('currency', currencies), ('city', cities), ('property_type', types)):
+        labels[name], inverse = np.unique(np.array(values, dtype=object).astype(str), return_inverse=True)
+        codes.append(inverse.ravel())
+    codes.append(np.array(bedrooms, dtype=np.int64))
+    return labels, np.stack(codes, axis=1), np.array(prices, dtype=float)
+
+
+def segment_stats(keys, prices):
+    """
+    Distribution statistics for every distinct row of `keys` at once.
+
+    Prices are sorted within segments by one lexsort, so every quantile of
+    every segment is a vectorised interpolation between two sorted positions;
+    histograms are a single bincount over (segment, bin).
+    """
+    # Pack each key row into one integer so grouping is a 1-D unique
+    offset = keys.min(axis=0)
+    dims = keys.max(axis=0) - offset + 1
+    packed, group = np.unique(np.ravel_multi_index((keys - offset).T, dims), return_inverse=True)
+    segments = np.stack(np.unravel_index(packed, dims), axis=1) + offset
+    group = group.ravel()
+    counts = np.bincount(group, minlength=len(segments))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    ordered = prices[np.lexsort((prices, group))]
+
+    def quantile(q):
+        position = starts + q * (counts - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+    stats = {name: quantile(q) for name, q in QUANTILES.items()}
+    stats['listing_count'] = counts
+    stats['price_min'] = ordered[starts]
+    stats['price_max'] = ordered[starts + counts - 1]
+    stats['price_mean'] = np.bincount(group, weights=prices, minlength=len(segments)) / counts
+
+    # Histogram bins span p5-p95 of each segment; outliers land in the end bins
+    low, high = quantile(0.05), quantile(0.95)
+    width = np.where(high > low, (high - low) / HISTOGRAM_BINS, 1.0)
+    bins = np.clip(np.floor((prices - low[group]) / width[group]).astype(np.int64), 0, HISTOGRAM_BINS - 1)
+    stats['histogram_counts'] = np.bincount(
+        group * HISTOGRAM_BINS + bins, minlength=len(segments) * HISTOGRAM_BINS
+    ).reshape(len(segments), HISTOGRAM_BINS)
+    stats['histogram_edges'] = low[:, None] + width[:, None] * np.arange(HISTOGRAM_BINS + 1)
+    return segments, stats
+
+
+def money(value):
+    return Decimal(f'{value:.2f}')
+
+
+def compute_market_stats(labels, codes, prices, computed_at):
+    """MarketStats rows (unsaved) for every published segment at every level."""
+    rows = []
+    for by_type, by_bedrooms in LEVELS:
+        columns = [0, 1] + ([2] if by_type else []) + ([3] if by_bedrooms else [])
+        segments, stats = segment_stats(codes[:, columns], prices)
+        for index, segment in enumerate(segments):
+            if stats['listing_count'][index] < MIN_LISTINGS:
+                continue
+            segment = dict(zip(columns, segment))
+            rows.append(MarketStats(
+                currency=labels['currency'][segment[0]],
+                city=labels['city'][segment[1]],
+                property_type=labels['property_type'][segment[2]] if by_type else '',
+                bedrooms=int(segment[3]) if by_bedrooms else None,
+                listing_count=int(stats['listing_count'][index]),
+                histogram={
+                    'edges': [float(money(edge)) for edge in stats['histogram_edges'][index]],
+                    'counts': stats['histogram_counts'][index].tolist(),
+                },
+                computed_at=computed_at,
+                **{
+                    name: money(stats[name][index])
+                    for name in ('price_min', 'price_max', 'price_mean', *QUANTILES)
+                },
+            ))
+    return rows
+
+
+def refresh_market_stats():
+    """Recompute all segments from one pass over the listings; returns the row count."""
+    computed_at = timezone.now()
+    loaded = load_listings()
+    rows = compute_market_stats(*loaded, computed_at) if loaded else []
+
+    # Readers keep seeing the previous snapshot until this commits
+    with transaction.atomic():
+        MarketStats.objects.all().delete()
+        MarketStats.objects.bulk_create(rows, batch_size=1000)
+        transaction.on_commit(lambda: bump_version(MARKET_STATS_VERSION_KEY))
+
+    logger.info('Refreshed %d market stats segments', len(rows))
+    return len(rows)
+
+
+def segment_report(city, property_type='', bedrooms=None, currency='GHS'):
+    """
+    The segment row plus its breakdown one level down, or None if the
+    segment is unpublished: per type for a city, per bedroom count for a type.
+    """
+    rows = MarketStats.objects.filter(currency=currency, city=city)
+    segment = rows.filter(property_type=property_type, bedrooms=bedrooms).first()
+    if segment is None:
+        return None, []
+
+    if not property_type:
+        breakdown = rows.exclude(property_type='')
+        breakdown = breakdown.filter(bedrooms=bedrooms) if bedrooms is not None else breakdown.filter(bedrooms__isnull=True)
+    elif bedrooms is None:
+        breakdown = rows.filter(property_type=property_type, bedrooms__isnull=False)
+    else:
+        breakdown = rows.none()
+    return segment, list(breakdown)
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-17 15:33
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+from properties.search import property_search_vector
+
+
+def backfill_search_vector(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    last_pk = None
+    while True:
+        # Walk the table by primary key so each batch is a short range update
+        batch = Property.objects.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        pks = list(batch.values_list('pk', flat=True)[:2000])
+        if not pks:
+            break
+        Property.objects.filter(pk__in=pks).update(search_vector=property_search_vector())
+        last_pk = pks[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0002_propertyview_viewed_at_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
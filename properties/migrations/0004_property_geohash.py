@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-17 15:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+from properties.geo import encode_geohash
+
+
+def backfill_geohash(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    located = Property.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    batch = []
+    for prop in located.only('id', 'latitude', 'longitude').iterator(chunk_size=2000):
+        prop.geohash = encode_geohash(prop.latitude, prop.longitude)
+        batch.append(prop)
+        if len(batch) >= 2000:
+            Property.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    if batch:
+        Property.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0003_property_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-17 15:36
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('properties', '0004_property_geohash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='property',
+            index=models.Index(condition=models.Q(('listing_status', 'ACTIVE')), fields=['-created_at', '-id'], name='property_active_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='property',
+            index=models.Index(condition=models.Q(('listing_status', 'ACTIVE')), fields=['price_per_month', 'id'], name='property_active_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='property',
+            index=models.Index(condition=models.Q(('listing_status', 'ACTIVE')), fields=['city', '-created_at'], name='property_active_city_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='property',
+            index=models.Index(condition=models.Q(('listing_status', 'ACTIVE')), fields=['city', 'price_per_month'], name='property_active_city_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='property',
+            index=models.Index(fields=['owner', '-created_at'], name='property_owner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-17 15:48
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0006_propertyimage_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyViewDaily',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('unique_users', models.PositiveIntegerField(default=0)),
+                ('unique_ips', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Property Daily Views',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='propertyviewdaily',
+            name='property',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='properties.property'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='propertyviewdaily',
+            unique_together={('property', 'date')},
+        ),
+    ]
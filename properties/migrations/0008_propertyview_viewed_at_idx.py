@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-17 15:48
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('properties', '0007_propertyviewdaily'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='propertyview',
+            index=models.Index(fields=['viewed_at'], name='propertyview_viewed_at_idx'),
+        ),
+    ]
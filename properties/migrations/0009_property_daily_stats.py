@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-17 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0008_propertyview_viewed_at_idx'),
+    ]
+
+    operations = [
+        migrations.RenameModel(
+            old_name='PropertyViewDaily',
+            new_name='PropertyDailyStats',
+        ),
+        migrations.AlterModelOptions(
+            name='propertydailystats',
+            options={'ordering': ['-date'], 'verbose_name_plural': 'Property Daily Stats'},
+        ),
+        migrations.AlterField(
+            model_name='propertydailystats',
+            name='property',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='properties.property'),
+        ),
+        migrations.AddField(
+            model_name='propertydailystats',
+            name='saves',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='propertydailystats',
+            name='applications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='propertydailystats',
+            name='conversations',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='propertydailystats',
+            index=models.Index(fields=['date'], name='property_daily_stats_date_idx'),
+        ),
+    ]
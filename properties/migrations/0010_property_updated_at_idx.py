@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-17 16:30
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('properties', '0009_property_daily_stats'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='property',
+            index=models.Index(fields=['updated_at'], name='property_updated_at_idx'),
+        ),
+    ]
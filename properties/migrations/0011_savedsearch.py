@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-17 15:55
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0010_property_updated_at_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('query', models.JSONField(default=dict, help_text='List filter parameters, e.g. {"city": "Accra", "bedrooms": "2"}')),
+                ('city', models.CharField(blank=True, editable=False, max_length=100)),
+                ('property_type', models.CharField(blank=True, editable=False, max_length=20)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True)),
+                ('needs_check', models.BooleanField(default=False, editable=False)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Saved Searches',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('is_active', True)), fields=['city', 'property_type'], name='saved_search_match_idx')],
+            },
+        ),
+    ]
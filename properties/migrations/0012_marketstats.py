@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-17 15:57
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0011_savedsearch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketStats',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('currency', models.CharField(max_length=3)),
+                ('city', models.CharField(max_length=100)),
+                ('property_type', models.CharField(blank=True, max_length=20)),
+                ('bedrooms', models.IntegerField(blank=True, null=True)),
+                ('listing_count', models.PositiveIntegerField()),
+                ('price_min', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_max', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_mean', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_p10', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_p25', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_median', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_p75', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_p90', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('histogram', models.JSONField(default=dict, help_text='Bin edges and listing counts per bin')),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Market Stats',
+                'ordering': ['currency', 'city', 'property_type', 'bedrooms'],
+                'constraints': [models.UniqueConstraint(fields=('currency', 'city', 'property_type', 'bedrooms'), name='market_stats_segment_unique', nulls_distinct=False)],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-17 16:40
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('properties', '0013_storedblob'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='propertyimage',
+            index=models.Index(fields=['content_digest'], name='property_image_digest_idx'),
+        ),
+    ]
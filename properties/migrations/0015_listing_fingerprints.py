@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-17 16:11
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0014_propertyimage_digest_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingFingerprint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('signature', models.BinaryField()),
+                ('text_digest', models.CharField(help_text='SHA-256 of the normalised text the signature was built from', max_length=64)),
+                ('cluster', models.UUIDField(blank=True, db_index=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprint', to='properties.property')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ListingBucket',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('key', models.BigIntegerField(db_index=True)),
+                ('fingerprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='properties.listingfingerprint')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DuplicateListing',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Duplicate Listing',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('properties.listingfingerprint',),
+        ),
+    ]
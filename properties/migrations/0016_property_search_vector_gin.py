@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-17 16:20
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('properties', '0015_listing_fingerprints'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='property_search_vector_gin'),
+        ),
+    ]
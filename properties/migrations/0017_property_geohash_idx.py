@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-17 16:22
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('properties', '0016_property_search_vector_gin'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='property',
+            index=models.Index(fields=['geohash'], name='property_geohash_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -1,6 +1,12 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 import uuid
 
+from .geo import encode_geohash
+from .search import SEARCH_WEIGHTS, property_search_vector
+
 class Property(models.Model):
     PROPERTY_TYPE_CHOICES = [
         ('APARTMENT', 'Apartment'),
@@ -18,6 +24,9 @@ class Property(models.Model):
         ('INACTIVE', 'Inactive'),
     ]
     
+    # Text compared by near-duplicate detection (see properties.dedup)
+    FINGERPRINT_FIELDS = ('title', 'description', 'address_line1', 'city')
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     owner = models.ForeignKey('accounts.User', on_delete=models.CASCADE, related_name='properties')
     title = models.CharField(max_length=255)
@@ -36,6 +45,7 @@ class Property(models.Model):
     region = models.CharField(max_length=100)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, editable=False)
     
     # Property details
     bedrooms = models.IntegerField()
@@ -53,18 +63,87 @@ class Property(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Full-text search document, maintained by save() and update_search_vectors
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Properties'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='property_search_vector_gin'),
+            # Prefix (LIKE 'abc%') lookups for radius and bounding-box search
+            models.Index(fields=['geohash'], name='property_geohash_idx', opclasses=['varchar_pattern_ops']),
+            # Access paths of the public listing: ACTIVE rows sorted by the cursor
+            # pagination keys, optionally narrowed to one city
+            models.Index(fields=['-created_at', '-id'], name='property_active_created_idx',
+                         condition=models.Q(listing_status='ACTIVE')),
+            models.Index(fields=['price_per_month', 'id'], name='property_active_price_idx',
+                         condition=models.Q(listing_status='ACTIVE')),
+            models.Index(fields=['city', '-created_at'], name='property_active_city_date_idx',
+                         condition=models.Q(listing_status='ACTIVE')),
+            models.Index(fields=['city', 'price_per_month'], name='property_active_city_price_idx',
+                         condition=models.Q(listing_status='ACTIVE')),
+            # My properties: one owner's listings, newest first
+            models.Index(fields=['owner', '-created_at'], name='property_owner_created_idx'),
+            # Incremental syncs of in-memory indexes (similar listings) read recent changes
+            models.Index(fields=['updated_at'], name='property_updated_at_idx'),
+        ]
     
     def __str__(self):
         return self.title
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        stored = dict(zip(field_names, values))
+        # Remember the stored status so a save can tell when a listing goes live
+        instance._stored_listing_status = stored.get('listing_status')
+        # ...and the text duplicate detection looks at, to tell when it was edited
+        instance._stored_fingerprint_text = tuple(stored.get(field) for field in cls.FINGERPRINT_FIELDS)
+        return instance
+    
+    @property
+    def went_live(self):
+        """True while saving a listing that was not ACTIVE in the database before."""
+        return self.listing_status == 'ACTIVE' and getattr(self, '_stored_listing_status', None) != 'ACTIVE'
+    
+    @property
+    def fingerprint_text_changed(self):
+        """True while saving a listing whose fingerprinted text differs from the database."""
+        current = tuple(getattr(self, field) for field in self.FINGERPRINT_FIELDS)
+        return getattr(self, '_stored_fingerprint_text', None) != current
+    
+    def set_geohash(self):
+        """Derive geohash from the coordinates (bulk_create callers must call this themselves)."""
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+    
+    def save(self, *args, **kwargs):
+        # Keep the geohash in step with the coordinates
+        update_fields = kwargs.get('update_fields')
+        self.set_geohash()
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        
+        super().save(*args, **kwargs)
+        
+        # Refresh the search document when any indexed text may have changed
+        if update_fields is None or set(update_fields) & set(SEARCH_WEIGHTS):
+            Property.objects.filter(pk=self.pk).update(search_vector=property_search_vector())
+        self._stored_listing_status = self.listing_status
+        self._stored_fingerprint_text = tuple(getattr(self, field) for field in self.FINGERPRINT_FIELDS)
 
 class PropertyImage(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='images')
     image_url = models.ImageField(upload_to='property_images/')
     thumbnail_url = models.ImageField(upload_to='property_thumbnails/', null=True, blank=True)
+    # Resized WebP/JPEG renditions keyed by size name, filled in by the image processing task
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    # SHA-256 of the uploaded bytes, so re-uploads of a processed photo reuse its variants
+    content_digest = models.CharField(max_length=64, blank=True, editable=False)
     display_order = models.IntegerField(default=0)
     is_primary = models.BooleanField(default=False)
     caption = models.CharField(max_length=255, blank=True)
@@ -72,9 +151,19 @@ class PropertyImage(models.Model):
     
     class Meta:
         ordering = ['display_order']
+        indexes = [
+            models.Index(fields=['content_digest'], name='property_image_digest_idx'),
+        ]
     
     def __str__(self):
         return f"{self.property.title} - Image {self.display_order}"
+    
+    def stored_files(self):
+        """Every storage name this row holds a reference to (repeats included)."""
+        names = [self.image_url.name]
+        for variant in (self.variants or {}).values():
+            names.extend(variant[fmt] for fmt in ('webp', 'jpeg'))
+        return [name for name in names if name]
 
 class PropertyAmenity(models.Model):
     AMENITY_CATEGORIES = [
@@ -116,15 +205,48 @@ class PropertyView(models.Model):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='views')
     user = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='property_views')
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    viewed_at = models.DateTimeField(auto_now_add=True)
+    # Set explicitly by the view buffer flush so rows keep the real view time
+    viewed_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['-viewed_at']
+        indexes = [
+            # Rollups and retention both scan by time range
+            models.Index(fields=['viewed_at'], name='propertyview_viewed_at_idx'),
+        ]
     
     def __str__(self):
         viewer = self.user.full_name if self.user else f"Anonymous ({self.ip_address})"
         return f"{viewer} viewed {self.property.title}"
 
+class PropertyDailyStats(models.Model):
+    """
+    Per-property, per-day activity counters behind the listing analytics.
+    
+    View columns are rolled up from PropertyView (raw rows expire); saves,
+    applications and conversations are incremented as they happen.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    unique_users = models.PositiveIntegerField(default=0)
+    unique_ips = models.PositiveIntegerField(default=0)
+    saves = models.PositiveIntegerField(default=0)
+    applications = models.PositiveIntegerField(default=0)
+    conversations = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['property', 'date']
+        indexes = [
+            models.Index(fields=['date'], name='property_daily_stats_date_idx'),
+        ]
+        verbose_name_plural = 'Property Daily Stats'
+    
+    def __str__(self):
+        return f"{self.property.title} - {self.date}: {self.views} views"
+
 
 class PropertyDocument(models.Model):
     DOCUMENT_TYPE_CHOICES = [
@@ -146,4 +268,132 @@ class PropertyDocument(models.Model):
         ordering = ['-uploaded_at']
     
     def __str__(self):
-        return f"{self.property.title} - {self.document_type}"
\ No newline at end of file
+        return f"{self.property.title} - {self.document_type}"
+
+class SavedSearch(models.Model):
+    """
+    A tenant's list filters (the GET /api/properties/ query), re-run against
+    each listing as it goes live.
+    
+    city, property_type and the price bounds are copied out of the query into
+    indexed columns so a new listing finds its candidate searches with one
+    index lookup; blank/null means "any".
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey('accounts.User', on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100, blank=True)
+    query = models.JSONField(default=dict, help_text="List filter parameters, e.g. {\"city\": \"Accra\", \"bedrooms\": \"2\"}")
+    city = models.CharField(max_length=100, blank=True, editable=False)
+    property_type = models.CharField(max_length=20, blank=True, editable=False)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    # Whether the query has filters beyond the indexed columns that need a database check
+    needs_check = models.BooleanField(default=False, editable=False)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    INDEXED_PARAMS = ('city', 'property_type', 'min_price', 'max_price')
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['city', 'property_type'], name='saved_search_match_idx',
+                         condition=models.Q(is_active=True)),
+        ]
+        verbose_name_plural = 'Saved Searches'
+    
+    def __str__(self):
+        return f"{self.user.full_name} - {self.name or 'Saved search'}"
+    
+    def save(self, *args, **kwargs):
+        # Keep the indexed match columns in step with the query
+        self.city = self.query.get('city', '')
+        self.property_type = self.query.get('property_type', '')
+        self.min_price = self.query.get('min_price') or None
+        self.max_price = self.query.get('max_price') or None
+        self.needs_check = any(key not in self.INDEXED_PARAMS for key in self.query)
+        super().save(*args, **kwargs)
+
+class MarketStats(models.Model):
+    """
+    Asking-rent distribution of ACTIVE listings for one market segment.
+    
+    Rows are recomputed in batch (see properties.market). A blank
+    property_type or null bedrooms is the aggregate over all values, so each
+    city has a city-wide row, one per type and one per type and bedroom count.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    currency = models.CharField(max_length=3)
+    city = models.CharField(max_length=100)
+    property_type = models.CharField(max_length=20, blank=True)
+    bedrooms = models.IntegerField(null=True, blank=True)
+    listing_count = models.PositiveIntegerField()
+    price_min = models.DecimalField(max_digits=10, decimal_places=2)
+    price_max = models.DecimalField(max_digits=10, decimal_places=2)
+    price_mean = models.DecimalField(max_digits=10, decimal_places=2)
+    price_p10 = models.DecimalField(max_digits=10, decimal_places=2)
+    price_p25 = models.DecimalField(max_digits=10, decimal_places=2)
+    price_median = models.DecimalField(max_digits=10, decimal_places=2)
+    price_p75 = models.DecimalField(max_digits=10, decimal_places=2)
+    price_p90 = models.DecimalField(max_digits=10, decimal_places=2)
+    histogram = models.JSONField(default=dict, help_text="Bin edges and listing counts per bin")
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['currency', 'city', 'property_type', 'bedrooms']
+        constraints = [
+            models.UniqueConstraint(fields=['currency', 'city', 'property_type', 'bedrooms'],
+                                    nulls_distinct=False, name='market_stats_segment_unique'),
+        ]
+        verbose_name_plural = 'Market Stats'
+    
+    def __str__(self):
+        segment = ' '.join(filter(None, [self.city, self.property_type, f"{self.bedrooms} bed" if self.bedrooms is not None else '']))
+        return f"{segment}: median {self.price_median} {self.currency}"
+
+class StoredBlob(models.Model):
+    """
+    One stored file per distinct content, shared by every file field that
+    holds the same bytes (see properties.storage).
+    
+    ref_count is the number of saves of this content not yet deleted; the
+    file itself is removed when it drops to zero.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+class ListingFingerprint(models.Model):
+    """
+    MinHash signature of a listing's text, used to find reposted listings
+    (see properties.dedup). Listings with the same cluster are near-duplicates;
+    the cluster is the id of the earliest listing among them.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    property = models.OneToOneField(Property, on_delete=models.CASCADE, related_name='fingerprint')
+    signature = models.BinaryField()
+    text_digest = models.CharField(max_length=64, help_text="SHA-256 of the normalised text the signature was built from")
+    cluster = models.UUIDField(null=True, blank=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Fingerprint of {self.property_id}"
+
+class ListingBucket(models.Model):
+    """One LSH band of a fingerprint; listings sharing a key are duplicate candidates."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fingerprint = models.ForeignKey(ListingFingerprint, on_delete=models.CASCADE, related_name='buckets')
+    key = models.BigIntegerField(db_index=True)
+
+class DuplicateListing(ListingFingerprint):
+    """Admin view of the fingerprints that belong to a duplicate cluster."""
+    
+    class Meta:
+        proxy = True
+        verbose_name = 'Duplicate Listing'
@@ -0,0 +1,192 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PropertyCursorPagination(BasePagination):
+    """
+    Keyset pagination over (ordering field, id).
+
+    The cursor holds the sort value and id of the last row on the page, so
+    each page is a single indexed range scan with no OFFSET and no COUNT(*).
+    Rows inserted between requests never shift later pages.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = '-created_at'
+    tiebreaker = 'id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        queryset = self.get_page_queryset(queryset, request, view)
+        cursor = self.cursor
+        reverse = bool(cursor and cursor['reverse'])
+
+        # Fetch one extra row to find out whether another page exists
+        rows = list(queryset)
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        The unevaluated query for one page (plus one look-ahead row), in scan
+        order. Needs no absolute URL, so it can be planned outside a request.
+        """
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        field = self.ordering.lstrip('-')
+        descending = self.ordering.startswith('-')
+        cursor = self.decode_cursor(request, queryset.model, self.get_output_field(queryset, field))
+
+        reverse = bool(cursor and cursor['reverse'])
+        scan_descending = descending != reverse
+        prefix = '-' if scan_descending else ''
+        queryset = queryset.order_by(f'{prefix}{field}', f'{prefix}{self.tiebreaker}')
+
+        if cursor:
+            lookup = 'lt' if scan_descending else 'gt'
+            # The OR alone can't bound an index scan; the redundant lte/gte
+            # gives Postgres a range to start from on deep pages
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}e': cursor['value']}),
+                Q(**{f'{field}__{lookup}': cursor['value']}) |
+                Q(**{field: cursor['value'], f'{self.tiebreaker}__{lookup}': cursor['pk']})
+            )
+
+        self.field = field
+        self.cursor = cursor
+        return queryset[:self.page_size + 1]
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Use the first term of the view's OrderingFilter ordering as the keyset
+        field, falling back to the paginator default.
+        """
+        allowed = set(getattr(view, 'ordering_fields', None) or [])
+        allowed.update(queryset.query.annotations)
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view) or []
+                for term in ordering:
+                    if term.lstrip('-') in allowed:
+                        return term
+        return self.ordering
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        value = getattr(row, self.field)
+        payload = {
+            'o': self.ordering,
+            'v': value.isoformat() if hasattr(value, 'isoformat') else str(value),
+            'p': str(getattr(row, self.tiebreaker)),
+            'r': int(reverse),
+        }
+        token = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(',', ':')).encode('ascii')
+        ).decode('ascii')
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_output_field(self, queryset, field):
+        # Annotated sort keys (e.g. search_rank) have no model field
+        if field in queryset.query.annotations:
+            return queryset.query.annotations[field].output_field
+        return queryset.model._meta.get_field(field)
+
+    def decode_cursor(self, request, model, output_field):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+            # A cursor only makes sense for the ordering it was issued under
+            if payload['o'] != self.ordering:
+                raise ValueError
+            return {
+                'value': output_field.to_python(payload['v']),
+                'pk': model._meta.get_field(self.tiebreaker).to_python(payload['p']),
+                'reverse': bool(payload['r']),
+            }
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_html(self):
+        return ''
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
@@ -0,0 +1,113 @@
+import datetime
+import logging
+
+from django.conf import settings
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import PropertyView, PropertyDailyStats
+
+logger = logging.getLogger(__name__)
+
+# Days before the newest rollup that are recomputed on every run, so views
+# flushed from the buffer after midnight still land in the right day
+LOOKBACK_DAYS = 1
+
+
+def start_of_day(date):
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+
+
+def rollup_start():
+    """
+    First day to (re)compute: just before the newest rolled-up views, or the
+    oldest raw view if it predates every rolled-up day.
+    """
+    # Activity counters also create rows, so only rows carrying views mark rollup progress
+    rolled_up = PropertyDailyStats.objects.filter(views__gt=0).aggregate(first=Min('date'), newest=Max('date'))
+    oldest = PropertyView.objects.aggregate(viewed_at=Min('viewed_at'))['viewed_at']
+    oldest = timezone.localdate(oldest) if oldest is not None else None
+    if rolled_up['newest'] is None:
+        return oldest
+    # Raw views left before the first rolled-up day (e.g. by a --since run) are caught up
+    if oldest is not None and oldest < rolled_up['first']:
+        return oldest
+    return rolled_up['newest'] - datetime.timedelta(days=LOOKBACK_DAYS)
+
+
+def rollup_views(since=None, batch_size=None):
+    """
+    Recompute PropertyDailyStats rows from `since` through today.
+
+    Counts come from one grouped query over the viewed_at range and are
+    upserted, so re-running a day simply overwrites it. Returns the number
+    of daily rows written.
+    """
+    since = since or rollup_start()
+    if since is None:
+        return 0
+    batch_size = batch_size or settings.PROPERTY_VIEW_FLUSH_BATCH_SIZE
+
+    rows = (
+        PropertyView.objects.filter(viewed_at__gte=start_of_day(since))
+        .annotate(date=TruncDate('viewed_at'))
+        .values('property_id', 'date')
+        .annotate(
+            views=Count('id'),
+            unique_users=Count('user', distinct=True),
+            unique_ips=Count('ip_address', distinct=True),
+        )
+        .order_by()
+    )
+
+    written = 0
+    batch = []
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(PropertyDailyStats(**row))
+        if len(batch) >= batch_size:
+            written += upsert_daily(batch)
+            batch = []
+    if batch:
+        written += upsert_daily(batch)
+    return written
+
+
+def upsert_daily(rows):
+    PropertyDailyStats.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['property', 'date'],
+        update_fields=['views', 'unique_users', 'unique_ips'],
+    )
+    return len(rows)
+
+
+def prune_views(retention_days=None, batch_size=None):
+    """
+    Delete raw PropertyView rows older than the retention window.
+
+    Deletes run in short primary-key batches to keep locks and WAL bursts
+    small. The cutoff is a day boundary, so a day's views are kept or
+    deleted as a whole, and never reaches past the days the rollup has
+    already covered. Returns the number of rows deleted.
+    """
+    retention_days = retention_days or settings.PROPERTY_VIEW_RETENTION_DAYS
+    batch_size = batch_size or settings.PROPERTY_VIEW_PRUNE_BATCH_SIZE
+
+    covered = rollup_start()
+    if covered is None:
+        return 0
+    # A partly pruned day would be overwritten with a partial count by a later rollup
+    cutoff = start_of_day(min(timezone.localdate() - datetime.timedelta(days=retention_days), covered))
+
+    queryset = PropertyView.objects.filter(viewed_at__lt=cutoff).order_by('viewed_at')
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        count, _ = PropertyView.objects.filter(pk__in=pks).delete()
+        deleted += count
+        logger.info('Pruned %d property views', deleted)
+    return deleted
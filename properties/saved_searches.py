@@ -0,0 +1,93 @@
+import logging
+from collections import defaultdict
+
+from django.db.models import Q, UUIDField, Value
+
+from notifications.models import Notification
+from .filters import filter_properties
+from .models import Property, SavedSearch
+
+logger = logging.getLogger(__name__)
+
+# List query parameters a saved search may hold (paging and ordering are not filters)
+SEARCH_PARAMS = (
+    'property_type', 'city', 'state', 'bedrooms', 'bathrooms', 'is_furnished', 'pets_allowed',
+    'min_price', 'max_price', 'search', 'near', 'radius_km', 'bbox',
+)
+# Searches checked per UNION ALL statement
+CHECK_CHUNK_SIZE = 200
+
+
+def candidate_searches(prop):
+    """
+    Active searches whose indexed columns admit `prop`: the inverted-index
+    step, answered from saved_search_match_idx instead of scanning every search.
+    """
+    return SavedSearch.objects.filter(
+        is_active=True,
+        city__in=['', prop.city],
+        property_type__in=['', prop.property_type],
+    ).filter(
+        Q(min_price__isnull=True) | Q(min_price__lte=prop.price_per_month),
+        Q(max_price__isnull=True) | Q(max_price__gte=prop.price_per_month),
+    ).exclude(user_id=prop.owner_id).order_by()
+
+
+def check_searches(prop, searches):
+    """
+    Ids of `searches` whose full query matches `prop`, using the list
+    endpoint's own filter pipeline. All checks for a chunk of searches run as
+    one UNION ALL statement.
+    """
+    matched = set()
+    for start in range(0, len(searches), CHECK_CHUNK_SIZE):
+        parts = [
+            filter_properties(search.query, Property.objects.filter(pk=prop.pk))
+            .order_by()
+            .annotate(saved_search_id=Value(search.pk, output_field=UUIDField()))
+            .values_list('saved_search_id', flat=True)
+            for search in searches[start:start + CHECK_CHUNK_SIZE]
+        ]
+        matched.update(parts[0].union(*parts[1:], all=True))
+    return matched
+
+
+def matching_searches(prop):
+    """All active saved searches (of other users) that `prop` satisfies."""
+    candidates = list(candidate_searches(prop))
+    # Searches made only of indexed filters are already known to match
+    matched = [search for search in candidates if not search.needs_check]
+    to_check = [search for search in candidates if search.needs_check]
+    if to_check:
+        ids = check_searches(prop, to_check)
+        matched.extend(search for search in to_check if search.pk in ids)
+    return matched
+
+
+def notify_matches(property_ids):
+    """
+    Match newly live listings against saved searches and notify each
+    matching user once per listing. Returns the number of notifications.
+    """
+    notifications = []
+    for prop in Property.objects.filter(pk__in=property_ids, listing_status='ACTIVE'):
+        by_user = defaultdict(list)
+        for search in matching_searches(prop):
+            by_user[search.user_id].append(search)
+
+        for user_id, searches in by_user.items():
+            names = ', '.join(f'"{search.name}"' for search in searches if search.name)
+            notifications.append(Notification(
+                user_id=user_id,
+                notification_type='SAVED_SEARCH_MATCH',
+                title='New listing matches your saved search',
+                message=f'"{prop.title}" in {prop.city} matches {names or "one of your saved searches"}.',
+                metadata={
+                    'property_id': str(prop.pk),
+                    'saved_search_ids': [str(search.pk) for search in searches],
+                },
+            ))
+
+    Notification.objects.bulk_create(notifications, batch_size=1000)
+    logger.info('Created %d saved search notifications for %d listings', len(notifications), len(property_ids))
+    return len(notifications)
@@ -0,0 +1,59 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from rest_framework import filters
+
+SEARCH_CONFIG = 'english'
+
+# Field -> ts weight. Title matches outrank city, which outrank body text.
+SEARCH_WEIGHTS = {
+    'title': 'A',
+    'city': 'B',
+    'description': 'C',
+    'address_line1': 'D',
+}
+
+
+def property_search_vector():
+    """Weighted tsvector expression stored in Property.search_vector."""
+    vector = None
+    for field, weight in SEARCH_WEIGHTS.items():
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+class PropertySearchFilter(filters.SearchFilter):
+    """
+    ?search= backed by the GIN-indexed Property.search_vector column.
+
+    Matching rows are annotated with search_rank (ts_rank, cast to double so
+    it survives a round trip through a pagination cursor unchanged).
+    """
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        query = SearchQuery(' '.join(terms), config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        )
+
+
+class PropertyOrderingFilter(filters.OrderingFilter):
+    """Orders search results by relevance unless the client asks otherwise."""
+    # Sort keys that exist only when another filter has annotated them
+    annotated_fields = ('distance', 'search_rank')
+    
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        ordering = super().remove_invalid_fields(queryset, fields, view, request)
+        return [
+            term for term in ordering
+            if term.lstrip('-') not in self.annotated_fields or term.lstrip('-') in queryset.query.annotations
+        ]
+    
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param) and 'search_rank' in queryset.query.annotations:
+            return ['-search_rank']
+        return super().get_ordering(request, queryset, view)
@@ -1,15 +1,38 @@
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from rest_framework import serializers
+from .cache import bump_catalogue_version
+from .fieldsets import FieldSelection, SparseFieldsetMixin
+from .filters import filter_properties
+from .images import CARD_VARIANT, VARIANT_FORMATS, variant_url
 from .models import (
     Property, PropertyImage, PropertyAmenity, 
-    PropertyDocument, SavedProperty, PropertyView
+    PropertyDocument, SavedProperty, PropertyView, SavedSearch, MarketStats
 )
+from .saved_searches import SEARCH_PARAMS
+from .uploads import UPLOAD_CONTENT_TYPES
 
 class PropertyImageSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+    
     class Meta:
         model = PropertyImage
-        fields = ('id', 'image_url', 'thumbnail_url', 'display_order', 
+        fields = ('id', 'image_url', 'thumbnail_url', 'variants', 'display_order', 
                   'is_primary', 'caption', 'uploaded_at')
-        read_only_fields = ('id', 'uploaded_at')
+        read_only_fields = ('id', 'thumbnail_url', 'uploaded_at')
+    
+    def get_variants(self, obj):
+        request = self.context.get('request')
+        storage = obj.image_url.storage
+        variants = {}
+        for name, variant in (obj.variants or {}).items():
+            urls = {fmt: storage.url(variant[fmt]) for fmt in VARIANT_FORMATS}
+            if request:
+                urls = {fmt: request.build_absolute_uri(url) for fmt, url in urls.items()}
+            variants[name] = {'width': variant['width'], 'height': variant['height'], **urls}
+        return variants
 
 class PropertyAmenitySerializer(serializers.ModelSerializer):
     class Meta:
@@ -24,32 +47,69 @@ class PropertyDocumentSerializer(serializers.ModelSerializer):
                   'is_required_for_verification', 'uploaded_at')
         read_only_fields = ('id', 'uploaded_at')
 
-class PropertyListSerializer(serializers.ModelSerializer):
-    """Brief serializer for property listings"""
+class PropertyListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Brief serializer for property listings (?fields= / ?expand=images,amenities)"""
     owner_name = serializers.CharField(source='owner.full_name', read_only=True)
     primary_image = serializers.SerializerMethodField()
     amenities_count = serializers.SerializerMethodField()
+    images = PropertyImageSerializer(many=True, read_only=True)
+    amenities = PropertyAmenitySerializer(many=True, read_only=True)
+    
+    expandable_fields = ('images', 'amenities')
     
     class Meta:
         model = Property
         fields = ('id', 'title', 'property_type', 'listing_status', 'price_per_month', 
                   'currency', 'city', 'state', 'bedrooms', 'bathrooms', 'is_furnished',
                   'pets_allowed', 'owner_name', 'primary_image', 'view_count', 
-                  'is_verified', 'amenities_count', 'created_at')
+                  'is_verified', 'amenities_count', 'created_at', 'images', 'amenities')
+    
+    @staticmethod
+    def setup_eager_loading(queryset, selection=None):
+        """
+        Load everything this serializer reads in a fixed number of queries:
+        the amenity count as a subquery and the primary image via one prefetch.
+        Relations of fields the selection leaves out are not loaded at all.
+        """
+        selection = selection or FieldSelection()
+        if selection.includes('owner_name'):
+            queryset = queryset.select_related('owner')
+        if selection.includes('amenities_count'):
+            amenity_count = PropertyAmenity.objects.filter(
+                property=OuterRef('pk')
+            ).order_by().values('property').annotate(count=Count('pk')).values('count')
+            queryset = queryset.annotate(
+                amenity_count=Coalesce(Subquery(amenity_count, output_field=IntegerField()), 0)
+            )
+        if selection.includes('primary_image'):
+            queryset = queryset.prefetch_related(
+                Prefetch('images', queryset=PropertyImage.objects.filter(is_primary=True), to_attr='primary_images')
+            )
+        for relation in ('images', 'amenities'):
+            if selection.includes(relation, expandable=True):
+                queryset = queryset.prefetch_related(relation)
+        return queryset
     
     def get_primary_image(self, obj):
-        primary = obj.images.filter(is_primary=True).first()
+        if hasattr(obj, 'primary_images'):
+            primary = obj.primary_images[0] if obj.primary_images else None
+        else:
+            primary = obj.images.filter(is_primary=True).first()
         if primary:
+            # Card-sized WebP once processed, the original until then
             request = self.context.get('request')
-            if request and primary.image_url:
-                return request.build_absolute_uri(primary.image_url.url)
+            url = variant_url(primary, CARD_VARIANT)
+            if request and url:
+                return request.build_absolute_uri(url)
         return None
     
     def get_amenities_count(self, obj):
+        if hasattr(obj, 'amenity_count'):
+            return obj.amenity_count
         return obj.amenities.count()
 
-class PropertyDetailSerializer(serializers.ModelSerializer):
-    """Detailed serializer for single property view"""
+class PropertyDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Detailed serializer for single property view (?fields=)"""
     owner_name = serializers.CharField(source='owner.full_name', read_only=True)
     owner_email = serializers.EmailField(source='owner.email', read_only=True)
     owner_phone = serializers.CharField(source='owner.phone_number', read_only=True)
@@ -60,21 +120,30 @@ class PropertyDetailSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Property
-        fields = '__all__'
+        exclude = ('search_vector',)
         read_only_fields = ('id', 'owner', 'view_count', 'is_verified', 
                            'verified_by', 'verified_at', 'created_at', 'updated_at')
+    
+    @staticmethod
+    def setup_eager_loading(queryset, selection=None):
+        """Prefetch only the child lists the selection includes."""
+        selection = selection or FieldSelection()
+        return queryset.prefetch_related(*(
+            relation for relation in ('images', 'amenities', 'documents') if selection.includes(relation)
+        ))
 
 class PropertyCreateUpdateSerializer(serializers.ModelSerializer):
     amenities = PropertyAmenitySerializer(many=True, required=False)
     
     class Meta:
         model = Property
-        exclude = ('owner', 'view_count', 'is_verified', 'verified_by', 'verified_at')
+        exclude = ('owner', 'view_count', 'is_verified', 'verified_by', 'verified_at', 'search_vector')
     
     def validate(self, attrs):
         # Only verified owners can set status to ACTIVE
         request = self.context.get('request')
-        if request and not request.user.is_verified:
+        user = request.user if request else self.context.get('owner')
+        if user and not user.is_verified:
             if attrs.get('listing_status') == 'ACTIVE':
                 raise serializers.ValidationError({
                     "listing_status": "You must be a verified property owner to activate listings."
@@ -86,27 +155,66 @@ class PropertyCreateUpdateSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         property_obj = Property.objects.create(owner=user, **validated_data)
         
-        # Create amenities
-        for amenity_data in amenities_data:
-            PropertyAmenity.objects.create(property=property_obj, **amenity_data)
+        # Create amenities in one insert
+        PropertyAmenity.objects.bulk_create(
+            PropertyAmenity(property=property_obj, **amenity_data) for amenity_data in amenities_data
+        )
         
         return property_obj
     
+    @transaction.atomic
     def update(self, instance, validated_data):
         amenities_data = validated_data.pop('amenities', None)
         
-        # Update property fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        # Update property fields, writing only the ones that changed
+        changed = [attr for attr, value in validated_data.items() if getattr(instance, attr) != value]
+        for attr in changed:
+            setattr(instance, attr, validated_data[attr])
+        if changed:
+            instance.save(update_fields=changed + ['updated_at'])
         
         # Update amenities if provided
-        if amenities_data is not None:
-            instance.amenities.all().delete()
-            for amenity_data in amenities_data:
-                PropertyAmenity.objects.create(property=instance, **amenity_data)
+        if amenities_data is not None and self.sync_amenities(instance, amenities_data):
+            # sync_amenities bypasses the model signals: refresh the ETag and cached lists once here
+            if not changed:
+                instance.updated_at = timezone.now()
+                Property.objects.filter(pk=instance.pk).update(updated_at=instance.updated_at)
+            transaction.on_commit(bump_catalogue_version)
         
         return instance
+    
+    def sync_amenities(self, instance, amenities_data):
+        """Apply the (name, category) set difference; returns True if anything changed."""
+        wanted = {(a['amenity_name'], a['amenity_category']) for a in amenities_data}
+        
+        existing = {}
+        stale = []
+        for pk, name, category in instance.amenities.values_list('pk', 'amenity_name', 'amenity_category'):
+            if (name, category) in wanted and (name, category) not in existing:
+                existing[(name, category)] = pk
+            else:
+                stale.append(pk)
+        
+        missing = wanted - existing.keys()
+        if stale:
+            # One DELETE without per-row post_delete touches and version bumps; nothing cascades from amenities
+            stale_rows = PropertyAmenity.objects.filter(pk__in=stale)
+            stale_rows._raw_delete(stale_rows.db)
+        if missing:
+            PropertyAmenity.objects.bulk_create(
+                PropertyAmenity(property=instance, amenity_name=name, amenity_category=category)
+                for name, category in sorted(missing)
+            )
+        return bool(stale or missing)
+
+class ImageUploadRequestSerializer(serializers.Serializer):
+    content_type = serializers.ChoiceField(choices=sorted(UPLOAD_CONTENT_TYPES))
+    display_order = serializers.IntegerField(default=0)
+    is_primary = serializers.BooleanField(default=False)
+    caption = serializers.CharField(max_length=255, allow_blank=True, default='')
+
+class ImageUploadCompleteSerializer(serializers.Serializer):
+    upload_token = serializers.CharField()
 
 class SavedPropertySerializer(serializers.ModelSerializer):
     property_details = PropertyListSerializer(source='property', read_only=True)
@@ -121,8 +229,48 @@ class SavedPropertySerializer(serializers.ModelSerializer):
         validated_data['user'] = user
         return super().create(validated_data)
 
+class SavedPropertyBulkSerializer(serializers.Serializer):
+    property_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=200)
+    
+    def validate_property_ids(self, value):
+        # Keep request order, drop repeats
+        return list(dict.fromkeys(value))
+
 class PropertyViewSerializer(serializers.ModelSerializer):
     class Meta:
         model = PropertyView
         fields = ('id', 'property', 'user', 'ip_address', 'viewed_at')
-        read_only_fields = ('id', 'user', 'viewed_at')
\ No newline at end of file
+        read_only_fields = ('id', 'user', 'viewed_at')
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SavedSearch
+        fields = ('id', 'name', 'query', 'is_active', 'created_at')
+        read_only_fields = ('id', 'created_at')
+    
+    def validate_query(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Expected an object of list filter parameters.")
+        unknown = sorted(set(value) - set(SEARCH_PARAMS))
+        if unknown:
+            raise serializers.ValidationError(f"Unsupported parameters: {', '.join(unknown)}.")
+        
+        # Same normalisation as list queries: strings only, empty values dropped
+        query = {key: str(val) for key, val in value.items() if val not in ('', None)}
+        if not query:
+            raise serializers.ValidationError("At least one filter is required.")
+        for key in ('min_price', 'max_price'):
+            if key in query:
+                try:
+                    query[key] = str(serializers.DecimalField(max_digits=10, decimal_places=2).to_internal_value(query[key]))
+                except serializers.ValidationError:
+                    raise serializers.ValidationError({key: "A valid number is required."})
+        
+        # Reject anything the list endpoint itself would reject
+        str(filter_properties(query).query)
+        return query
+
+class MarketStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MarketStats
+        exclude = ('id',)
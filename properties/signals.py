@@ -0,0 +1,98 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.models import User
+from applications.models import PropertyApplication
+from messaging.models import Conversation
+from verification.models import VerificationDocument
+from .cache import bump_catalogue_version
+from .dedup import reroot_clusters
+from .models import ListingFingerprint, Property, PropertyImage, PropertyAmenity, PropertyDocument, SavedProperty
+from .stats import increment
+from .storage import release_files
+from .tasks import index_listing_fingerprints, match_saved_searches
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_save, sender=PropertyAmenity)
+@receiver(post_delete, sender=PropertyAmenity)
+def invalidate_listing_caches(sender, **kwargs):
+    """Any catalogue change makes all cached listing responses stale."""
+    # Bumping before commit would let a concurrent read cache the old rows under the new version
+    transaction.on_commit(bump_catalogue_version)
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_save, sender=PropertyAmenity)
+@receiver(post_delete, sender=PropertyAmenity)
+@receiver(post_save, sender=PropertyDocument)
+@receiver(post_delete, sender=PropertyDocument)
+def touch_parent_property(sender, instance, **kwargs):
+    """Child rows are part of the property payload, so they move its updated_at (and ETag)."""
+    Property.objects.filter(pk=instance.property_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=SavedProperty)
+def count_save(sender, instance, created, **kwargs):
+    if created:
+        increment(instance.property_id, 'saves')
+
+
+@receiver(post_save, sender=PropertyApplication)
+def count_application(sender, instance, created, **kwargs):
+    if created:
+        increment(instance.property_id, 'applications')
+
+
+@receiver(post_save, sender=Conversation)
+def count_conversation(sender, instance, created, **kwargs):
+    if created and instance.property_id:
+        increment(instance.property_id, 'conversations')
+
+
+@receiver(post_save, sender=Property)
+def queue_saved_search_matching(sender, instance, **kwargs):
+    """Match a listing against saved searches once, when it becomes ACTIVE."""
+    # Property.save() records the new status only after post_save has run
+    if instance.went_live:
+        property_id = str(instance.pk)
+        transaction.on_commit(lambda: match_saved_searches.delay([property_id]))
+
+
+@receiver(post_save, sender=Property)
+def queue_duplicate_check(sender, instance, **kwargs):
+    """Fingerprint a listing for near-duplicate detection when its text is new or edited."""
+    # Property.save() records the new text only after post_save has run
+    if instance.fingerprint_text_changed:
+        property_id = str(instance.pk)
+        transaction.on_commit(lambda: index_listing_fingerprints.delay([property_id]))
+
+
+@receiver(post_delete, sender=ListingFingerprint)
+def reroot_duplicate_cluster(sender, instance, **kwargs):
+    """A deleted listing may have named its cluster; hand the name to the next earliest member."""
+    if instance.cluster is not None:
+        reroot_clusters([instance.cluster])
+
+
+@receiver(post_delete, sender=PropertyImage)
+def release_image_files(sender, instance, **kwargs):
+    """Deduplicated blobs are shared, so deleting a row only drops its references."""
+    release_files(instance.stored_files(), instance.image_url.storage)
+
+
+@receiver(post_delete, sender=PropertyDocument)
+@receiver(post_delete, sender=VerificationDocument)
+def release_document_file(sender, instance, **kwargs):
+    release_files([instance.document_url.name], instance.document_url.storage)
+
+
+@receiver(post_delete, sender=User)
+def release_profile_picture(sender, instance, **kwargs):
+    release_files([instance.profile_picture.name], instance.profile_picture.storage)
@@ -0,0 +1,335 @@
+import datetime
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .cache import VersionedCache, get_catalogue_version
+from .models import Property, PropertyAmenity
+
+logger = logging.getLogger(__name__)
+
+PROPERTY_TYPES = [value for value, _ in Property.PROPERTY_TYPE_CHOICES]
+AMENITY_VOCAB_SIZE = 32  # Most common amenity names that get their own bit
+GEO_SCALE_KM = 10.0  # Distance that counts as one unit of location difference
+KM_PER_DEGREE = 111.0
+# Refreshes re-read listings touched this long before the previous sync, so
+# rows committed late with an earlier updated_at are not missed
+WATERMARK_SLACK = datetime.timedelta(minutes=1)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# How much each feature group contributes to the distance
+FEATURE_WEIGHTS = {
+    'price': 3.0,
+    'bedrooms': 2.0,
+    'bathrooms': 1.0,
+    'square_feet': 1.0,
+    'location': 2.0,
+    'property_type': 2.0,
+    'is_furnished': 0.5,
+    'pets_allowed': 0.5,
+    'amenities': 0.25,
+}
+NUMERIC = ('price', 'bedrooms', 'bathrooms', 'square_feet')
+
+LOAD_FIELDS = (
+    'id', 'price_per_month', 'bedrooms', 'bathrooms', 'square_feet', 'property_type',
+    'is_furnished', 'pets_allowed', 'latitude', 'longitude',
+)
+
+
+def load_columns(queryset):
+    """
+    Read the feature columns of `queryset` as NumPy arrays.
+
+    Returns (ids, columns). Amenities come back as parallel (row index, name)
+    arrays so encoding never loops per listing.
+    """
+    rows = list(queryset.order_by().values_list(*LOAD_FIELDS))
+    ids = [str(row[0]) for row in rows]
+    columns = {
+        'price': np.array([row[1] for row in rows], dtype=float),
+        'bedrooms': np.array([row[2] for row in rows], dtype=float),
+        'bathrooms': np.array([row[3] for row in rows], dtype=float),
+        'square_feet': np.array([row[4] for row in rows], dtype=float),
+        'property_type': np.array([row[5] for row in rows], dtype=object),
+        'is_furnished': np.array([row[6] for row in rows], dtype=float),
+        'pets_allowed': np.array([row[7] for row in rows], dtype=float),
+        'latitude': np.array([row[8] for row in rows], dtype=float),
+        'longitude': np.array([row[9] for row in rows], dtype=float),
+    }
+
+    position = {pk: index for index, pk in enumerate(ids)}
+    pairs = PropertyAmenity.objects.filter(property__in=queryset.order_by().values('pk')).values_list(
+        'property_id', 'amenity_name'
+    )
+    amenity_rows, amenity_names = [], []
+    for property_id, name in pairs.iterator(chunk_size=10000):
+        index = position.get(str(property_id))
+        if index is not None:
+            amenity_rows.append(index)
+            amenity_names.append(name.strip().lower())
+    columns['amenity_rows'] = np.array(amenity_rows, dtype=np.int64)
+    columns['amenity_names'] = np.array(amenity_names, dtype=object)
+    return ids, columns
+
+
+class FeatureEncoder:
+    """
+    Turns listing columns into weighted, standardised float32 vectors.
+
+    Scaling statistics and the amenity vocabulary are fixed when the encoder
+    is fitted, so rows encoded later stay comparable with the matrix.
+    """
+
+    def __init__(self, columns):
+        self.stats = {}
+        for name in NUMERIC:
+            values = self.transform_numeric(name, columns[name])
+            mean = np.nanmean(values) if np.isfinite(values).any() else 0.0
+            std = np.nanstd(values) if np.isfinite(values).any() else 1.0
+            self.stats[name] = (float(mean), float(std) or 1.0)
+
+        latitude = columns['latitude']
+        self.origin = (
+            float(np.nanmean(latitude)) if np.isfinite(latitude).any() else 0.0,
+            float(np.nanmean(columns['longitude'])) if np.isfinite(columns['longitude']).any() else 0.0,
+        )
+
+        names, counts = np.unique(columns['amenity_names'].astype(str), return_counts=True)
+        top = names[np.argsort(-counts, kind='stable')][:AMENITY_VOCAB_SIZE]
+        self.amenities = {name: index for index, name in enumerate(top)}
+
+        self.types = {name: index for index, name in enumerate(PROPERTY_TYPES)}
+        self.dim = len(NUMERIC) + 2 + len(self.types) + 2 + len(self.amenities)
+
+    @staticmethod
+    def transform_numeric(name, values):
+        # Prices and floor areas are compared on a log scale
+        if name in ('price', 'square_feet'):
+            return np.log1p(np.maximum(values, 0))
+        return values
+
+    def encode(self, columns):
+        count = len(columns['price'])
+        matrix = np.zeros((count, self.dim), dtype=np.float32)
+
+        for offset, name in enumerate(NUMERIC):
+            mean, std = self.stats[name]
+            values = (self.transform_numeric(name, columns[name]) - mean) / std
+            # Missing values sit at the mean, i.e. neither near nor far
+            matrix[:, offset] = np.nan_to_num(values) * FEATURE_WEIGHTS[name]
+        offset = len(NUMERIC)
+
+        lat0, lng0 = self.origin
+        north = (columns['latitude'] - lat0) * KM_PER_DEGREE
+        east = (columns['longitude'] - lng0) * KM_PER_DEGREE * np.cos(np.radians(lat0))
+        weight = FEATURE_WEIGHTS['location'] / GEO_SCALE_KM
+        matrix[:, offset] = np.nan_to_num(north) * weight
+        matrix[:, offset + 1] = np.nan_to_num(east) * weight
+        offset += 2
+
+        type_index = np.array([self.types.get(value, -1) for value in columns['property_type']], dtype=np.int64)
+        known = type_index >= 0
+        matrix[np.flatnonzero(known), offset + type_index[known]] = FEATURE_WEIGHTS['property_type']
+        offset += len(self.types)
+
+        matrix[:, offset] = columns['is_furnished'] * FEATURE_WEIGHTS['is_furnished']
+        matrix[:, offset + 1] = columns['pets_allowed'] * FEATURE_WEIGHTS['pets_allowed']
+        offset += 2
+
+        if len(self.amenities) and len(columns['amenity_rows']):
+            bits = np.array([self.amenities.get(name, -1) for name in columns['amenity_names']], dtype=np.int64)
+            known = bits >= 0
+            matrix[columns['amenity_rows'][known], offset + bits[known]] = FEATURE_WEIGHTS['amenities']
+
+        return matrix
+
+
+class SimilarityIndex:
+    """
+    In-memory matrix of listing vectors answering top-k nearest queries.
+
+    Distances are weighted Euclidean, computed for every row at once as
+    |x|^2 - 2 x.q + |q|^2 from precomputed squared norms. The matrix is stored
+    feature-major (one contiguous array per feature), which roughly halves
+    the matrix-vector product at a million rows. Removed rows keep their slot
+    with an infinite norm until the next full rebuild.
+    """
+
+    def __init__(self, ids, columns):
+        self.encoder = FeatureEncoder(columns)
+        self.ids = list(ids)
+        self.positions = {pk: index for index, pk in enumerate(self.ids)}
+        self.matrix = np.ascontiguousarray(self.encoder.encode(columns).T)
+        self.norms = np.einsum('ij,ij->j', self.matrix, self.matrix)
+        self.size = len(self.ids)
+        self.removed = 0
+
+    def __len__(self):
+        return self.size - self.removed
+
+    def reserve(self, extra):
+        if self.size + extra <= self.matrix.shape[1]:
+            return
+        capacity = max(2 * self.matrix.shape[1], self.size + extra, 1024)
+        matrix = np.zeros((self.encoder.dim, capacity), dtype=np.float32)
+        matrix[:, :self.size] = self.matrix[:, :self.size]
+        norms = np.full(capacity, np.inf, dtype=np.float32)
+        norms[:self.size] = self.norms[:self.size]
+        self.matrix, self.norms = matrix, norms
+
+    def upsert(self, ids, columns):
+        vectors = self.encoder.encode(columns)
+        previous_size = self.size
+        new = [pk for pk in ids if pk not in self.positions]
+        self.reserve(len(new))
+        for pk in new:
+            self.positions[pk] = self.size
+            self.ids.append(pk)
+            self.size += 1
+        for pk, vector in zip(ids, vectors):
+            index = self.positions[pk]
+            if index < previous_size and not np.isfinite(self.norms[index]):
+                # A removed listing is back
+                self.removed -= 1
+            self.matrix[:, index] = vector
+            self.norms[index] = vector @ vector
+
+    def remove(self, ids):
+        for pk in ids:
+            index = self.positions.get(pk)
+            if index is not None and np.isfinite(self.norms[index]):
+                self.norms[index] = np.inf
+                self.removed += 1
+
+    def vector_for(self, pk):
+        index = self.positions.get(pk)
+        if index is None or not np.isfinite(self.norms[index]):
+            return None
+        return self.matrix[:, index].copy()
+
+    def nearest(self, vector, k, exclude=()):
+        """Return [(id, distance)] of the k closest live rows."""
+        if self.size == 0:
+            return []
+        # |x|^2 - 2 x.q, computed in place; |q|^2 is the same for every row and added at the end
+        distances = vector @ self.matrix[:, :self.size]
+        distances *= -2
+        distances += self.norms[:self.size]
+        for pk in exclude:
+            index = self.positions.get(pk)
+            if index is not None:
+                distances[index] = np.inf
+
+        k = min(k, self.size)
+        candidates = np.argpartition(distances, k - 1)[:k]
+        candidates = candidates[np.argsort(distances[candidates])]
+        offset = float(vector @ vector)
+        return [
+            (self.ids[index], float(np.sqrt(max(float(distances[index]) + offset, 0.0))))
+            for index in candidates if np.isfinite(distances[index])
+        ]
+
+
+class SimilarityService:
+    """
+    Per-process owner of the index, kept in step with the database.
+
+    When the catalogue version moves, listings whose updated_at is past the
+    last seen watermark are re-encoded in place (child rows touch the parent,
+    see signals). Deleted listings are evicted as they are noticed, and the
+    whole index is rebuilt periodically to refresh scaling and vocabulary.
+    Rebuilds run in a background thread and swap the new index in when it is
+    ready; queries keep using the old one until then.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.builder = None
+        self.index = None
+        self.version = None
+        self.watermark = None
+        self.built_at = 0.0
+
+    def rebuild(self):
+        started = time.monotonic()
+        watermark = timezone.now() - WATERMARK_SLACK
+        ids, columns = load_columns(Property.objects.filter(listing_status='ACTIVE'))
+        index = SimilarityIndex(ids, columns)
+        with self.lock:
+            self.index = index
+            self.watermark = watermark
+            # Changes committed while building are applied by the next refresh
+            self.version = None
+            self.built_at = time.monotonic()
+        logger.info('Built similarity index of %d listings in %.2fs', len(ids), self.built_at - started)
+
+    def run_rebuild(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception('Similarity index rebuild failed')
+            with self.lock:
+                # Back off until the next rebuild interval instead of retrying on every request
+                self.built_at = time.monotonic()
+        finally:
+            connection.close()
+
+    def start_rebuild(self):
+        """Start a background rebuild unless one is already running; returns its thread."""
+        with self.build_lock:
+            if self.builder is None or not self.builder.is_alive():
+                self.builder = threading.Thread(target=self.run_rebuild, name='similarity-rebuild', daemon=True)
+                self.builder.start()
+            return self.builder
+
+    def refresh(self):
+        watermark = timezone.now() - WATERMARK_SLACK
+        changes = dict(Property.objects.filter(updated_at__gte=self.watermark).values_list('id', 'listing_status'))
+        active = [pk for pk, status in changes.items() if status == 'ACTIVE']
+        if active:
+            self.index.upsert(*load_columns(Property.objects.filter(pk__in=active)))
+        self.index.remove(str(pk) for pk, status in changes.items() if status != 'ACTIVE')
+        self.watermark = watermark
+
+    def sync(self):
+        expired = time.monotonic() - self.built_at > settings.PROPERTY_SIMILARITY_REBUILD_SECONDS
+        if expired or self.index.removed > len(self.index):
+            self.start_rebuild()
+        version = get_catalogue_version()
+        if version is None or version != self.version:
+            self.refresh()
+        self.version = version
+
+    def similar(self, property_obj, k):
+        """[(id, distance)] of the k listings closest to `property_obj`, which need not be active."""
+        if self.index is None:
+            # Nothing to answer from until this process's first build lands
+            self.start_rebuild().join()
+        with self.lock:
+            if self.index is None:
+                return []
+            self.sync()
+            pk = str(property_obj.pk)
+            vector = self.index.vector_for(pk)
+            if vector is None:
+                _, columns = load_columns(Property.objects.filter(pk=property_obj.pk))
+                vector = self.index.encoder.encode(columns)[0]
+            return self.index.nearest(vector, k, exclude=[pk])
+
+    def evict(self, ids):
+        with self.lock:
+            if self.index is not None:
+                self.index.remove(ids)
+
+
+similarity_service = SimilarityService()
+similar_cache = VersionedCache('property_similar')
@@ -0,0 +1,135 @@
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from applications.models import PropertyApplication
+from messaging.models import Conversation
+from .models import PropertyDailyStats, SavedProperty
+
+# Counters summed over a date range; the unique_* columns are per-day only
+TOTAL_FIELDS = ('views', 'saves', 'applications', 'conversations')
+SERIES_FIELDS = ('views', 'unique_users', 'unique_ips', 'saves', 'applications', 'conversations')
+DEFAULT_DAYS = 30
+MAX_DAYS = 365
+
+
+def increment(property_id, field, amount=1, date=None):
+    """Add to one counter of a property's row for the day (today by default)."""
+    date = date or timezone.localdate()
+    row = PropertyDailyStats.objects.filter(property_id=property_id, date=date)
+    if row.update(**{field: F(field) + amount}):
+        return
+    try:
+        with transaction.atomic():
+            PropertyDailyStats.objects.create(property_id=property_id, date=date, **{field: amount})
+    except IntegrityError:
+        # Another request created the row first
+        row.update(**{field: F(field) + amount})
+
+
+def increment_many(property_ids, field, amount=1, date=None):
+    """
+    increment() for many properties in three queries, for bulk writes that
+    skip the model signals. Existing rows are bumped with one UPDATE and the
+    rest inserted together; a row created concurrently in between loses
+    this increment rather than failing the request.
+    """
+    date = date or timezone.localdate()
+    rows = PropertyDailyStats.objects.filter(property_id__in=property_ids, date=date)
+    existing = set(rows.values_list('property_id', flat=True))
+    rows.update(**{field: F(field) + amount})
+    PropertyDailyStats.objects.bulk_create(
+        [
+            PropertyDailyStats(property_id=property_id, date=date, **{field: amount})
+            for property_id in property_ids if property_id not in existing
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def parse_days(value):
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_DAYS
+    return min(max(days, 1), MAX_DAYS)
+
+
+def stats_window(days):
+    end = timezone.localdate()
+    return end - datetime.timedelta(days=days - 1), end
+
+
+def daily_series(queryset, start, end):
+    """
+    Dense day-by-day counters summed over the stats rows in `queryset`.
+
+    Reads at most one row per property per day in the window, so the cost
+    does not depend on how much history exists.
+    """
+    rows = {
+        row['date']: row
+        for row in queryset.filter(date__range=(start, end))
+        .values('date')
+        .annotate(**{field: Sum(field) for field in SERIES_FIELDS})
+        .order_by()
+    }
+
+    series = []
+    totals = dict.fromkeys(TOTAL_FIELDS, 0)
+    day = start
+    while day <= end:
+        row = rows.get(day, {})
+        entry = {'date': day}
+        for field in SERIES_FIELDS:
+            entry[field] = row.get(field) or 0
+        for field in TOTAL_FIELDS:
+            totals[field] += entry[field]
+        series.append(entry)
+        day += datetime.timedelta(days=1)
+    return totals, series
+
+
+def listing_totals(queryset, start, end):
+    """Window totals per property, highest views first."""
+    return list(
+        queryset.filter(date__range=(start, end))
+        .values('property_id', title=F('property__title'))
+        .annotate(**{field: Sum(field) for field in TOTAL_FIELDS})
+        .order_by('-views', 'title')
+    )
+
+
+def backfill_activity():
+    """
+    Rebuild the save/application/conversation counters from their source tables.
+
+    For one-off use after deploying the counters; afterwards they are kept
+    current by signals. Saves that were later removed are not recoverable.
+    """
+    sources = (
+        ('saves', SavedProperty.objects.all(), 'saved_at'),
+        ('applications', PropertyApplication.objects.all(), 'applied_at'),
+        ('conversations', Conversation.objects.filter(property__isnull=False), 'created_at'),
+    )
+    written = 0
+    for field, queryset, timestamp in sources:
+        rows = [
+            PropertyDailyStats(property_id=row['property_id'], date=row['date'], **{field: row['count']})
+            for row in queryset.annotate(date=TruncDate(timestamp))
+            .values('property_id', 'date')
+            .annotate(count=Count('pk'))
+            .order_by()
+        ]
+        PropertyDailyStats.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['property', 'date'],
+            update_fields=[field],
+        )
+        written += len(rows)
+    return written
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from storages.backends.s3 import S3Storage
+
+from .models import StoredBlob
+
+BLOB_PREFIX = 'blobs'
+# Uploads up to this size are hashed and buffered in memory, larger ones spill to disk
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+class ContentAddressedMixin:
+    """
+    Storage mixin that keeps one copy of each distinct file.
+
+    Saves are hashed (SHA-256) while they are streamed into a spool and
+    stored as blobs/<aa>/<digest><ext>, whatever name was asked for. Saving
+    bytes that are already stored only adds a reference; delete() drops one
+    and removes the file with the last. Files saved before this storage was
+    enabled (no StoredBlob row) are deleted as before.
+    """
+    content_addressed = True
+
+    def _save(self, name, content):
+        hasher = hashlib.sha256()
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+            for chunk in content.chunks():
+                hasher.update(chunk)
+                spool.write(chunk)
+            size = spool.tell()
+            digest = hasher.hexdigest()
+
+            existing = self.add_reference(digest)
+            if existing is not None:
+                return existing
+
+            _, extension = os.path.splitext(name)
+            blob_name = f'{BLOB_PREFIX}/{digest[:2]}/{digest}{extension.lower()}'
+            if not self.exists(blob_name):
+                # Written before the row exists, so a StoredBlob row always has its file
+                spool.seek(0)
+                blob_name = super()._save(blob_name, File(spool, name=blob_name))
+
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.create(digest=digest, name=blob_name, size=size, ref_count=1)
+        except IntegrityError:
+            # The same content was stored concurrently
+            return self.add_reference(digest) or blob_name
+        return blob_name
+
+    def add_reference(self, digest):
+        """Count one more holder of the blob with `digest`; returns its name, or None if not stored."""
+        blobs = StoredBlob.objects.filter(digest=digest)
+        if blobs.update(ref_count=F('ref_count') + 1):
+            return blobs.values_list('name', flat=True).first()
+        return None
+
+    def retain(self, names):
+        """Count one more holder of each named blob, for rows that copy another row's file names."""
+        for name in names:
+            StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+    def delete(self, name):
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return super().delete(name)
+            if blob.ref_count > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return None
+            # Removed while the row is locked, so a concurrent save of the same bytes waits and rewrites it
+            super().delete(name)
+            blob.delete()
+
+    def release(self, name):
+        """delete() for names this storage manages; files it does not track are left alone."""
+        if name and StoredBlob.objects.filter(name=name).exists():
+            self.delete(name)
+
+
+class ContentAddressedFileSystemStorage(ContentAddressedMixin, FileSystemStorage):
+    pass
+
+
+class ContentAddressedS3Storage(ContentAddressedMixin, S3Storage):
+    pass
+
+
+def release_files(names, storage=default_storage):
+    """Drop a deleted row's references once its transaction commits."""
+    if getattr(storage, 'content_addressed', False):
+        names = [name for name in names if name]
+        transaction.on_commit(lambda: [storage.release(name) for name in names])
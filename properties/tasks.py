@@ -0,0 +1,67 @@
+import logging
+
+from celery import shared_task
+from PIL import Image, UnidentifiedImageError
+
+from .dedup import index_listings
+from .images import generate_variants
+from .market import refresh_market_stats
+from .models import PropertyImage
+from .rollups import prune_views, rollup_views
+from .saved_searches import notify_matches
+from .tracking import flush_views
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_property_views():
+    """Drain buffered property views into the database."""
+    return flush_views()
+
+
+@shared_task
+def rollup_property_views():
+    """Refresh the per-day view counts for recent days."""
+    return rollup_views()
+
+
+@shared_task
+def prune_property_views():
+    """Delete raw property views past the retention window."""
+    return prune_views()
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def process_property_image(self, image_id):
+    """Build the resized, EXIF-free variants of an uploaded property image."""
+    image = PropertyImage.objects.filter(pk=image_id).first()
+    if image is None or not image.image_url:
+        return None
+    try:
+        return generate_variants(image)
+    except (UnidentifiedImageError, Image.DecompressionBombError):
+        # Undecodable or oversized files fail straight away; UnidentifiedImageError is an OSError
+        logger.warning('Property image %s cannot be decoded', image_id, exc_info=True)
+        raise
+    except OSError as exc:
+        # Storage hiccups are retried
+        raise self.retry(exc=exc)
+
+
+@shared_task
+def match_saved_searches(property_ids):
+    """Notify users whose saved searches match listings that just went live."""
+    return notify_matches(property_ids)
+
+
+@shared_task
+def refresh_market_statistics():
+    """Recompute the rent distribution of every market segment."""
+    return refresh_market_stats()
+
+
+@shared_task
+def index_listing_fingerprints(property_ids):
+    """Fingerprint new or edited listings and cluster them with their near-duplicates."""
+    return index_listings(property_ids)
@@ -1,3 +1,1201 @@
-from django.test import TestCase
+import base64
+import datetime
+import io
+import json
+import tempfile
+import time
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from django.urls import reverse
+from PIL import Image, UnidentifiedImageError
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .admin import DuplicateListingAdmin
+from .cache import bump_catalogue_version, get_catalogue_version, listing_cache
+from .clusters import cluster_cache
+from .dedup import index_listings, sweep
+from .facets import facet_cache
+from .images import generate_variants
+from .importer import InvalidRow, read_rows
+from .market import market_cache, refresh_market_stats
+from notifications.models import Notification
+from .models import (
+    DuplicateListing, MarketStats, Property, PropertyImage, PropertyAmenity, PropertyView, PropertyDailyStats, SavedProperty, SavedSearch,
+    StoredBlob, ListingFingerprint
+)
+from .rollups import prune_views, rollup_views, start_of_day
+from .saved_searches import notify_matches
+from .uploads import make_upload_token, read_upload_token
+from .similarity import similar_cache, similarity_service
+from .tasks import process_property_image
+from .tracking import BUFFER_KEY, DEAD_LETTER_KEY, FLUSH_LOCK_KEY, PROCESSING_KEY, flush_views, record_view
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_property(owner, **kwargs):
+    fields = dict(
+        owner=owner, title='Listing', description='Two bedroom flat',
+        property_type='APARTMENT', listing_status='ACTIVE', price_per_month=1000,
+        address_line1='1 Main St', city='Accra', state='Greater Accra', postal_code='00233',
+        region='Greater Accra', bedrooms=2, bathrooms=1, available_from=datetime.date.today()
+    )
+    fields.update(kwargs)
+    return Property.objects.create(**fields)
+
+
+def make_owner(email='owner@example.com'):
+    return User.objects.create_user(
+        email=email, username=email.split('@')[0], password='pass1234',
+        full_name='Owner', user_type='LANDLORD'
+    )
+
+
+def queued_tasks(callbacks):
+    """on_commit callbacks other than the catalogue cache invalidation."""
+    return [callback for callback in callbacks if callback is not bump_catalogue_version]
+
+
+def run_cache_invalidation(callbacks):
+    """Run the captured catalogue version bumps without dispatching Celery tasks."""
+    for callback in callbacks:
+        if callback is bump_catalogue_version:
+            callback()
+
+
+class CacheResetMixin:
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        listing_cache.local.clear()
+        facet_cache.local.clear()
+        cluster_cache.local.clear()
+        self.client = APIClient()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PropertyListQueryCountTests(CacheResetMixin, TestCase):
+    """List endpoints must not issue a query per property."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        for i in range(50):
+            prop = make_property(cls.owner, title=f'Listing {i}', price_per_month=1000 + i)
+            PropertyImage.objects.create(property=prop, image_url=f'property_images/{i}.jpg', is_primary=True)
+            PropertyImage.objects.create(property=prop, image_url=f'property_images/{i}-b.jpg', display_order=1)
+            PropertyAmenity.objects.create(property=prop, amenity_name='Wifi', amenity_category='BASIC')
+            PropertyAmenity.objects.create(property=prop, amenity_name='Stove', amenity_category='KITCHEN')
+            SavedProperty.objects.create(user=cls.owner, property=prop)
+
+    def test_property_list_query_count(self):
+        # Listings (with owner and amenity count) + primary images
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('property_list_create'), {'page_size': 50})
+        self.assertEqual(len(response.data['results']), 50)
+        first = response.data['results'][0]
+        self.assertEqual(first['amenities_count'], 2)
+        self.assertTrue(first['primary_image'].endswith('.jpg'))
+        self.assertNotIn('-b', first['primary_image'])
+
+    def test_my_properties_query_count(self):
+        self.client.force_authenticate(self.owner)
+        # ETag validators + listings + primary images
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('my_properties'))
+        self.assertEqual(len(response.data), 50)
+
+    def test_saved_properties_query_count(self):
+        self.client.force_authenticate(self.owner)
+        # ETag validators + saved rows + listings + primary images
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('saved_properties'))
+        self.assertEqual(len(response.data), 50)
+        self.assertEqual(response.data[0]['property_details']['amenities_count'], 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CursorPaginationTests(CacheResetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        # Two price points so most rows tie on the sort field
+        cls.listings = [
+            make_property(cls.owner, title=f'Listing {i}', price_per_month=1000 + (i % 2) * 500)
+            for i in range(7)
+        ]
+
+    def walk(self, params):
+        ids, pages = [], []
+        response = self.client.get(reverse('property_list_create'), params)
+        while True:
+            pages.append(response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                return ids, pages
+            response = self.client.get(response.data['next'])
+
+    def test_forward_pages_cover_ties_exactly_once(self):
+        ids, pages = self.walk({'ordering': 'price_per_month', 'page_size': 2})
+        self.assertEqual(len(pages), 4)
+        self.assertEqual(sorted(ids), sorted(str(listing.pk) for listing in self.listings))
+        prices = [Property.objects.get(pk=pk).price_per_month for pk in ids]
+        self.assertEqual(prices, sorted(prices))
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_cursor_returns_the_earlier_page(self):
+        _, pages = self.walk({'ordering': '-price_per_month', 'page_size': 3})
+        response = self.client.get(pages[2]['previous'])
+        self.assertEqual(response.data['results'], pages[1]['results'])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(response.data['results'], pages[0]['results'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_invalid_or_tampered_cursor_is_rejected(self):
+        url = reverse('property_list_create')
+        self.assertEqual(self.client.get(url, {'cursor': 'not-a-cursor'}).status_code, 404)
+
+        next_url = self.client.get(url, {'page_size': 2}).data['next']
+        cursor = parse_qs(urlparse(next_url).query)['cursor'][0]
+        # A cursor issued for one ordering can't be replayed against another
+        response = self.client.get(url, {'cursor': cursor, 'ordering': 'price_per_month'})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PropertySearchTests(CacheResetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.in_description = make_property(cls.owner, title='Quiet flat', description='Shared garden at the back', price_per_month=800)
+        cls.in_title = make_property(cls.owner, title='Garden cottage', description='Two rooms', price_per_month=1200)
+        make_property(cls.owner, title='Studio', description='City centre')
+
+    def search(self, **params):
+        response = self.client.get(reverse('property_list_create'), params)
+        return [item['title'] for item in response.data['results']]
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search(search='gardens'), ['Garden cottage', 'Quiet flat'])
+
+    def test_explicit_ordering_overrides_rank(self):
+        self.assertEqual(self.search(search='garden', ordering='price_per_month'), ['Quiet flat', 'Garden cottage'])
+
+    def test_rank_ordering_pages_with_cursors(self):
+        response = self.client.get(reverse('property_list_create'), {'search': 'garden', 'page_size': 1})
+        self.assertEqual(response.data['results'][0]['title'], 'Garden cottage')
+        response = self.client.get(response.data['next'])
+        self.assertEqual([item['title'] for item in response.data['results']], ['Quiet flat'])
+        self.assertIsNone(response.data['next'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GeoSearchTests(CacheResetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        make_property(cls.owner, title='Osu', latitude='5.556000', longitude='-0.182000')
+        make_property(cls.owner, title='Labone', latitude='5.566000', longitude='-0.170000')
+        make_property(cls.owner, title='Tema', latitude='5.670000', longitude='-0.017000')
+        make_property(cls.owner, title='Kumasi', city='Kumasi', latitude='6.688000', longitude='-1.624000')
+        make_property(cls.owner, title='Unmapped')
+
+    def get(self, **params):
+        return self.client.get(reverse('property_list_create'), params)
+
+    def titles(self, **params):
+        return [item['title'] for item in self.get(**params).data['results']]
+
+    def test_near_keeps_listings_inside_the_radius(self):
+        titles = self.titles(near='5.556,-0.182', radius_km=5)
+        self.assertEqual(sorted(titles), ['Labone', 'Osu'])
+        self.assertEqual(sorted(self.titles(near='5.556,-0.182', radius_km=30)), ['Labone', 'Osu', 'Tema'])
+
+    def test_bbox_keeps_listings_inside_the_viewport(self):
+        self.assertEqual(sorted(self.titles(bbox='-0.3,5.5,0.0,5.7')), ['Labone', 'Osu', 'Tema'])
+        self.assertEqual(self.titles(bbox='-1.7,6.6,-1.5,6.8'), ['Kumasi'])
+
+    def test_distance_ordering_sorts_nearest_first(self):
+        self.assertEqual(self.titles(near='5.67,-0.017', radius_km=30, ordering='distance'), ['Tema', 'Labone', 'Osu'])
+        # Without ?near= there is no distance to sort by, so the default ordering applies
+        self.assertEqual(len(self.titles(ordering='distance')), 5)
+
+    def test_invalid_coordinates_are_rejected(self):
+        self.assertEqual(self.get(near='95,0').status_code, 400)
+        self.assertEqual(self.get(bbox='1,2,3').status_code, 400)
+        self.assertEqual(self.get(near='5.6,-0.18', radius_km='far').status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExplainListingQueriesTests(CacheResetMixin, TestCase):
+
+    def test_command_plans_every_listing_query_with_and_without_indexes(self):
+        out = io.StringIO()
+        call_command('explain_listing_queries', '--seed', '50', '--compare', stdout=out)
+        output = out.getvalue()
+        self.assertIn('=== Without listing indexes ===', output)
+        self.assertIn('=== With listing indexes ===', output)
+        # Five cases per pass
+        self.assertEqual(output.count('-- Price band in a city'), 2)
+        self.assertEqual(output.count('ms including EXPLAIN overhead'), 10)
+        # The compare pass rolls its DROP INDEX back
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'property_active_created_idx'")
+            self.assertIsNotNone(cursor.fetchone())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SparseFieldsetTests(CacheResetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.listing = make_property(cls.owner)
+        PropertyAmenity.objects.create(property=cls.listing, amenity_name='Wifi', amenity_category='BASIC')
+
+    def test_list_fields_prune_payload_and_queries(self):
+        url = reverse('property_list_create')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'fields': 'title,price_per_month,bogus'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'price_per_month'})
+
+    def test_list_expand_loads_relations_in_one_query_each(self):
+        url = reverse('property_list_create')
+        self.assertNotIn('amenities', self.client.get(url).data['results'][0])
+        with self.assertNumQueries(3):
+            # Listings, then one prefetch per expanded relation
+            response = self.client.get(url, {'fields': 'title', 'expand': 'amenities,images'})
+        item = response.data['results'][0]
+        self.assertEqual([amenity['amenity_name'] for amenity in item['amenities']], ['Wifi'])
+        self.assertEqual(item['images'], [])
+
+    def test_detail_skips_unrequested_child_lists(self):
+        url = reverse('property_detail', args=[self.listing.pk])
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'fields': 'title,owner_name'})
+        self.assertEqual(set(response.data), {'id', 'title', 'owner_name'})
+        full = self.client.get(url)
+        self.assertIn('documents', full.data)
+        self.assertNotEqual(full['ETag'], response['ETag'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ListingCacheTests(CacheResetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.listing = make_property(cls.owner)
+
+    def test_anonymous_repeat_query_is_served_from_cache(self):
+        url = reverse('property_list_create')
+        self.client.get(url, {'city': 'Accra', 'bedrooms': ''})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'city': 'Accra'})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_catalogue_change_invalidates_cached_lists(self):
+        url = reverse('property_list_create')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            make_property(self.owner, title='New listing')
+        run_cache_invalidation(callbacks)
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FacetTests(CacheResetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        make_property(cls.owner, bedrooms=2)
+        make_property(cls.owner, bedrooms=3, is_furnished=True)
+        make_property(cls.owner, bedrooms=3, city='Kumasi')
+        make_property(cls.owner, listing_status='DRAFT')
+
+    def test_facets_follow_list_filters_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('property_facets'), {'city': 'Accra', 'ordering': 'price_per_month'})
+        self.assertEqual(response.data['total'], 2)
+        facets = response.data['facets']
+        self.assertEqual(facets['city'], [{'value': 'Accra', 'count': 2}])
+        self.assertEqual(facets['bedrooms'], [{'value': 2, 'count': 1}, {'value': 3, 'count': 1}])
+        self.assertEqual(facets['is_furnished'], [{'value': False, 'count': 1}, {'value': True, 'count': 1}])
+
+    def test_facets_ignore_paging_params_for_caching(self):
+        url = reverse('property_facets')
+        self.client.get(url, {'bedrooms': 3})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'bedrooms': 3, 'ordering': '-created_at', 'page_size': 10})
+        self.assertEqual(response.data['total'], 2)
+
+
+def direct_upload(name, data):
+    # Presigned uploads go straight to the bucket, bypassing the content-addressed backend
+    return FileSystemStorage().save(name, ContentFile(data))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class DirectImageUploadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.listing = make_property(cls.owner)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = reverse('complete_image_upload', args=[self.listing.pk])
+        self.name = f'property_images/uploads/{self.listing.pk}/photo.png'
+        self.token = make_upload_token(self.listing.pk, self.name, {'display_order': 0, 'is_primary': True, 'caption': ''})
+
+    def test_presign_requires_object_storage(self):
+        response = self.client.post(reverse('direct_image_upload', args=[self.listing.pk]), {'content_type': 'image/png'})
+        self.assertEqual(response.status_code, 501)
+
+    @override_settings(STORAGES={
+        'default': {
+            'BACKEND': 'properties.storage.ContentAddressedS3Storage',
+            'OPTIONS': {
+                'bucket_name': 'listings', 'region_name': 'us-east-1',
+                'access_key': 'test', 'secret_key': 'test',
+            },
+        },
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_presign_pins_key_type_and_size(self):
+        # Presigning is signed locally, so the fake credentials never reach S3
+        response = self.client.post(reverse('direct_image_upload', args=[self.listing.pk]), {'content_type': 'image/png'})
+        self.assertEqual(response.status_code, 201)
+        fields = response.data['upload']['fields']
+        prefix = f'property_images/uploads/{self.listing.pk}/'
+        self.assertTrue(fields['key'].startswith(prefix))
+        self.assertTrue(fields['key'].endswith('.png'))
+        self.assertEqual(read_upload_token(response.data['upload_token'], self.listing.pk)['name'], fields['key'])
+
+        conditions = json.loads(base64.b64decode(fields['policy']))['conditions']
+        self.assertIn({'key': fields['key']}, conditions)
+        self.assertIn({'Content-Type': 'image/png'}, conditions)
+        self.assertIn(['content-length-range', 1, settings.PROPERTY_IMAGE_MAX_UPLOAD_BYTES], conditions)
+
+    def test_completion_registers_uploaded_object_once(self):
+        response = self.client.post(self.url, {'upload_token': self.token})
+        self.assertEqual(response.status_code, 400)
+
+        direct_upload(self.name, b'png')
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(self.url, {'upload_token': self.token})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(queued_tasks(callbacks)), 1)
+        image = PropertyImage.objects.get(property=self.listing)
+        self.assertEqual((image.image_url.name, image.is_primary), (self.name, True))
+
+        # A retried callback returns the same image
+        self.assertEqual(self.client.post(self.url, {'upload_token': self.token}).data['id'], str(image.pk))
+
+    def test_completion_rejects_tampered_or_foreign_tokens(self):
+        direct_upload(self.name, b'png')
+        other = make_property(self.owner)
+        self.assertEqual(self.client.post(self.url, {'upload_token': self.token + 'x'}).status_code, 400)
+        response = self.client.post(reverse('complete_image_upload', args=[other.pk]), {'upload_token': self.token})
+        self.assertEqual(response.status_code, 400)
+
+
+def png_bytes(color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def jpeg_with_exif(size=(2000, 1500)):
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera maker'  # Make
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'blue').save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=LOCMEM_CACHES)
+class ImageVariantTests(CacheResetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.listing = make_property(cls.owner)
+
+    def test_variants_are_resized_upright_and_free_of_exif(self):
+        image = PropertyImage.objects.create(
+            property=self.listing, image_url=ContentFile(jpeg_with_exif(), name='photo.jpg'), is_primary=True
+        )
+        variants = generate_variants(image)
+
+        # Rotated upright to 1500x2000, then scaled down but never up
+        sizes = {name: (variant['width'], variant['height']) for name, variant in variants.items()}
+        self.assertEqual(sizes, {'thumb': (320, 427), 'small': (640, 853), 'medium': (1024, 1365), 'large': (1500, 2000)})
+        for name in [image.image_url.name, variants['small']['jpeg'], variants['large']['webp']]:
+            with default_storage.open(name, 'rb') as file, Image.open(file) as stored:
+                self.assertEqual(len(stored.getexif()), 0)
+                self.assertNotIn('exif', stored.info)
+
+        response = self.client.get(reverse('property_list_create'))
+        self.assertTrue(response.data['results'][0]['primary_image'].endswith(variants['small']['webp']))
+
+    def test_undecodable_upload_fails_without_retrying(self):
+        image = PropertyImage.objects.create(
+            property=self.listing, image_url=ContentFile(b'not an image', name='photo.jpg')
+        )
+        with mock.patch.object(process_property_image, 'retry') as retry:
+            result = process_property_image.apply(args=[str(image.pk)])
+        self.assertEqual(result.state, 'FAILURE')
+        self.assertIsInstance(result.result, UnidentifiedImageError)
+        retry.assert_not_called()
+        image.refresh_from_db()
+        self.assertEqual(image.variants, {})
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ContentAddressedStorageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.listing = make_property(cls.owner)
+
+    def test_identical_files_are_stored_once_and_deleted_with_the_last_reference(self):
+        first = default_storage.save('property_documents/deed.pdf', ContentFile(b'deed'))
+        second = default_storage.save('verification_docs/copy.PDF', ContentFile(b'deed'))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('blobs/') and first.endswith('.pdf'))
+        self.assertEqual(StoredBlob.objects.get(name=first).ref_count, 2)
+
+        default_storage.delete(first)
+        self.assertTrue(default_storage.exists(first))
+        default_storage.delete(first)
+        self.assertFalse(default_storage.exists(first))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_reuploaded_photo_reuses_processed_variants(self):
+        images = [
+            PropertyImage.objects.create(property=self.listing, image_url=ContentFile(png_bytes(), name='photo.png'))
+            for _ in range(2)
+        ]
+        generate_variants(images[0])
+        blobs = StoredBlob.objects.count()
+        generate_variants(images[1])
+        self.assertEqual(images[1].variants, images[0].variants)
+        # Nothing new was encoded, and the shared upload lost its last reference
+        self.assertEqual(StoredBlob.objects.count(), blobs - 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            images[0].delete()
+        for name in images[1].stored_files():
+            self.assertTrue(default_storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            images[1].delete()
+        self.assertFalse(StoredBlob.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PropertyImportTests(CacheResetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.owner.is_verified = True
+        cls.owner.save()
+
+    def row(self, **kwargs):
+        fields = dict(
+            title='Imported', description='Flat', property_type='APARTMENT', listing_status='ACTIVE',
+            price_per_month='900.00', address_line1='2 Ring Rd', city='Tema', state='Greater Accra',
+            postal_code='00233', region='Greater Accra', bedrooms=1, bathrooms=1, available_from='2030-01-01',
+            latitude='5.6', longitude='-0.18',
+            amenities=[{'amenity_name': 'Wifi', 'amenity_category': 'BASIC'}],
+        )
+        fields.update(kwargs)
+        return json.dumps(fields)
+
+    def test_ndjson_import_reports_bad_rows_and_keeps_the_rest(self):
+        self.client.force_authenticate(self.owner)
+        body = '\n'.join([self.row(), self.row(bedrooms='many'), '{oops', self.row(title='Second')])
+        response = self.client.post(reverse('property_import'), data=body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['line'] for error in response.data['errors']], [2, 3])
+        prop = Property.objects.get(title='Second')
+        self.assertTrue(prop.geohash)
+        self.assertEqual(prop.amenities.count(), 1)
+        self.assertEqual(Property.objects.filter(search_vector__isnull=True).count(), 0)
+
+    def test_undecodable_lines_are_reported_and_the_import_carries_on(self):
+        self.client.force_authenticate(self.owner)
+        body = b'\n'.join([self.row().encode(), '{"title": "Caf\u00e9"}'.encode('latin-1'), self.row(title='Second').encode()])
+        response = self.client.post(reverse('property_import'), data=body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['errors'], [{'line': 2, 'errors': {'non_field_errors': ['Line is not valid UTF-8.']}}])
+
+    def test_csv_reader_skips_malformed_records(self):
+        body = 'title,city\nOne,Accra\nBad\rrow,Accra\nCaf\u00e9,Tema\nTwo,Tema\n'.encode('latin-1')
+        rows = list(read_rows(io.BytesIO(body), 'csv'))
+        self.assertEqual([number for number, _ in rows], [2, 3, 4, 5])
+        self.assertEqual((rows[0][1], rows[3][1]), ({'title': 'One', 'city': 'Accra'}, {'title': 'Two', 'city': 'Tema'}))
+        self.assertIsInstance(rows[1][1], InvalidRow)
+        self.assertEqual(str(rows[2][1]), 'Line is not valid UTF-8.')
+
+    def test_import_invalidates_cached_lists(self):
+        url = reverse('property_list_create')
+        self.client.get(url, {'city': 'Tema'})
+        self.client.force_authenticate(self.owner)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse('property_import'), data=self.row(), content_type='application/x-ndjson')
+        run_cache_invalidation(callbacks)
+        self.client.logout()
+        response = self.client.get(url, {'city': 'Tema'})
+        self.assertEqual(len(response.data['results']), 1)
+
+
+@override_settings(PROPERTY_EXPORT_CHUNK_SIZE=2)
+class PortfolioExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.listings = [make_property(cls.owner, title=f'Listing {i}') for i in range(3)]
+        PropertyAmenity.objects.create(property=cls.listings[0], amenity_name='Wifi', amenity_category='BASIC')
+        make_property(make_owner('other@example.com'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def export(self, fmt):
+        response = self.client.get(reverse('portfolio_export'), {'format': fmt})
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_ndjson_streams_owner_listings_chunk_by_chunk(self):
+        with self.assertNumQueries(3):
+            # Server-side cursor, then one amenity query per chunk of two
+            body = self.export('ndjson')
+        rows = [row for _, row in read_rows(io.BytesIO(body), 'ndjson')]
+        self.assertEqual([row['title'] for row in rows], ['Listing 0', 'Listing 1', 'Listing 2'])
+        self.assertEqual(rows[0]['amenities'], [{'amenity_name': 'Wifi', 'amenity_category': 'BASIC'}])
+
+    def test_csv_export_reads_back_as_import_rows(self):
+        rows = [row for _, row in read_rows(io.BytesIO(self.export('csv')), 'csv')]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['amenities'], [{'amenity_name': 'Wifi', 'amenity_category': 'BASIC'}])
+        self.assertEqual(rows[1]['price_per_month'], '1000.00')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AmenityUpdateTests(CacheResetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.listing = make_property(cls.owner)
+        PropertyAmenity.objects.create(property=cls.listing, amenity_name='Wifi', amenity_category='BASIC')
+        PropertyAmenity.objects.create(property=cls.listing, amenity_name='Stove', amenity_category='KITCHEN')
+
+    def patch_amenities(self, amenities):
+        self.client.force_authenticate(self.owner)
+        return self.client.patch(
+            reverse('property_detail', args=[self.listing.pk]), {'amenities': amenities}, format='json'
+        )
+
+    def test_unchanged_amenities_write_nothing(self):
+        version = get_catalogue_version()
+        pks = set(self.listing.amenities.values_list('pk', flat=True))
+        response = self.patch_amenities([
+            {'amenity_name': 'Stove', 'amenity_category': 'KITCHEN'},
+            {'amenity_name': 'Wifi', 'amenity_category': 'BASIC'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(self.listing.amenities.values_list('pk', flat=True)), pks)
+        self.assertEqual(get_catalogue_version(), version)
+
+    def test_amenity_diff_keeps_unchanged_rows(self):
+        wifi = self.listing.amenities.get(amenity_name='Wifi')
+        version = get_catalogue_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patch_amenities([
+                {'amenity_name': 'Wifi', 'amenity_category': 'BASIC'},
+                {'amenity_name': 'Alarm', 'amenity_category': 'SAFETY'},
+            ])
+        names = set(self.listing.amenities.values_list('amenity_name', flat=True))
+        self.assertEqual(names, {'Wifi', 'Alarm'})
+        self.assertTrue(PropertyAmenity.objects.filter(pk=wifi.pk).exists())
+        self.assertGreater(get_catalogue_version(), version)
+
+    def test_removing_amenities_bumps_catalogue_once(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.patch_amenities([])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.listing.amenities.exists())
+        self.assertEqual(callbacks.count(bump_catalogue_version), 1)
+
+
+class FakeRedis:
+    """Just enough of the Redis key and list commands used by view tracking."""
+
+    def __init__(self):
+        self.keys = {}
+        self.lists = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    def rpush(self, key, *values):
+        items = self.lists.setdefault(key, [])
+        items.extend(value.encode() if isinstance(value, str) else value for value in values)
+        return len(items)
+
+    def lrange(self, key, start, end):
+        return self.lists.get(key, [])[start:None if end == -1 else end + 1]
+
+    def ltrim(self, key, start, end):
+        self.lists[key] = self.lrange(key, start, end)
+
+    def lmove(self, source, destination, where_from, where_to):
+        if not self.lists.get(source):
+            return None
+        value = self.lists[source].pop(0)
+        self.lists.setdefault(destination, []).append(value)
+        return value
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def lock(self, name, timeout=None, blocking=True):
+        return FakeLock(self, name)
+
+
+class FakeLock:
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def acquire(self):
+        return bool(self.client.set(self.name, 1, nx=True))
+
+    def reacquire(self):
+        return True
+
+    def release(self):
+        self.client.keys.pop(self.name, None)
+
+
+class FakePipeline:
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class ViewTrackingTests(TestCase):
+    BROWSER = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.visitor = make_owner('visitor@example.com')
+        cls.listing = make_property(cls.owner)
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch('properties.tracking.get_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def buffered(self, key=BUFFER_KEY):
+        return [json.loads(raw) for raw in self.redis.lists.get(key, [])]
+
+    def test_repeat_views_are_deduplicated_per_viewer(self):
+        self.assertTrue(record_view(self.listing.pk, user=self.visitor, user_agent=self.BROWSER))
+        self.assertFalse(record_view(self.listing.pk, user=self.visitor, user_agent=self.BROWSER))
+        self.assertTrue(record_view(self.listing.pk, ip_address='10.0.0.1', user_agent=self.BROWSER))
+        self.assertFalse(record_view(self.listing.pk, ip_address='10.0.0.1', user_agent=self.BROWSER))
+        self.assertTrue(record_view(self.listing.pk, ip_address='10.0.0.2', user_agent=self.BROWSER))
+        self.assertEqual(len(self.buffered()), 3)
+
+    def test_bots_and_missing_user_agents_are_dropped(self):
+        self.assertFalse(record_view(self.listing.pk, ip_address='10.0.0.1', user_agent='Googlebot/2.1'))
+        self.assertFalse(record_view(self.listing.pk, ip_address='10.0.0.1', user_agent=''))
+        self.assertEqual(self.buffered(), [])
+
+    def test_flush_writes_views_and_increments_counts(self):
+        record_view(self.listing.pk, user=self.visitor, ip_address='10.0.0.1', user_agent=self.BROWSER)
+        record_view(self.listing.pk, ip_address='10.0.0.2', user_agent=self.BROWSER)
+
+        self.assertEqual(flush_views(batch_size=1), 2)
+        self.assertEqual(PropertyView.objects.filter(property=self.listing).count(), 2)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.view_count, 2)
+        self.assertEqual(self.buffered(), [])
+        self.assertEqual(self.buffered(PROCESSING_KEY), [])
+
+    def test_invalid_forwarded_ip_is_stored_as_null(self):
+        self.assertTrue(record_view(self.listing.pk, ip_address='not-an-ip', user_agent=self.BROWSER))
+        self.assertIsNone(self.buffered()[0]['ip_address'])
+        self.assertEqual(flush_views(), 1)
+        self.assertIsNone(PropertyView.objects.get().ip_address)
+
+    def test_bad_event_is_dead_lettered_without_blocking_the_batch(self):
+        record_view(self.listing.pk, ip_address='10.0.0.1', user_agent=self.BROWSER)
+        bad = dict(self.buffered()[0], ip_address='999.1.1.1')
+        self.redis.rpush(BUFFER_KEY, json.dumps(bad), 'not json')
+
+        self.assertEqual(flush_views(), 1)
+        self.assertEqual(PropertyView.objects.count(), 1)
+        self.assertEqual(len(self.redis.lists[DEAD_LETTER_KEY]), 2)
+        self.assertEqual(self.buffered(PROCESSING_KEY), [])
+        self.assertEqual(flush_views(), 0)
+
+    def test_overlapping_flush_leaves_the_in_flight_batch_alone(self):
+        record_view(self.listing.pk, ip_address='10.0.0.1', user_agent=self.BROWSER)
+        self.redis.lmove(BUFFER_KEY, PROCESSING_KEY, 'LEFT', 'RIGHT')
+        self.redis.set(FLUSH_LOCK_KEY, 1)
+
+        self.assertEqual(flush_views(), 0)
+        self.assertFalse(PropertyView.objects.exists())
+        self.assertEqual(len(self.buffered(PROCESSING_KEY)), 1)
+
+    def test_batch_left_by_a_crashed_flush_is_written(self):
+        record_view(self.listing.pk, ip_address='10.0.0.1', user_agent=self.BROWSER)
+        self.redis.lmove(BUFFER_KEY, PROCESSING_KEY, 'LEFT', 'RIGHT')
+
+        self.assertEqual(flush_views(), 1)
+        self.assertEqual(PropertyView.objects.count(), 1)
+
+
+class ViewRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.listing = make_property(cls.owner)
+
+    def add_views(self, days_ago, ips):
+        viewed_at = timezone.now() - datetime.timedelta(days=days_ago)
+        PropertyView.objects.bulk_create(
+            PropertyView(property=self.listing, ip_address=ip, viewed_at=viewed_at) for ip in ips
+        )
+
+    def test_rollup_is_idempotent_and_prune_keeps_history(self):
+        self.add_views(200, ['10.0.0.1', '10.0.0.1', '10.0.0.2'])
+        self.add_views(0, ['10.0.0.3'])
+        self.assertEqual(prune_views(retention_days=90), 0)  # nothing rolled up yet
+
+        rollup_views()
+        rollup_views()
+        old = PropertyDailyStats.objects.get(date=timezone.localdate() - datetime.timedelta(days=200))
+        self.assertEqual((old.views, old.unique_ips, old.unique_users), (3, 2, 0))
+        self.assertEqual(PropertyDailyStats.objects.count(), 2)
+
+        self.assertEqual(prune_views(retention_days=90, batch_size=2), 3)
+        self.assertEqual(PropertyView.objects.count(), 1)
+        rollup_views()
+        self.assertEqual(PropertyDailyStats.objects.get(pk=old.pk).views, 3)
+
+    def test_prune_keeps_whole_days(self):
+        boundary = timezone.localdate() - datetime.timedelta(days=90)
+        PropertyView.objects.bulk_create(
+            PropertyView(property=self.listing, ip_address='10.0.0.1', viewed_at=start_of_day(boundary) + offset)
+            for offset in (datetime.timedelta(minutes=30), datetime.timedelta(hours=23, minutes=30))
+        )
+        self.add_views(0, ['10.0.0.2'])
+        rollup_views()
+        self.assertEqual(prune_views(retention_days=90), 0)
+
+        rollup_views(since=boundary)
+        self.assertEqual(PropertyDailyStats.objects.get(date=boundary).views, 2)
+        self.assertEqual(prune_views(retention_days=89), 2)
+
+    def test_days_never_rolled_up_are_not_pruned(self):
+        self.add_views(200, ['10.0.0.1'])
+        self.add_views(0, ['10.0.0.2'])
+        rollup_views(since=timezone.localdate())
+        self.assertEqual(prune_views(retention_days=90), 0)
+
+        # The next scheduled rollup catches the old day up, after which it can go
+        rollup_views()
+        self.assertTrue(PropertyDailyStats.objects.filter(date=timezone.localdate() - datetime.timedelta(days=200)).exists())
+        self.assertEqual(prune_views(retention_days=90), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ListingStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.listing = make_property(cls.owner)
+        cls.other = make_property(cls.owner, title='Other')
+        cls.tenant = make_owner('tenant@example.com')
+        PropertyView.objects.create(property=cls.listing, ip_address='10.0.0.1')
+        rollup_views()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_counters_are_incremented_and_served_per_day(self):
+        SavedProperty.objects.create(user=self.tenant, property=self.listing)
+        SavedProperty.objects.create(user=self.tenant, property=self.other)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('property_stats', args=[self.listing.pk]), {'days': 7})
+        self.assertEqual(len(response.data['daily']), 7)
+        self.assertEqual(response.data['daily'][-1]['date'], timezone.localdate())
+        self.assertEqual(response.data['totals'], {'views': 1, 'saves': 1, 'applications': 0, 'conversations': 0})
+
+        response = self.client.get(reverse('portfolio_stats'))
+        self.assertEqual(response.data['totals']['saves'], 2)
+        self.assertEqual(response.data['listings'][0]['title'], 'Listing')
+
+    def test_stats_are_owner_only(self):
+        self.client.force_authenticate(self.tenant)
+        response = self.client.get(reverse('property_stats', args=[self.listing.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SimilarPropertiesTests(CacheResetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.listing = make_property(cls.owner, latitude='5.600000', longitude='-0.180000')
+        cls.close = make_property(cls.owner, title='Close', price_per_month=1050, latitude='5.601000', longitude='-0.181000')
+        cls.far = make_property(cls.owner, title='Far', price_per_month=5000, bedrooms=5, property_type='HOUSE',
+                                latitude='6.680000', longitude='-1.620000')
+
+    def setUp(self):
+        super().setUp()
+        similar_cache.local.clear()
+        # Background rebuilds use their own connection, which can't see the test transaction
+        similarity_service.rebuild()
+
+    def test_closest_listing_ranks_first(self):
+        response = self.client.get(reverse('similar_properties', args=[self.listing.pk]))
+        self.assertEqual([item['title'] for item in response.data], ['Close', 'Far'])
+        self.assertGreater(response.data[0]['similarity'], response.data[1]['similarity'])
+
+    def test_expired_index_keeps_answering_while_it_is_rebuilt(self):
+        similarity_service.built_at = time.monotonic() - settings.PROPERTY_SIMILARITY_REBUILD_SECONDS - 1
+        with mock.patch.object(similarity_service, 'start_rebuild') as start_rebuild:
+            response = self.client.get(reverse('similar_properties', args=[self.listing.pk]))
+        start_rebuild.assert_called_once_with()
+        self.assertEqual([item['title'] for item in response.data], ['Close', 'Far'])
+
+    def test_listing_changes_reach_the_index(self):
+        url = reverse('similar_properties', args=[self.listing.pk])
+        self.client.get(url)
+        self.close.listing_status = 'RENTED'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.close.save()
+        response = self.client.get(url)
+        self.assertEqual([item['title'] for item in response.data], ['Far'])
+
+
+class BulkSaveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.tenant = make_owner('tenant@example.com')
+        cls.listings = [make_property(cls.owner, title=f'Listing {i}') for i in range(3)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+
+    def test_bulk_save_skips_existing_and_counts_new_saves(self):
+        SavedProperty.objects.create(user=self.tenant, property=self.listings[0])
+        missing = '00000000-0000-0000-0000-000000000000'
+        ids = [str(listing.pk) for listing in self.listings] + [missing]
+        response = self.client.post(reverse('bulk_save_properties'), {'property_ids': ids}, format='json')
+        self.assertEqual(response.data, {'saved': 2, 'not_found': [missing]})
+        self.assertEqual(SavedProperty.objects.filter(user=self.tenant).count(), 3)
+        saves = dict(PropertyDailyStats.objects.values_list('property_id', 'saves'))
+        self.assertEqual([saves[listing.pk] for listing in self.listings], [1, 1, 1])
+
+        response = self.client.delete(reverse('bulk_save_properties'), {'property_ids': ids[:2]}, format='json')
+        self.assertEqual(response.data, {'removed': 2})
+
+    def test_saved_ids_revalidate_with_etag(self):
+        url = reverse('saved_property_ids')
+        SavedProperty.objects.create(user=self.tenant, property=self.listings[1])
+        response = self.client.get(url)
+        self.assertEqual(response.data, {'ids': [str(self.listings[1].pk)]})
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        self.assertNotIn('Last-Modified', response)
+        SavedProperty.objects.all().delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.data, {'ids': []})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SavedSearchTests(CacheResetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.tenant = make_owner('tenant@example.com')
+        cls.listing = make_property(cls.owner, listing_status='DRAFT', latitude='5.600000', longitude='-0.180000')
+
+    def save_search(self, query, name=''):
+        return SavedSearch.objects.create(user=self.tenant, name=name, query=query)
+
+    def test_api_validates_and_normalises_query(self):
+        self.client.force_authenticate(self.tenant)
+        url = reverse('saved_search_list_create')
+        response = self.client.post(url, {'name': 'Flats', 'query': {'city': 'Accra', 'max_price': 1500, 'page_size': 5}}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {'name': 'Flats', 'query': {'city': 'Accra', 'max_price': 1500}}, format='json')
+        self.assertEqual(response.status_code, 201)
+        search = SavedSearch.objects.get(pk=response.data['id'])
+        self.assertEqual((search.city, search.max_price, search.needs_check), ('Accra', 1500, False))
+
+    def test_listing_going_live_notifies_matching_searches_once_per_user(self):
+        self.save_search({'city': 'Accra', 'max_price': '1500'}, name='Cheap Accra')
+        self.save_search({'city': 'Accra', 'bedrooms': '2', 'search': 'flat'}, name='Two bed')
+        self.save_search({'near': '5.6,-0.18', 'radius_km': '1'})
+        self.save_search({'city': 'Kumasi'})
+        self.save_search({'city': 'Accra', 'bedrooms': '3'})
+        SavedSearch.objects.create(user=self.owner, query={'city': 'Accra'})
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.listing.save()
+        self.assertEqual(len(queued_tasks(callbacks)), 0)
+        self.listing.listing_status = 'ACTIVE'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.listing.save()
+        self.assertEqual(len(queued_tasks(callbacks)), 1)
+
+        with self.assertNumQueries(4):
+            # Listing, candidate searches, one UNION ALL check, notification insert
+            self.assertEqual(notify_matches([self.listing.pk]), 1)
+        notification = Notification.objects.get(user=self.tenant)
+        self.assertEqual(len(notification.metadata['saved_search_ids']), 3)
+        self.assertFalse(Notification.objects.filter(user=self.owner).exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.listing = make_property(cls.owner)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_matching_etag_returns_304_without_serializing(self):
+        url = reverse('my_properties')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_child_row_change_changes_detail_etag(self):
+        url = reverse('property_detail', args=[self.listing.pk])
+        etag = self.client.get(url)['ETag']
+        PropertyAmenity.objects.create(property=self.listing, amenity_name='Wifi', amenity_category='BASIC')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_view_count_change_defeats_if_modified_since(self):
+        url = reverse('property_detail', args=[self.listing.pk])
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        Property.objects.filter(pk=self.listing.pk).update(view_count=F('view_count') + 1)
+        since = http_date(time.time() + 60)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['view_count'], self.listing.view_count + 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MarketStatsTests(CacheResetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        for price in (800, 900, 1000, 1100, 1200):
+            make_property(cls.owner, price_per_month=price)
+        make_property(cls.owner, property_type='HOUSE', price_per_month=3000)
+        make_property(cls.owner, listing_status='DRAFT', price_per_month=99999)
+
+    def setUp(self):
+        super().setUp()
+        market_cache.local.clear()
+
+    def test_refresh_publishes_only_segments_with_enough_listings(self):
+        refresh_market_stats()
+        url = reverse('market_stats')
+        response = self.client.get(url, {'city': 'Accra'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['segment']['listing_count'], 6)
+        self.assertEqual(response.data['segment']['price_max'], '3000.00')
+        self.assertEqual(sum(response.data['segment']['histogram']['counts']), 6)
+        # Only APARTMENT has enough listings to be broken out
+        self.assertEqual([row['property_type'] for row in response.data['breakdown']], ['APARTMENT'])
+
+        response = self.client.get(url, {'city': 'Accra', 'property_type': 'APARTMENT', 'bedrooms': '2'})
+        self.assertEqual(response.data['segment']['price_median'], '1000.00')
+        self.assertEqual(self.client.get(url, {'city': 'Accra', 'property_type': 'HOUSE'}).status_code, 404)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_refresh_replaces_the_snapshot(self):
+        refresh_market_stats()
+        Property.objects.filter(price_per_month=3000).update(listing_status='RENTED')
+        refresh_market_stats()
+        self.assertEqual(MarketStats.objects.get(property_type='', bedrooms=None).listing_count, 5)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MapClusterTests(CacheResetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        # Two flats in Osu and one in Kumasi
+        cls.osu = make_property(cls.owner, latitude=5.556, longitude=-0.182, price_per_month=1500)
+        make_property(cls.owner, latitude=5.557, longitude=-0.181, price_per_month=900)
+        cls.kumasi = make_property(cls.owner, latitude=6.688, longitude=-1.624)
+        make_property(cls.owner, latitude=5.556, longitude=-0.182, listing_status='RENTED')
+
+    def test_clusters_aggregate_per_cell(self):
+        response = self.client.get(reverse('property_clusters'), {'bbox': '-3,4.5,1,8', 'zoom': 7})
+        self.assertEqual(response.status_code, 200)
+        clusters = sorted(response.data['clusters'], key=lambda cluster: -cluster['count'])
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([cluster['count'] for cluster in clusters], [2, 1])
+        self.assertEqual(clusters[0]['min_price'], '900.00')
+        self.assertAlmostEqual(clusters[0]['latitude'], 5.5565)
+        self.assertEqual(clusters[1]['property_id'], str(self.kumasi.pk))
+
+    def test_pans_reuse_cached_tiles_until_the_catalogue_changes(self):
+        url = reverse('property_clusters')
+        self.client.get(url, {'bbox': '-0.3,5.5,-0.1,5.6', 'zoom': 12})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'bbox': '-0.25,5.52,-0.05,5.62', 'zoom': 12})
+        self.assertEqual(response.data['count'], 2)
+
+        self.osu.listing_status = 'RENTED'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.osu.save()
+        self.assertEqual(self.client.get(url, {'bbox': '-0.25,5.52,-0.05,5.62', 'zoom': 12}).data['count'], 1)
+
+    def test_invalid_viewport_is_rejected(self):
+        url = reverse('property_clusters')
+        self.assertEqual(self.client.get(url, {'zoom': 5}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'bbox': '-3,4.5,1,8', 'zoom': 'far'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'bbox': '-180,-90,180,90', 'zoom': 16}).status_code, 400)
+
+
+class DuplicateDetectionTests(TestCase):
+    DESCRIPTION = (
+        'Spacious two bedroom apartment close to the mall with a fitted kitchen, '
+        'a large balcony, backup water storage, secure parking and a quiet compound.'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.original = make_property(cls.owner, title='Lovely 2 bed flat in East Legon', description=cls.DESCRIPTION)
+        cls.repost = make_property(cls.owner, title='LOVELY 2 bed flat, East Legon!!', description=cls.DESCRIPTION + ' Call now.')
+        cls.other = make_property(cls.owner, title='Shop space', description='Ground floor commercial unit on a busy road.')
+
+    def test_saving_a_listing_queues_fingerprinting_only_when_text_changes(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.other.price_per_month = 2000
+            self.other.save()
+        self.assertEqual(len(queued_tasks(callbacks)), 0)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.other.title = 'Shop space to let'
+            self.other.save()
+        self.assertEqual(len(queued_tasks(callbacks)), 1)
+
+    def test_reposts_are_clustered_under_the_earliest_listing(self):
+        self.assertEqual(index_listings([self.original.pk, self.other.pk]), 0)
+        self.assertEqual(index_listings([self.repost.pk]), 1)
+        clusters = dict(ListingFingerprint.objects.values_list('property_id', 'cluster'))
+        self.assertEqual(clusters, {self.original.pk: self.original.pk, self.repost.pk: self.original.pk, self.other.pk: None})
+
+        # Unchanged text is not fingerprinted again, and a full sweep agrees
+        self.assertEqual(sweep(), (0, 1))
+        self.assertEqual(dict(ListingFingerprint.objects.values_list('property_id', 'cluster')), clusters)
+
+    def make_second_repost(self):
+        second = make_property(self.owner, title='Lovely 2 bed flat in East Legon', description=self.DESCRIPTION + ' No agents.')
+        index_listings([self.original.pk, self.repost.pk, second.pk])
+        return second
+
+    def test_cluster_is_renamed_when_its_earliest_listing_leaves(self):
+        second = self.make_second_repost()
+        self.assertEqual(ListingFingerprint.objects.get(property=second).cluster, self.original.pk)
+
+        Property.objects.filter(pk=self.original.pk).update(title='Office to let', description='Open plan office floor.')
+        index_listings([self.original.pk])
+        clusters = dict(ListingFingerprint.objects.values_list('property_id', 'cluster'))
+        self.assertIsNone(clusters[self.original.pk])
+        self.assertEqual((clusters[self.repost.pk], clusters[second.pk]), (self.repost.pk, self.repost.pk))
+
+        # Deleting a listing dissolves a cluster it leaves with a single member
+        self.repost.delete()
+        self.assertIsNone(ListingFingerprint.objects.get(property=second).cluster)
+
+    def test_deactivation_keeps_the_earliest_remaining_listing(self):
+        second = self.make_second_repost()
+        # Cluster still named after a listing that has left it
+        ListingFingerprint.objects.filter(property=self.original).update(cluster=None)
+
+        model_admin = DuplicateListingAdmin(DuplicateListing, site)
+        request = RequestFactory().get('/')
+        with mock.patch.object(model_admin, 'message_user'):
+            model_admin.deactivate_duplicates(request, model_admin.get_queryset(request))
+        statuses = dict(Property.objects.values_list('pk', 'listing_status'))
+        self.assertEqual(statuses[self.repost.pk], 'ACTIVE')
+        self.assertEqual(statuses[second.pk], 'INACTIVE')
+        self.assertEqual(statuses[self.original.pk], 'ACTIVE')
@@ -0,0 +1,201 @@
+import ipaddress
+import json
+import logging
+import re
+from collections import Counter
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Property, PropertyView
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = 'property_views:buffer'
+PROCESSING_KEY = 'property_views:processing'  # Batch being flushed; survives a worker crash
+DEAD_LETTER_KEY = 'property_views:dead'  # Events that could not be written
+FLUSH_LOCK_KEY = 'property_views:flush_lock'
+FLUSH_LOCK_SECONDS = 5 * 60  # Renewed every batch; frees the lock if a flushing worker dies
+SEEN_KEY = 'property_views:seen:{property_id}:{viewer}'
+
+BOT_USER_AGENT = re.compile(
+    r'bot|crawl|spider|slurp|preview|headless|lighthouse|python-requests|curl|wget',
+    re.IGNORECASE
+)
+
+_client = None
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
+
+
+def is_bot(user_agent):
+    return not user_agent or bool(BOT_USER_AGENT.search(user_agent))
+
+
+def clean_ip(value):
+    """Normalise a client-supplied IP address, or None if it isn't one."""
+    try:
+        return str(ipaddress.ip_address((value or '').strip()))
+    except ValueError:
+        return None
+
+
+def record_view(property_id, user=None, ip_address=None, user_agent=''):
+    """
+    Buffer a property view in Redis instead of writing it synchronously.
+
+    Bot traffic is dropped, and repeat views from the same user (or IP for
+    anonymous visitors) within PROPERTY_VIEW_DEDUP_SECONDS are ignored.
+    Returns True if the view was buffered.
+    """
+    if is_bot(user_agent):
+        return False
+
+    user_id = str(user.id) if user is not None and user.is_authenticated else None
+    # X-Forwarded-For is client controlled; a bad value must not poison the flush
+    ip_address = clean_ip(ip_address)
+    viewer = f'u:{user_id}' if user_id else f'ip:{ip_address or "unknown"}'
+
+    try:
+        client = get_redis()
+        seen_key = SEEN_KEY.format(property_id=property_id, viewer=viewer)
+        if not client.set(seen_key, 1, nx=True, ex=settings.PROPERTY_VIEW_DEDUP_SECONDS):
+            return False
+
+        client.rpush(BUFFER_KEY, json.dumps({
+            'property_id': str(property_id),
+            'user_id': user_id,
+            'ip_address': ip_address,
+            'viewed_at': timezone.now().isoformat(),
+        }))
+    except redis.RedisError:
+        # View tracking must never take the detail page down with it
+        logger.warning('Could not buffer view for property %s', property_id, exc_info=True)
+        return False
+
+    return True
+
+
+def claim_batch(batch_size):
+    """
+    Move up to batch_size raw events from the buffer onto the processing list.
+
+    Events left on the processing list by a flush that died before
+    committing are handed out again first, so a crash never drops views.
+    """
+    client = get_redis()
+    leftover = client.lrange(PROCESSING_KEY, 0, batch_size - 1)
+    if leftover:
+        return leftover
+
+    pipe = client.pipeline(transaction=False)
+    for _ in range(batch_size):
+        pipe.lmove(BUFFER_KEY, PROCESSING_KEY, 'LEFT', 'RIGHT')
+    return [raw for raw in pipe.execute() if raw is not None]
+
+
+def dead_letter(raw_events, reason):
+    if raw_events:
+        logger.warning('Moving %d property view(s) to %s: %s', len(raw_events), DEAD_LETTER_KEY, reason)
+        get_redis().rpush(DEAD_LETTER_KEY, *raw_events)
+
+
+def decode_events(raw_events):
+    events = []
+    for raw in raw_events:
+        try:
+            event = json.loads(raw)
+            events.append((raw, event, PropertyView(
+                property_id=event['property_id'],
+                user_id=event['user_id'],
+                ip_address=event['ip_address'],
+                viewed_at=parse_datetime(event['viewed_at']),
+            )))
+        except (TypeError, KeyError, ValueError):
+            dead_letter([raw], 'malformed event')
+    return events
+
+
+def write_views(views, batch_size):
+    counts = Counter(str(view.property_id) for view in views)
+    with transaction.atomic():
+        PropertyView.objects.bulk_create(views, batch_size=batch_size)
+        for property_id, count in counts.items():
+            Property.objects.filter(id=property_id).update(
+                view_count=F('view_count') + count
+            )
+
+
+def flush_views(batch_size=None):
+    """
+    Drain the view buffer into the database.
+
+    Each batch becomes one bulk_create of PropertyView rows plus one
+    F()-based view_count increment per distinct property. A batch that fails
+    is retried event by event and the events that still fail are moved to the
+    dead-letter list, so one bad event can't stall the buffer. Returns the
+    number of views written.
+
+    Only one flush runs at a time: the processing list is shared, so an
+    overlapping flush would write the in-flight batch twice. A flush that
+    finds the lock taken returns 0.
+    """
+    batch_size = batch_size or settings.PROPERTY_VIEW_FLUSH_BATCH_SIZE
+    lock = get_redis().lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_SECONDS, blocking=False)
+    if not lock.acquire():
+        logger.info('Another flush holds %s; skipping', FLUSH_LOCK_KEY)
+        return 0
+    try:
+        return drain(batch_size, lock)
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            logger.warning('View flush lock expired before the flush finished')
+
+
+def drain(batch_size, lock):
+    written = 0
+
+    while True:
+        # Raises LockNotOwnedError, ending this flush, if the lock has expired meanwhile
+        lock.reacquire()
+        raw_events = claim_batch(batch_size)
+        if not raw_events:
+            break
+
+        events = decode_events(raw_events)
+
+        # Listings deleted since the view was buffered are skipped
+        existing = set(
+            str(pk) for pk in Property.objects.filter(
+                id__in={event['property_id'] for _, event, _ in events}
+            ).values_list('id', flat=True)
+        )
+        events = [item for item in events if item[1]['property_id'] in existing]
+
+        try:
+            write_views([view for _, _, view in events], batch_size)
+            written += len(events)
+        except Exception:
+            logger.warning('Bulk view flush failed; retrying events one at a time', exc_info=True)
+            for raw, _, view in events:
+                try:
+                    write_views([view], batch_size)
+                    written += 1
+                except Exception as exc:
+                    dead_letter([raw], exc)
+
+        # Only now is the batch safely in the database
+        get_redis().ltrim(PROCESSING_KEY, len(raw_events), -1)
+
+    return written
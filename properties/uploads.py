@@ -0,0 +1,73 @@
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+
+# Content type -> stored file extension
+UPLOAD_CONTENT_TYPES = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+}
+TOKEN_SALT = 'properties.image-upload'
+
+
+class UploadError(Exception):
+    pass
+
+
+def direct_uploads_enabled(storage=default_storage):
+    # Presigned POSTs need an S3-compatible backend (django-storages S3Storage)
+    return hasattr(storage, 'bucket_name') and hasattr(storage, 'connection')
+
+
+def upload_key(property_id, content_type):
+    return f'property_images/uploads/{property_id}/{uuid.uuid4().hex}.{UPLOAD_CONTENT_TYPES[content_type]}'
+
+
+def presign_upload(name, content_type, storage=default_storage):
+    """
+    Presigned POST letting the client send the file straight to the bucket.
+
+    The policy pins the object key and content type and caps the size, so
+    the storage service rejects anything else before it is stored.
+    """
+    key = storage._normalize_name(name)
+    client = storage.connection.meta.client
+    return client.generate_presigned_post(
+        Bucket=storage.bucket_name,
+        Key=key,
+        Fields={'Content-Type': content_type},
+        Conditions=[
+            {'Content-Type': content_type},
+            ['content-length-range', 1, settings.PROPERTY_IMAGE_MAX_UPLOAD_BYTES],
+        ],
+        ExpiresIn=settings.PROPERTY_IMAGE_UPLOAD_EXPIRY_SECONDS,
+    )
+
+
+def make_upload_token(property_id, name, attributes):
+    """Signed record of an issued upload, so completion needs no server-side state."""
+    return signing.dumps({'property': str(property_id), 'name': name, **attributes}, salt=TOKEN_SALT)
+
+
+def read_upload_token(token, property_id):
+    """The upload a token was issued for; raises UploadError if it is invalid, stale or for another listing."""
+    try:
+        # Allow for a client that starts the upload right before the URL expires
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=2 * settings.PROPERTY_IMAGE_UPLOAD_EXPIRY_SECONDS)
+    except signing.BadSignature:
+        raise UploadError('Invalid or expired upload token.')
+    if data.pop('property') != str(property_id):
+        raise UploadError('Upload token belongs to another property.')
+    return data
+
+
+def check_uploaded(name, storage=default_storage):
+    """Confirm the client actually stored the object and it is within the size limit."""
+    if not storage.exists(name):
+        raise UploadError('The file has not been uploaded yet.')
+    if storage.size(name) > settings.PROPERTY_IMAGE_MAX_UPLOAD_BYTES:
+        storage.delete(name)
+        raise UploadError('The uploaded file is too large.')
@@ -1,22 +1,52 @@
 from django.urls import path
 from .views import (
     PropertyListCreateView,
+    PropertyFacetsView,
+    PropertyClustersView,
+    PropertyImportView,
     PropertyDetailView,
+    SimilarPropertiesView,
     MyPropertiesView,
+    PortfolioExportView,
+    PropertyStatsView,
+    PortfolioStatsView,
     UploadPropertyImageView,
+    DirectImageUploadView,
+    CompleteImageUploadView,
     DeletePropertyImageView,
     SavePropertyView,
     UnsavePropertyView,
-    SavedPropertiesView
+    SavedPropertyIdsView,
+    BulkSavePropertiesView,
+    SavedPropertiesView,
+    SavedSearchListCreateView,
+    SavedSearchDetailView,
+    MarketStatsView,
+    ListingCacheStatsView
 )
 
 urlpatterns = [
     path('', PropertyListCreateView.as_view(), name='property_list_create'),
+    path('facets/', PropertyFacetsView.as_view(), name='property_facets'),
+    path('clusters/', PropertyClustersView.as_view(), name='property_clusters'),
+    path('import/', PropertyImportView.as_view(), name='property_import'),
     path('<uuid:pk>/', PropertyDetailView.as_view(), name='property_detail'),
+    path('<uuid:property_id>/similar/', SimilarPropertiesView.as_view(), name='similar_properties'),
     path('my-properties/', MyPropertiesView.as_view(), name='my_properties'),
+    path('my-properties/export/', PortfolioExportView.as_view(), name='portfolio_export'),
+    path('my-properties/stats/', PortfolioStatsView.as_view(), name='portfolio_stats'),
+    path('<uuid:property_id>/stats/', PropertyStatsView.as_view(), name='property_stats'),
     path('<uuid:property_id>/upload-image/', UploadPropertyImageView.as_view(), name='upload_image'),
+    path('<uuid:property_id>/image-uploads/', DirectImageUploadView.as_view(), name='direct_image_upload'),
+    path('<uuid:property_id>/image-uploads/complete/', CompleteImageUploadView.as_view(), name='complete_image_upload'),
     path('image/<uuid:pk>/', DeletePropertyImageView.as_view(), name='delete_image'),
     path('<uuid:property_id>/save/', SavePropertyView.as_view(), name='save_property'),
     path('<uuid:property_id>/unsave/', UnsavePropertyView.as_view(), name='unsave_property'),
     path('saved/', SavedPropertiesView.as_view(), name='saved_properties'),
+    path('saved/ids/', SavedPropertyIdsView.as_view(), name='saved_property_ids'),
+    path('saved/bulk/', BulkSavePropertiesView.as_view(), name='bulk_save_properties'),
+    path('saved-searches/', SavedSearchListCreateView.as_view(), name='saved_search_list_create'),
+    path('saved-searches/<uuid:pk>/', SavedSearchDetailView.as_view(), name='saved_search_detail'),
+    path('market-stats/', MarketStatsView.as_view(), name='market_stats'),
+    path('cache-stats/', ListingCacheStatsView.as_view(), name='listing_cache_stats'),
 ]
\ No newline at end of file
@@ -1,19 +1,48 @@
-from rest_framework import generics, status, permissions, filters
+from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
-from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch, Sum
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
 from .models import (
     Property, PropertyImage, PropertyAmenity,
-    SavedProperty, PropertyView
+    SavedProperty, PropertyDailyStats, SavedSearch
+)
+from .cache import get_catalogue_version, listing_cache, normalise_query
+from .clusters import CLUSTER_IGNORED_PARAMS, cluster_cache, parse_zoom, viewport_clusters
+from .conditional import ConditionalGetMixin, make_etag
+from .exporter import CSVRenderer, NDJSONRenderer, stream_export
+from .facets import FACET_IGNORED_PARAMS, compute_facets, facet_cache
+from .fieldsets import FieldSelection, SparseFieldsetViewMixin
+from .filters import PropertyFilterMixin
+from .geo import parse_bbox
+from .importer import CSVParser, NDJSONParser, PropertyImporter
+from .market import market_cache, segment_report
+from .pagination import PropertyCursorPagination
+from .search import PropertySearchFilter
+from .similarity import DEFAULT_LIMIT, MAX_LIMIT, similar_cache, similarity_service
+from .stats import daily_series, increment_many, listing_totals, parse_days, stats_window
+from .tasks import process_property_image
+from .tracking import record_view
+from .uploads import (
+    UploadError, check_uploaded, direct_uploads_enabled, make_upload_token, presign_upload, read_upload_token, upload_key
 )
 from .serializers import (
     PropertyListSerializer,
     PropertyDetailSerializer,
     PropertyCreateUpdateSerializer,
     PropertyImageSerializer,
-    SavedPropertySerializer
+    ImageUploadRequestSerializer,
+    ImageUploadCompleteSerializer,
+    SavedPropertySerializer,
+    SavedPropertyBulkSerializer,
+    SavedSearchSerializer,
+    MarketStatsSerializer
 )
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -25,17 +54,12 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
             return True
         return obj.owner == request.user
 
-class PropertyListCreateView(generics.ListCreateAPIView):
+class PropertyListCreateView(SparseFieldsetViewMixin, PropertyFilterMixin, generics.ListCreateAPIView):
     """
-    GET /api/properties/ - List all properties
+    GET /api/properties/ - List all properties (?fields=, ?expand=images,amenities)
     POST /api/properties/ - Create new property
     """
-    queryset = Property.objects.filter(listing_status='ACTIVE')
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['property_type', 'city', 'state', 'bedrooms', 'bathrooms', 'is_furnished', 'pets_allowed']
-    search_fields = ['title', 'description', 'address_line1', 'city']
-    ordering_fields = ['price_per_month', 'created_at', 'view_count']
-    ordering = ['-created_at']
+    pagination_class = PropertyCursorPagination
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -47,27 +71,67 @@ class PropertyListCreateView(generics.ListCreateAPIView):
             return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
     
-    def get_queryset(self):
-        queryset = super().get_queryset()
+    def list(self, request, *args, **kwargs):
+        # Anonymous responses are identical for identical queries, so serve them from cache
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
         
-        # Filter by price range
-        min_price = self.request.query_params.get('min_price')
-        max_price = self.request.query_params.get('max_price')
-        
-        if min_price:
-            queryset = queryset.filter(price_per_month__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price_per_month__lte=max_price)
+        key, data = listing_cache.get(normalise_query(request))
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            listing_cache.set(key, data)
+        return Response(data)
+    
+    def get_queryset(self):
+        return PropertyListSerializer.setup_eager_loading(
+            super().get_queryset().defer('search_vector'), self.get_selection()
+        )
+
+class PropertyFacetsView(PropertyFilterMixin, generics.GenericAPIView):
+    """
+    GET /api/properties/facets/
+    Counts per facet value for the current list query (same filters as the list)
+    """
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        raw_key = normalise_query(request, exclude=FACET_IGNORED_PARAMS)
+        key, facets = facet_cache.get(raw_key)
+        if facets is None:
+            facets = compute_facets(self.filter_queryset(self.get_queryset()))
+            facet_cache.set(key, facets)
+        return Response(facets)
+
+class PropertyClustersView(PropertyFilterMixin, generics.GenericAPIView):
+    """
+    GET /api/properties/clusters/?bbox=west,south,east,north&zoom=12
+    Listing count, centroid and lowest price per map cell in the viewport (same filters as the list)
+    """
+    permission_classes = [permissions.AllowAny]
+    # The viewport is handled by the tiling, and clusters have no order
+    filter_backends = [DjangoFilterBackend, PropertySearchFilter]
+    
+    def get(self, request):
+        bbox = request.query_params.get('bbox')
+        if not bbox:
+            return Response({'bbox': 'This parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        south, west, north, east = parse_bbox(bbox)
+        zoom = parse_zoom(request.query_params.get('zoom'))
         
-        return queryset.select_related('owner').prefetch_related('images', 'amenities')
+        data = viewport_clusters(
+            self.filter_queryset(self.get_queryset()),
+            normalise_query(request, exclude=CLUSTER_IGNORED_PARAMS),
+            south, west, north, east, zoom,
+        )
+        return Response(data)
 
-class PropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
+class PropertyDetailView(SparseFieldsetViewMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
-    GET /api/properties/<id>/ - Get property details
+    GET /api/properties/<id>/ - Get property details (?fields=)
     PUT /api/properties/<id>/ - Update property
     DELETE /api/properties/<id>/ - Delete property
     """
-    queryset = Property.objects.all()
+    queryset = Property.objects.select_related('owner').defer('search_vector')
     permission_classes = [IsOwnerOrReadOnly]
     
     def get_serializer_class(self):
@@ -75,48 +139,174 @@ class PropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
             return PropertyCreateUpdateSerializer
         return PropertyDetailSerializer
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method == 'GET':
+            queryset = PropertyDetailSerializer.setup_eager_loading(queryset, self.get_selection())
+        return queryset
+    
+    def get_validators(self, request, instance):
+        # Child image/amenity/document changes touch updated_at (see signals)
+        owner = instance.owner
+        etag = make_etag(
+            instance.pk, instance.updated_at.isoformat(), instance.view_count, owner.updated_at.isoformat(),
+            self.get_selection().key
+        )
+        # No Last-Modified: the view-count flush changes the body without touching updated_at
+        return etag, None
+    
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         
-        # Track property view
-        PropertyView.objects.create(
-            property=instance,
-            user=request.user if request.user.is_authenticated else None,
-            ip_address=self.get_client_ip(request)
-        )
+        # Clients already holding this version get a 304 without serialization
+        etag, last_modified = self.get_validators(request, instance)
+        not_modified = self.check_not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
         
-        # Increment view count
-        instance.view_count += 1
-        instance.save(update_fields=['view_count'])
+        # Buffer the view; PropertyView rows and view_count are written by the periodic flush
+        record_view(
+            instance.id,
+            user=request.user,
+            ip_address=self.get_client_ip(request),
+            user_agent=request.META.get('HTTP_USER_AGENT', '')
+        )
         
         serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        return self.add_validators(Response(serializer.data), etag, last_modified)
     
     def get_client_ip(self, request):
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
+            ip = x_forwarded_for.split(',')[0].strip()
         else:
             ip = request.META.get('REMOTE_ADDR')
         return ip
 
-class MyPropertiesView(generics.ListAPIView):
+class SimilarPropertiesView(APIView):
+    """
+    GET /api/properties/<property_id>/similar/?limit=10 (?fields=, ?expand=)
+    Active listings closest to this one in price, size, type, location and amenities
+    """
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request, property_id):
+        try:
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        
+        key, data = similar_cache.get(normalise_query(request))
+        if data is None:
+            property_obj = get_object_or_404(Property, id=property_id)
+            selection = FieldSelection.from_request(request)
+            # Ask for a few extra in case some matches were deleted since the index last synced
+            matches = similarity_service.similar(property_obj, limit + 5)
+            
+            found = {
+                str(prop.pk): prop for prop in PropertyListSerializer.setup_eager_loading(
+                    Property.objects.filter(pk__in=[pk for pk, _ in matches], listing_status='ACTIVE').defer('search_vector'),
+                    selection
+                )
+            }
+            similarity_service.evict(pk for pk, _ in matches if pk not in found)
+            
+            data = []
+            for pk, distance in matches:
+                if pk in found and len(data) < limit:
+                    item = PropertyListSerializer(found[pk], context={'request': request, 'selection': selection}).data
+                    item['similarity'] = round(1 / (1 + distance), 4)
+                    data.append(item)
+            similar_cache.set(key, data)
+        
+        return Response(data)
+
+class MyPropertiesView(SparseFieldsetViewMixin, ConditionalGetMixin, generics.ListAPIView):
     """
-    GET /api/properties/my-properties/
+    GET /api/properties/my-properties/ (?fields=, ?expand=)
     List all properties owned by authenticated user
     """
     serializer_class = PropertyListSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_validators(self, request):
+        user = request.user
+        stats = Property.objects.filter(owner=user).aggregate(
+            count=Count('id'), latest=Max('updated_at'), views=Sum('view_count')
+        )
+        etag = make_etag('my-properties', user.pk, user.updated_at.isoformat(), *stats.values(), self.get_selection().key)
+        # No Last-Modified: deleting a listing doesn't move max(updated_at), only the ETag's count
+        return etag, None
+    
     def get_queryset(self):
-        return Property.objects.filter(
-            owner=self.request.user
-        ).select_related('owner').prefetch_related('images', 'amenities')
+        return PropertyListSerializer.setup_eager_loading(
+            Property.objects.filter(owner=self.request.user).defer('search_vector'), self.get_selection()
+        )
+
+class PortfolioExportView(APIView):
+    """
+    GET /api/properties/my-properties/export/?format=ndjson|csv
+    Stream all of the user's listings (with amenities) in the bulk import formats
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    
+    def get(self, request):
+        renderer = request.accepted_renderer
+        queryset = Property.objects.filter(owner=request.user)
+        response = StreamingHttpResponse(
+            stream_export(queryset, renderer.format),
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        filename = f'properties-{timezone.localdate():%Y%m%d}.{renderer.format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+class PropertyStatsView(APIView):
+    """
+    GET /api/properties/<property_id>/stats/?days=30
+    Daily views, saves, applications and conversations for one of the user's listings
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, property_id):
+        property_obj = get_object_or_404(Property, id=property_id, owner=request.user)
+        start, end = stats_window(parse_days(request.query_params.get('days')))
+        totals, daily = daily_series(PropertyDailyStats.objects.filter(property=property_obj), start, end)
+        
+        return Response({
+            'property_id': property_obj.id,
+            'start': start,
+            'end': end,
+            'lifetime_views': property_obj.view_count,
+            'totals': totals,
+            'daily': daily,
+        })
+
+class PortfolioStatsView(APIView):
+    """
+    GET /api/properties/my-properties/stats/?days=30
+    The same counters summed across all of the user's listings, plus per-listing totals
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        start, end = stats_window(parse_days(request.query_params.get('days')))
+        queryset = PropertyDailyStats.objects.filter(property__owner=request.user)
+        totals, daily = daily_series(queryset, start, end)
+        
+        return Response({
+            'start': start,
+            'end': end,
+            'totals': totals,
+            'daily': daily,
+            'listings': listing_totals(queryset, start, end),
+        })
 
 class UploadPropertyImageView(APIView):
     """
     POST /api/properties/<property_id>/upload-image/
-    Upload an image for a property
+    Upload an image for a property through the API (see DirectImageUploadView for large files)
     """
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
@@ -133,11 +323,83 @@ class UploadPropertyImageView(APIView):
         
         image = serializer.save(property=property_obj)
         
+        # Resize and strip metadata in the background once the row is committed
+        transaction.on_commit(lambda: process_property_image.delay(str(image.id)))
+        
         return Response(
             PropertyImageSerializer(image).data,
             status=status.HTTP_201_CREATED
         )
 
+class DirectImageUploadView(APIView):
+    """
+    POST /api/properties/<property_id>/image-uploads/
+    Presigned POST for uploading an image straight to object storage, plus
+    the token to hand to the completion endpoint afterwards
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request, property_id):
+        property_obj = get_object_or_404(Property, id=property_id, owner=request.user)
+        if not direct_uploads_enabled():
+            return Response({'detail': 'Direct uploads are not configured.'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        
+        serializer = ImageUploadRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        attributes = dict(serializer.validated_data)
+        name = upload_key(property_obj.pk, attributes.pop('content_type'))
+        
+        return Response({
+            'upload': presign_upload(name, serializer.validated_data['content_type']),
+            'upload_token': make_upload_token(property_obj.pk, name, attributes),
+            'expires_in': settings.PROPERTY_IMAGE_UPLOAD_EXPIRY_SECONDS,
+        }, status=status.HTTP_201_CREATED)
+
+class CompleteImageUploadView(APIView):
+    """
+    POST /api/properties/<property_id>/image-uploads/complete/
+    Register an image uploaded with a presigned POST and queue its processing
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request, property_id):
+        property_obj = get_object_or_404(Property, id=property_id, owner=request.user)
+        
+        serializer = ImageUploadCompleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            upload = read_upload_token(serializer.validated_data['upload_token'], property_obj.pk)
+            name = upload.pop('name')
+            
+            # Retried callbacks get the image created the first time
+            existing = PropertyImage.objects.filter(property=property_obj, image_url=name).first()
+            if existing is not None:
+                return Response(PropertyImageSerializer(existing).data, status=status.HTTP_200_OK)
+            check_uploaded(name)
+        except UploadError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        with transaction.atomic():
+            if upload['is_primary']:
+                PropertyImage.objects.filter(property=property_obj, is_primary=True).update(is_primary=False)
+            image = PropertyImage.objects.create(property=property_obj, image_url=name, **upload)
+            # Resize and strip metadata in the background once the row is committed
+            transaction.on_commit(lambda: process_property_image.delay(str(image.id)))
+        
+        return Response(PropertyImageSerializer(image).data, status=status.HTTP_201_CREATED)
+
+class PropertyImportView(APIView):
+    """
+    POST /api/properties/import/
+    Bulk create listings from an NDJSON (application/x-ndjson) or CSV (text/csv) body
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [NDJSONParser, CSVParser]
+    
+    def post(self, request):
+        report = PropertyImporter(request.user).run(request.data)
+        return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST)
+
 class DeletePropertyImageView(generics.DestroyAPIView):
     """
     DELETE /api/properties/image/<id>/
@@ -194,15 +456,163 @@ class UnsavePropertyView(APIView):
             'message': 'Property removed from saved list'
         }, status=status.HTTP_200_OK)
 
-class SavedPropertiesView(generics.ListAPIView):
+class SavedPropertyIdsView(ConditionalGetMixin, APIView):
+    """
+    GET /api/properties/saved/ids/
+    Ids of all properties the user has saved, for "is saved" markers on listing grids
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_validators(self, request):
+        stats = SavedProperty.objects.filter(user=request.user).aggregate(count=Count('id'), saved=Max('saved_at'))
+        # No Last-Modified: unsaving doesn't move max(saved_at), only the ETag's count
+        return make_etag('saved-ids', request.user.pk, *stats.values()), None
+    
+    def get(self, request):
+        etag, last_modified = self.get_validators(request)
+        not_modified = self.check_not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        
+        ids = SavedProperty.objects.filter(user=request.user).order_by().values_list('property_id', flat=True)
+        response = Response({'ids': sorted(str(pk) for pk in ids)})
+        return self.add_validators(response, etag, last_modified)
+
+class BulkSavePropertiesView(APIView):
+    """
+    POST /api/properties/saved/bulk/ - Save many properties: {"property_ids": [...]}
+    DELETE /api/properties/saved/bulk/ - Unsave many properties: {"property_ids": [...]}
     """
-    GET /api/properties/saved/
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_property_ids(self, request):
+        serializer = SavedPropertyBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['property_ids']
+    
+    def post(self, request):
+        requested = self.get_property_ids(request)
+        found = set(Property.objects.filter(pk__in=requested).values_list('pk', flat=True))
+        already = set(
+            SavedProperty.objects.filter(user=request.user, property_id__in=found).values_list('property_id', flat=True)
+        )
+        new = [pk for pk in requested if pk in found and pk not in already]
+        
+        with transaction.atomic():
+            SavedProperty.objects.bulk_create(
+                [SavedProperty(user=request.user, property_id=pk) for pk in new],
+                ignore_conflicts=True,
+            )
+            # bulk_create skips count_save
+            increment_many(new, 'saves')
+        
+        return Response({
+            'saved': len(new),
+            'not_found': [str(pk) for pk in requested if pk not in found],
+        }, status=status.HTTP_200_OK)
+    
+    def delete(self, request):
+        removed, _ = SavedProperty.objects.filter(
+            user=request.user, property_id__in=self.get_property_ids(request)
+        ).delete()
+        return Response({'removed': removed}, status=status.HTTP_200_OK)
+
+class SavedPropertiesView(SparseFieldsetViewMixin, ConditionalGetMixin, generics.ListAPIView):
+    """
+    GET /api/properties/saved/ (?fields= / ?expand= apply to property_details)
     List all saved properties
     """
     serializer_class = SavedPropertySerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_validators(self, request):
+        stats = SavedProperty.objects.filter(user=request.user).aggregate(
+            count=Count('id'),
+            saved=Max('saved_at'),
+            updated=Max('property__updated_at'),
+            owners=Max('property__owner__updated_at'),
+            views=Sum('property__view_count'),
+        )
+        etag = make_etag('saved', request.user.pk, *stats.values(), self.get_selection().key)
+        # No Last-Modified: unsaving doesn't move any of the maxima, only the ETag's count
+        return etag, None
+    
     def get_queryset(self):
+        properties = PropertyListSerializer.setup_eager_loading(Property.objects.defer('search_vector'), self.get_selection())
         return SavedProperty.objects.filter(
             user=self.request.user
-        ).select_related('property__owner').prefetch_related('property__images')
\ No newline at end of file
+        ).prefetch_related(Prefetch('property', queryset=properties))
+
+class SavedSearchListCreateView(generics.ListCreateAPIView):
+    """
+    GET /api/properties/saved-searches/ - List my saved searches
+    POST /api/properties/saved-searches/ - Save a list query; new matching listings become notifications
+    """
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+    
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+class SavedSearchDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    GET/PUT/PATCH/DELETE /api/properties/saved-searches/<id>/
+    """
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+
+class MarketStatsView(APIView):
+    """
+    GET /api/properties/market-stats/?city=Accra&property_type=APARTMENT&bedrooms=2&currency=GHS
+    Asking-rent percentiles and histogram for a segment (city required), with a breakdown one level down
+    """
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        city = request.query_params.get('city')
+        if not city:
+            return Response({'city': 'This parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        bedrooms = request.query_params.get('bedrooms') or None
+        if bedrooms is not None and not bedrooms.isdigit():
+            return Response({'bedrooms': 'A whole number is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        key, data = market_cache.get(normalise_query(request))
+        if data is None:
+            segment, breakdown = segment_report(
+                city,
+                property_type=request.query_params.get('property_type', ''),
+                bedrooms=int(bedrooms) if bedrooms is not None else None,
+                currency=request.query_params.get('currency', 'GHS'),
+            )
+            if segment is None:
+                return Response({'detail': 'Not enough listings in this segment.'}, status=status.HTTP_404_NOT_FOUND)
+            data = {
+                'segment': MarketStatsSerializer(segment).data,
+                'breakdown': MarketStatsSerializer(breakdown, many=True).data,
+            }
+            market_cache.set(key, data)
+        
+        return Response(data)
+
+class ListingCacheStatsView(APIView):
+    """
+    GET /api/properties/cache-stats/
+    Hit/miss counters of the listing response cache (admin only)
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        return Response({
+            'catalogue_version': get_catalogue_version(),
+            'listing': listing_cache.stats(),
+            'facets': facet_cache.stats(),
+            'similar': similar_cache.stats(),
+            'market': market_cache.stats(),
+            'clusters': cluster_cache.stats(),
+        })
\ No newline at end of file